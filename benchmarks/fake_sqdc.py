@@ -0,0 +1,160 @@
+import argparse
+import json
+import logging
+import random
+import sys
+from pathlib import Path
+from typing import List
+
+import tornado.web
+from tornado import gen
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.synthetic import create_catalog, SyntheticResponses  # noqa: E402
+from sqdc.dataobjects.product import Product  # noqa: E402
+from sqdc.request_limiter import TokenBucket  # noqa: E402
+from sqdc.sqdc_client import DEFAULT_LOCALE  # noqa: E402
+
+log = logging.getLogger(__name__)
+
+
+# Stand-in for www.sqdc.ca: serves a synthetic or recorded catalog with the same pages and API endpoints,
+# with a configurable latency, error rate, rate limit and stock churn.
+class FakeSqdc:
+    def __init__(self, products: List[Product], latency_seconds=0.0, latency_jitter_seconds=0.0, error_rate=0.0,
+                 churn=0.0, seed=0, max_rps=0.0):
+        self.responses = SyntheticResponses(products)
+        self.variants = [v for p in products for v in p.variants]
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.error_rate = error_rate
+        self.churn = churn
+        self.rate_limit = TokenBucket(max_rps)
+        self.rng = random.Random(seed)
+        self.nb_requests = 0
+        self.nb_errors = 0
+        self.nb_throttled = 0
+
+    def get_latency(self) -> float:
+        jitter = self.rng.uniform(-self.latency_jitter_seconds, self.latency_jitter_seconds)
+        return max(0.0, self.latency_seconds + jitter)
+
+    def should_fail(self) -> bool:
+        return self.rng.random() < self.error_rate
+
+    # Requests over the rate are refused, not delayed.
+    def should_throttle(self) -> bool:
+        return not self.rate_limit.try_take()
+
+    # Flips the stock of a fraction of the variants, as restocks and sell-outs would.
+    def apply_churn(self):
+        nb_changes = int(len(self.variants) * self.churn)
+        for variant in self.rng.sample(self.variants, min(nb_changes, len(self.variants))):
+            variant.in_stock = not variant.in_stock
+        for product in self.responses.products:
+            product.in_stock = product.is_in_stock()
+        log.info(f'{nb_changes} variants changed stock, {sum(v.in_stock for v in self.variants)} in stock')
+
+
+class FakeSqdcRequestHandler(tornado.web.RequestHandler):
+    sqdc: FakeSqdc
+
+    async def prepare(self):
+        self.sqdc.nb_requests += 1
+        latency = self.sqdc.get_latency()
+        if latency > 0:
+            await gen.sleep(latency)
+        if self.sqdc.should_throttle():
+            self.sqdc.nb_throttled += 1
+            self.set_header('Retry-After', '1')
+            raise tornado.web.HTTPError(429)
+        if self.sqdc.should_fail():
+            self.sqdc.nb_errors += 1
+            raise tornado.web.HTTPError(503)
+
+    def get_json_body(self) -> dict:
+        return json.loads(self.request.body or b'{}')
+
+    def write_json(self, content):
+        self.set_header('Content-Type', 'application/json; charset=utf-8')
+        self.write(json.dumps(content))
+
+
+class SearchRequestHandler(FakeSqdcRequestHandler):
+    def get(self):
+        page = int(self.get_argument('page', '1'))
+        self.write(self.sqdc.responses.get_search_page_html(page))
+
+
+class CalculatePricesRequestHandler(FakeSqdcRequestHandler):
+    def post(self):
+        self.write_json(self.sqdc.responses.get_prices(self.get_json_body().get('products', [])))
+
+
+class FindInventoryItemsRequestHandler(FakeSqdcRequestHandler):
+    def post(self):
+        self.write_json(self.sqdc.responses.get_inventory_items(self.get_json_body().get('skus', [])))
+
+
+class SpecificationsRequestHandler(FakeSqdcRequestHandler):
+    def post(self):
+        self.write_json(self.sqdc.responses.get_specifications(self.get_json_body().get('variantId')))
+
+
+def create_application(sqdc: FakeSqdc) -> tornado.web.Application:
+    FakeSqdcRequestHandler.sqdc = sqdc
+    return tornado.web.Application([
+        (rf'/{DEFAULT_LOCALE}/Search', SearchRequestHandler),
+        (r'/api/product/calculatePrices', CalculatePricesRequestHandler),
+        (r'/api/inventory/findInventoryItems', FindInventoryItemsRequestHandler),
+        (r'/api/product/specifications', SpecificationsRequestHandler)
+    ])
+
+
+# The catalog saved by a watcher, with the specifications of its variants.
+def load_recorded_catalog(directory: Path, is_test: bool) -> List[Product]:
+    from sqdc.SqdcStore import SqdcStore
+    from sqdc.dataobjects.spec_blob import SpecBlob
+
+    store = SqdcStore(is_test, root_directory=directory)
+    store.initialize()
+    products = store.get_products()
+    with store.open_session() as session:
+        spec_blobs = {blob.hash: blob for blob in session.query(SpecBlob).all()}
+    for p in products:
+        for v in p.variants:
+            v.new_spec_blob = spec_blobs.get(v.spec_hash)
+    return products
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serves a synthetic or recorded catalog as www.sqdc.ca would. '
+                                                 'Point the watcher to it with --sqdc-url http://localhost:<port>')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--products', type=int, default=1000, help='Size of the synthetic catalog.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--from-store', type=Path, help='Serves the catalog saved in this data directory instead.')
+    parser.add_argument('--test', action='store_true', help='With --from-store, reads data-test.db.')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Added to every response.')
+    parser.add_argument('--latency-jitter-ms', type=float, default=0, help='The latency varies by up to this much.')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of the requests failing with a 503.')
+    parser.add_argument('--max-rps', type=float, default=0, help='Requests per second over which a 429 is returned. 0 does not limit.')
+    parser.add_argument('--churn', type=float, default=0, help='Fraction of the variants changing stock at each churn interval.')
+    parser.add_argument('--churn-interval', type=float, default=60, help='In seconds.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s: %(asctime)s - %(message)s')
+
+    products = load_recorded_catalog(args.from_store, args.test) if args.from_store else create_catalog(args.products, args.seed)
+    sqdc = FakeSqdc(products, args.latency_ms / 1000, args.latency_jitter_ms / 1000, args.error_rate, args.churn, args.seed, args.max_rps)
+    create_application(sqdc).listen(args.port)
+    if args.churn > 0:
+        PeriodicCallback(sqdc.apply_churn, args.churn_interval * 1000).start()
+    log.info(f'Serving {len(products)} products on http://localhost:{args.port}')
+    IOLoop.current().start()
+
+
+if __name__ == '__main__':
+    main()
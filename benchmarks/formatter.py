@@ -0,0 +1,76 @@
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from sqdc.dataobjects.product import Product  # noqa: E402
+from sqdc.dataobjects.product_variant import ProductVariant  # noqa: E402
+from sqdc.formatter import SqdcFormatter  # noqa: E402
+
+
+def create_products(nb_products: int):
+    products = []
+    created = datetime.now() - timedelta(days=30)
+    for i in range(nb_products):
+        product = Product(id=str(i), title=f'Product {i}', url=f'https://www.sqdc.ca/en-CA/p-{i}/{i}-P/{i}01',
+                          brand=f'Brand {i % 40}', in_stock=True, is_new=i % 10 == 0, category='Dried flowers',
+                          cannabis_type='Indica', producer_name=f'Producer {i % 25}', availability_stats='57.3',
+                          created=created)
+        for j, grams in enumerate([28, 3.5, 7, 15]):
+            product.variants.append(ProductVariant(id=f'{i}-{j}', product_id=str(i), in_stock=j % 3 != 2, price=8.5 * grams,
+                                                   gram_equivalent=grams, strain=f'Strain number {i}, blend', spec_hash=str(i),
+                                                   cannabis_type='Indica', thc_min=18, thc_max=22, cbd_min=0, cbd_max=1,
+                                                   unit_of_measure_thc_cbd='%'))
+        products.append(product)
+    return products
+
+
+def measure(function: Callable[[], object], runs: int) -> float:
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the rendering of the products table and Slack product lines.')
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=5, help='The best run is kept.')
+    args = parser.parse_args()
+
+    products = create_products(args.products)
+    cache = SqdcFormatter.render_cache
+    cache.max_size = max(cache.max_size, args.products * 2)
+
+    def render_cold(render):
+        def run():
+            cache.clear()
+            render()
+        return run
+
+    def render_table():
+        SqdcFormatter.build_products_table(products)
+
+    def render_slack_lines():
+        for p in products:
+            SqdcFormatter.format_product(p)
+
+    # tabulate itself is not cached: the rows are
+    print(f'Rendering {args.products} products, best of {args.runs} runs:')
+    for name, render in [('products table', render_table), ('slack lines', render_slack_lines)]:
+        cold_ms = measure(render_cold(render), args.runs)
+        render()
+        warm_ms = measure(render, args.runs)
+        print(f'  {name:15} cold {cold_ms:8.1f} ms   cached {warm_ms:8.1f} ms   ({cold_ms / warm_ms:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+MAIN_SCRIPT = ROOT_DIR.joinpath('main.py')
+
+# import time:       self [us] |  cumulative | imported package
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+# Modules the one-shot listing must never load.
+FORBIDDEN_MODULES = ['sqlalchemy', 'tornado', 'bs4', 'requests', 'coloredlogs', 'alembic']
+
+DEFAULT_THRESHOLD_MS = 150
+
+
+def parse_import_times(stderr: str) -> Dict[str, int]:
+    self_times = {}
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_times[match.group(4)] = int(match.group(1))
+    return self_times
+
+
+def measure_import_times(arguments: List[str], cwd: str) -> Dict[str, int]:
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, cwd=cwd,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    return parse_import_times(process.stderr)
+
+
+def write_sample_snapshot(directory: Path, nb_products=500):
+    sys.path.insert(0, str(ROOT_DIR))
+    from sqdc.catalog_snapshot import CatalogSnapshot
+    from sqdc.dataobjects.product import Product
+    from sqdc.dataobjects.product_variant import ProductVariant
+
+    products = []
+    for i in range(nb_products):
+        product = Product(id=str(i), title=f'Product {i}', url=f'https://www.sqdc.ca/en-CA/p-{i}/{i}-P', brand='Brand',
+                          in_stock=True, is_new=False, category='Dried flowers', cannabis_type='Indica', producer_name='Producer')
+        product.variants.append(ProductVariant(id=f'{i}-1', product_id=str(i), in_stock=True, price=10, gram_equivalent=3.5,
+                                               strain=f'Strain {i}', spec_hash='0', level_two_category='Dried flowers'))
+        products.append(product)
+
+    directory.joinpath('data').mkdir()
+    CatalogSnapshot.write(directory.joinpath('data', CatalogSnapshot.get_filename(is_test=False)), products)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the import time of the one-shot listing (main.py --only-from-cache).')
+    parser.add_argument('--threshold-ms', type=float, default=DEFAULT_THRESHOLD_MS,
+                        help='Fails if the modules imported on top of a bare interpreter take longer than this.')
+    parser.add_argument('--runs', type=int, default=5, help='The best run is kept.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_sample_snapshot(Path(directory))
+        interpreter_modules = measure_import_times(['-c', 'pass'], directory)
+        runs = [measure_import_times([str(MAIN_SCRIPT), '--only-from-cache'], directory) for _ in range(args.runs)]
+
+    best_run = min(runs, key=lambda r: sum(r.values()))
+    added_modules = {module: self_time for module, self_time in best_run.items() if module not in interpreter_modules}
+    total_ms = sum(added_modules.values()) / 1000
+
+    print(f'Import time of the one-shot listing: {total_ms:.1f} ms (threshold: {args.threshold_ms:.0f} ms)')
+    for module, self_time in sorted(added_modules.items(), key=lambda m: m[1], reverse=True)[:15]:
+        print(f'  {self_time / 1000:8.1f} ms  {module}')
+
+    failures = []
+    forbidden_imported = sorted({m.split('.')[0] for m in added_modules} & set(FORBIDDEN_MODULES))
+    if len(forbidden_imported) > 0:
+        failures.append('modules that must be imported lazily were loaded: ' + ', '.join(forbidden_imported))
+    if total_ms > args.threshold_ms:
+        failures.append(f'import time regressed: {total_ms:.1f} ms > {args.threshold_ms:.0f} ms')
+
+    for failure in failures:
+        print('FAILED - ' + failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from threading import Event
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.synthetic import create_catalog, SyntheticSqdcClient  # noqa: E402
+from sqdc.SqdcStore import SqdcStore  # noqa: E402
+from sqdc.process_pool import create_process_pool  # noqa: E402
+from sqdc.product_tiles import parse_product_tiles  # noqa: E402
+from sqdc.products_updater import ProductsUpdater  # noqa: E402
+
+
+def measure_crawl(store: SqdcStore, client: SyntheticSqdcClient, nb_workers: int, runs: int) -> float:
+    parse_pool = create_process_pool(nb_workers) if nb_workers > 0 else None
+    if parse_pool:
+        # the workers are started before the measure
+        list(parse_pool.map(parse_product_tiles, [client.get_product_result_page_html(1)] * nb_workers))
+
+    best = None
+    for _ in range(runs):
+        updater = ProductsUpdater(store, client, Event(), parse_pool)
+        start = time.perf_counter()
+        updater.fetch_all_products_summary(max_pages=999999)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    if parse_pool:
+        parse_pool.shutdown()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the crawl of the search result pages, parsed in the scan thread '
+                                                 'or in a pool of processes.')
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--runs', type=int, default=3, help='The best run is kept.')
+    args = parser.parse_args()
+
+    client = SyntheticSqdcClient(create_catalog(args.products))
+    with tempfile.TemporaryDirectory() as directory:
+        store = SqdcStore(is_test=True, root_directory=directory)
+        store.initialize()
+
+        print(f'Crawling {args.products} products, best of {args.runs} runs:')
+        in_thread = measure_crawl(store, client, 0, args.runs)
+        print(f'  {"scan thread":12} {in_thread:8.2f}s')
+        for nb_workers in args.workers:
+            elapsed = measure_crawl(store, client, nb_workers, args.runs)
+            print(f'  {f"{nb_workers} workers":12} {elapsed:8.2f}s   ({in_thread / elapsed:.1f}x)')
+        store.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
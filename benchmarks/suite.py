@@ -0,0 +1,241 @@
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import Event
+from typing import Callable, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.synthetic import create_catalog, create_next_scan, generate_history_rows, group_history_entries, \
+    SyntheticSqdcClient  # noqa: E402
+from sqdc.SqdcStore import SqdcStore  # noqa: E402
+from sqdc.dataobjects.product_history import ProductHistory  # noqa: E402
+from sqdc.formatter import SqdcFormatter  # noqa: E402
+from sqdc.logic.product_calculator import ProductCalculator  # noqa: E402
+from sqdc.logic.product_history_analyzer import ProductHistoryAnalyzer  # noqa: E402
+from sqdc.products_updater import ProductsUpdater  # noqa: E402
+
+BASELINES_DIR = ROOT_DIR.joinpath('benchmarks', 'baselines')
+DEFAULT_SIZES = [1000, 10000]
+DEFAULT_HISTORY_ROWS = 100000
+HISTORY_INSERT_BATCH_SIZE = 50000
+HISTORY_LOOKUPS = 100
+
+# Regressions are reported when a case is both relatively and absolutely slower than its baseline:
+# the fastest cases are too noisy to be judged on the ratio alone.
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MIN_SECONDS = 0.01
+
+
+def measure(function: Callable[[], object], runs: int) -> float:
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+# The cases of one catalog size. Each one returns its timings, in seconds, by name.
+class CatalogBenchmark:
+    def __init__(self, nb_products: int, nb_history_rows: int, runs: int, directory: Path):
+        self.nb_products = nb_products
+        self.nb_history_rows = nb_history_rows
+        self.runs = runs
+        self.directory = directory
+        self.products = create_catalog(nb_products)
+        self.next_products = create_next_scan(self.products)
+
+    def run(self, cases: List[str]) -> Dict[str, float]:
+        results = {}
+        for case in cases:
+            start = time.perf_counter()
+            for name, seconds in getattr(self, f'measure_{case}')().items():
+                results[f'{name}/{self.nb_products}'] = seconds
+            print(f'  {case:12} {self.nb_products:>8} products   {time.perf_counter() - start:8.2f}s', flush=True)
+        return results
+
+    def measure_calculator(self) -> Dict[str, float]:
+        def calculate():
+            calculator = ProductCalculator(None, self.products, self.next_products)
+            calculator.get_became_in_stock()
+            calculator.get_became_out_of_stock()
+            calculator.get_new_products()
+
+        return {'calculator.stock_changes': measure(calculate, self.runs)}
+
+    def measure_updater(self) -> Dict[str, float]:
+        updater = ProductsUpdater(None, SyntheticSqdcClient(self.next_products), Event())
+        return {'updater.merge_populate': measure(lambda: updater.get_products(self.products, use_cached_products=True), self.runs)}
+
+    # Single runs: each one needs a new database.
+    def measure_store(self) -> Dict[str, float]:
+        store = self.create_store('store')
+        results = {'store.save_products_insert': measure(lambda: store.save_products(self.products), 1),
+                   'store.save_products_update': measure(lambda: store.save_products(self.next_products), 1),
+                   'store.get_products': measure(store.get_products, self.runs)}
+        store.engine.dispose()
+        return results
+
+    def measure_history(self) -> Dict[str, float]:
+        store = self.create_store('history')
+        store.save_products(self.products)
+        start = time.perf_counter()
+        with store.open_session() as session:
+            batch = []
+            for row in generate_history_rows(self.products, self.nb_history_rows):
+                batch.append(row)
+                if len(batch) == HISTORY_INSERT_BATCH_SIZE:
+                    session.execute(ProductHistory.__table__.insert(), batch)
+                    batch = []
+            if batch:
+                session.execute(ProductHistory.__table__.insert(), batch)
+            session.commit()
+        insert_seconds = time.perf_counter() - start
+
+        variants = [v for p in self.products for v in p.variants][:HISTORY_LOOKUPS]
+
+        def get_variants_history():
+            for v in variants:
+                store.get_variant_history(v.product_id, v.id)
+
+        since = datetime.now().replace(year=datetime.now().year - 1)
+        results = {'history.insert': insert_seconds,
+                   'history.restock_counts': measure(lambda: store.get_restock_counts(since), self.runs),
+                   f'history.variant_history_x{len(variants)}': measure(get_variants_history, self.runs)}
+        store.engine.dispose()
+        return results
+
+    def measure_analyzer(self) -> Dict[str, float]:
+        entries_by_variant = group_history_entries(generate_history_rows(self.products, self.nb_history_rows))
+        end_datetime = datetime.now()
+
+        def analyze():
+            for p in self.products:
+                for v in p.variants:
+                    ProductHistoryAnalyzer(v).calculate_percentage_in_stock(p, entries_by_variant.get(v.id, []), end_datetime)
+
+        return {'analyzer.percentage_in_stock': measure(analyze, self.runs)}
+
+    def measure_formatter(self) -> Dict[str, float]:
+        products_in_stock = [p for p in self.next_products if p.is_in_stock()]
+        cache = SqdcFormatter.render_cache
+        cache.max_size = max(cache.max_size, len(products_in_stock) * 2)
+
+        def render_table():
+            cache.clear()
+            SqdcFormatter.build_products_table(products_in_stock)
+
+        def render_slack_lines():
+            cache.clear()
+            for p in products_in_stock:
+                SqdcFormatter.format_product(p)
+
+        return {'formatter.products_table': measure(render_table, self.runs),
+                'formatter.slack_lines': measure(render_slack_lines, self.runs)}
+
+    def create_store(self, name: str) -> SqdcStore:
+        directory = self.directory.joinpath(f'{name}-{self.nb_products}')
+        directory.mkdir()
+        store = SqdcStore(is_test=True, root_directory=directory)
+        store.initialize()
+        return store
+
+
+CASES = [name[len('measure_'):] for name in vars(CatalogBenchmark) if name.startswith('measure_')]
+
+
+def run(args) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='sqdc-benchmark-') as directory:
+        for nb_products in args.sizes:
+            print(f'Catalog of {nb_products} products, {args.history_rows} history rows:', flush=True)
+            benchmark = CatalogBenchmark(nb_products, args.history_rows, args.runs, Path(directory))
+            results.update(benchmark.run(args.cases))
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': args.sizes,
+        'history_rows': args.history_rows,
+        'runs': args.runs,
+        'results': results
+    }
+
+
+# Returns the names of the cases that regressed.
+def compare(baseline: dict, current: dict, tolerance: float, min_seconds: float) -> List[str]:
+    regressions = []
+    print(f'{"case":48} {"baseline":>10} {"current":>10} {"ratio":>7}')
+    for name, seconds in current['results'].items():
+        baseline_seconds = baseline['results'].get(name)
+        if baseline_seconds is None:
+            print(f'{name:48} {"-":>10} {seconds:10.4f}')
+            continue
+        ratio = seconds / baseline_seconds if baseline_seconds > 0 else float('inf')
+        regressed = ratio > 1 + tolerance and seconds - baseline_seconds > min_seconds
+        if regressed:
+            regressions.append(name)
+        print(f'{name:48} {baseline_seconds:10.4f} {seconds:10.4f} {ratio:6.2f}x{"  REGRESSION" if regressed else ""}')
+    return regressions
+
+
+def load_results(path: Path) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the scan pipeline on synthetic catalogs.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser('run', help='Runs the benchmarks and writes the results as JSON.')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Numbers of products, e.g. 1000 10000 100000')
+    run_parser.add_argument('--history-rows', type=int, default=DEFAULT_HISTORY_ROWS, help='Up to 10M rows.')
+    run_parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES)
+    run_parser.add_argument('--runs', type=int, default=3, help='The best run is kept.')
+    run_parser.add_argument('--output', type=Path, help=f'Defaults to {BASELINES_DIR.relative_to(ROOT_DIR)}/<timestamp>.json')
+    run_parser.add_argument('--baseline', type=Path, help='Compares the results with this baseline.')
+    run_parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    run_parser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS)
+
+    compare_parser = subparsers.add_parser('compare', help='Compares results with a baseline. Exits with 1 on regressions.')
+    compare_parser.add_argument('baseline', type=Path)
+    compare_parser.add_argument('current', type=Path)
+    compare_parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                                help='Allowed slowdown, as a fraction of the baseline time.')
+    compare_parser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS,
+                                help='Slowdowns shorter than this are never regressions.')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run(args)
+        output = args.output or BASELINES_DIR.joinpath(f'{datetime.now().strftime("%Y%m%d-%H%M%S")}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f'Results written to {output}')
+        if not args.baseline:
+            return
+        baseline, current = load_results(args.baseline), results
+    else:
+        baseline, current = load_results(args.baseline), load_results(args.current)
+
+    regressions = compare(baseline, current, args.tolerance, args.min_seconds)
+    if regressions:
+        print(f'{len(regressions)} regressions, over {args.tolerance:.0%} and {args.min_seconds}s slower than the baseline')
+        sys.exit(1)
+    print('No regressions')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+import random
+from datetime import datetime, timedelta
+from html import escape
+from typing import List, Dict, Iterator, Iterable
+
+from sqdc.dataobjects.product import Product
+from sqdc.dataobjects.product_history import ProductHistory
+from sqdc.dataobjects.product_variant import ProductVariant
+from sqdc.dataobjects.productevent import ProductEvent
+from sqdc.sqdc_client import SqdcClient
+
+# Synthetic catalogs and histories shaped like the SQDC ones: a few variants per product, most of the catalog
+# out of stock, restocks that come and go. Everything is generated from a seed, so runs are comparable.
+
+CATEGORIES = ['Dried flowers', 'Pre-rolled', 'Ground cannabis', 'Oils', 'Capsules', 'Edibles']
+CANNABIS_TYPES = ['Indica', 'Sativa', 'Hybrid']
+PRODUCERS = [f'Producer {i}' for i in range(60)]
+BRANDS = [f'Brand {i}' for i in range(150)]
+ADJECTIVES = ['Purple', 'Northern', 'Golden', 'Blue', 'Sour', 'Pink', 'Lemon', 'Cherry', 'Royal', 'Electric']
+NOUNS = ['Kush', 'Haze', 'Diesel', 'Dream', 'Lights', 'Cookies', 'Widow', 'Skunk', 'Berry', 'Cake']
+GRAM_EQUIVALENTS = [1, 3.5, 7, 15, 28]
+
+FIRST_SKU = 628582000000
+PAGE_SIZE = 24
+HISTORY_DAYS = 90
+
+
+def create_catalog(nb_products: int, seed: int = 0, in_stock_ratio: float = 0.3) -> List[Product]:
+    rng = random.Random(seed)
+    now = datetime.now()
+    products = []
+    for i in range(nb_products):
+        product_id = str(100000 + i)
+        title = f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}'
+        producer = rng.choice(PRODUCERS)
+        category = rng.choice(CATEGORIES)
+        cannabis_type = rng.choice(CANNABIS_TYPES)
+        created = now - timedelta(days=rng.uniform(0, 365))
+        product = Product(id=product_id, title=title, brand=rng.choice(BRANDS), category=category,
+                          cannabis_type=cannabis_type, producer_name=producer, created=created, last_updated=now,
+                          is_new=rng.random() < 0.05, url='')
+
+        thc = rng.uniform(0, 28)
+        grams = sorted(rng.sample(GRAM_EQUIVALENTS, rng.randint(1, 4)))
+        for j, gram_equivalent in enumerate(grams):
+            variant_id = str(FIRST_SKU + i * 5 + j)
+            variant = ProductVariant(id=variant_id, product_id=product_id, created=created, last_updated=now,
+                                     in_stock=rng.random() < in_stock_ratio)
+            price = round(gram_equivalent * rng.uniform(5, 12), 2)
+            variant.list_price = price
+            variant.price = price
+            variant.price_per_gram = round(price / gram_equivalent, 2)
+            variant.set_specifications(create_specifications(title, producer, category, cannabis_type, gram_equivalent, thc))
+            product.variants.append(variant)
+
+        product.url = f'https://www.sqdc.ca/en-CA/p-{slugify(title)}/{product_id}-P/{product.variants[0].id}'
+        product.in_stock = product.is_in_stock()
+        products.append(product)
+    return products
+
+
+def create_specifications(title: str, producer: str, category: str, cannabis_type: str, gram_equivalent: float, thc: float) -> Dict[str, str]:
+    return {
+        'GramEquivalent': str(gram_equivalent),
+        'Strain': title.rsplit(' ', 1)[0],
+        'CannabisType': cannabis_type,
+        'THCContentMin': f'{thc:.1f}',
+        'THCContentMax': f'{thc + 2:.1f}',
+        'CBDContentMin': '0',
+        'CBDContentMax': '1',
+        'UnitOfMeasureThcCbd': '%',
+        'ProducerName': producer,
+        'LevelTwoCategory': category
+    }
+
+
+def slugify(title: str) -> str:
+    return title.lower().replace(' ', '-')
+
+
+# The next scan of the same catalog: new instances, with the stock of a fraction of the variants flipped.
+def create_next_scan(products: List[Product], churn: float = 0.05, seed: int = 1) -> List[Product]:
+    rng = random.Random(seed)
+    next_products = []
+    for p in products:
+        product = Product(**{c.key: getattr(p, c.key) for c in Product.__table__.columns})
+        for v in p.variants:
+            variant = ProductVariant(**{c.key: getattr(v, c.key) for c in ProductVariant.__table__.columns})
+            variant.new_spec_blob = v.new_spec_blob
+            if rng.random() < churn:
+                variant.in_stock = not variant.in_stock
+            product.variants.append(variant)
+        product.in_stock = product.is_in_stock()
+        next_products.append(product)
+    return next_products
+
+
+# History rows as dicts, ready for a bulk insert: each variant alternates in stock / not in stock events
+# over the last HISTORY_DAYS days. Rows are generated lazily: 10M rows do not fit comfortably in memory.
+def generate_history_rows(products: List[Product], nb_rows: int, seed: int = 0) -> Iterator[dict]:
+    variants = [v for p in products for v in p.variants]
+    if not variants:
+        return
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=HISTORY_DAYS)
+    rows_per_variant, remainder = divmod(nb_rows, len(variants))
+    step = timedelta(days=HISTORY_DAYS) / max(1, rows_per_variant + 1)
+    for index, v in enumerate(variants):
+        timestamp = start + step * rng.random()
+        for k in range(rows_per_variant + (1 if index < remainder else 0)):
+            event = ProductEvent.IN_STOCK if k % 2 == 0 else ProductEvent.NOT_IN_STOCK
+            yield {'product_id': v.product_id, 'variant_id': int(v.id), 'event': event.name.lower(), 'timestamp': timestamp}
+            timestamp += step * rng.uniform(0.5, 1)
+
+
+def group_history_entries(rows: Iterable[dict]) -> Dict[str, List[ProductHistory]]:
+    entries = {}
+    for row in rows:
+        entries.setdefault(str(row['variant_id']), []).append(ProductHistory(**row))
+    return entries
+
+
+# Search result pages, calculatePrices, findInventoryItems and specifications payloads, as www.sqdc.ca returns them.
+class SyntheticResponses:
+    def __init__(self, products: List[Product], page_size: int = PAGE_SIZE):
+        self.products = products
+        self.page_size = page_size
+        self.products_by_id = {p.id: p for p in products}
+        self.variants_by_id = {v.id: v for p in products for v in p.variants}
+
+    def get_search_page_html(self, page_number: int) -> str:
+        start = (page_number - 1) * self.page_size
+        tiles = [self.get_product_tile_html(p) for p in self.products[start:start + self.page_size]]
+        return '<html><body><div class="product-list">' + ''.join(tiles) + '</div></body></html>'
+
+    @staticmethod
+    def get_product_tile_html(product: Product) -> str:
+        css_class = 'product-tile' if product.is_in_stock() else 'product-tile product-outofstock'
+        href = product.url.replace('https://www.sqdc.ca', '')
+        return f'<div class="{css_class}">' \
+            f'<a data-qa="search-product-title" data-productid="{product.id}" href="{escape(href)}">{escape(product.title)}</a>' \
+            f'<div class="js-equalized-brand">{escape(product.brand)}</div>' \
+            f'</div>'
+
+    def get_prices(self, product_ids: List[str]) -> dict:
+        prices = []
+        for product_id in product_ids:
+            product = self.products_by_id.get(product_id)
+            if product:
+                prices.append({'ProductId': product_id, 'VariantPrices': [self.get_variant_prices(v) for v in product.variants]})
+        return {'ProductPrices': prices}
+
+    @staticmethod
+    def get_variant_prices(variant: ProductVariant) -> dict:
+        return {'VariantId': variant.id, 'ListPrice': f'${variant.list_price:.2f}', 'DisplayPrice': f'${variant.price:.2f}',
+                'PricePerGram': f'${variant.price_per_gram:.2f}'}
+
+    def get_inventory_items(self, skus: Iterable[str]) -> List[str]:
+        return [sku for sku in skus if sku in self.variants_by_id and self.variants_by_id[sku].in_stock]
+
+    def get_specifications(self, variant_id: str) -> dict:
+        variant = self.variants_by_id.get(variant_id)
+        specifications = variant.new_spec_blob.specifications if variant is not None and variant.new_spec_blob else {}
+        return {'Groups': [{'Attributes': [{'PropertyName': k, 'Value': v} for k, v in specifications.items()]}]}
+
+
+# Serves the synthetic catalog without any network access.
+class SyntheticSqdcClient(SqdcClient):
+    def __init__(self, products: List[Product]):
+        super().__init__()
+        self.responses = SyntheticResponses(products)
+
+    def get_product_result_page_html(self, page_number):
+        return self.responses.get_search_page_html(page_number)
+
+    def api_calculate_prices(self, product_ids):
+        return self.responses.get_prices(product_ids)['ProductPrices']
+
+    def api_find_inventory_items(self, skus: Iterable[str]):
+        return self.responses.get_inventory_items(skus)
+
+    def api_get_specifications(self, product_id, variant_id):
+        return self.responses.get_specifications(variant_id)['Groups']
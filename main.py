@@ -1,15 +1,21 @@
 import argparse
 import logging
 import signal
+from pathlib import Path
 from threading import Event
 
-import coloredlogs
 
-from sqdc import SqdcStore
-from sqdc.formatter import SqdcFormatter
-from sqdc.products_updater import ProductsUpdater
-from sqdc.watcher import SqdcWatcher
-from sqdc.watcherOptions import WatcherOptions
+# FAMILY=RATE, e.g. specifications=40
+def parse_request_rate(value: str):
+    from sqdc.request_limiter import DEFAULT_RATES
+
+    family, _, rate = value.partition('=')
+    if family not in DEFAULT_RATES:
+        raise argparse.ArgumentTypeError(f'unknown endpoint family {family!r}, expected one of: {", ".join(DEFAULT_RATES)}')
+    try:
+        return family, float(rate)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid rate {rate!r} for {family}')
 
 
 def parse_args():
@@ -20,7 +26,8 @@ def parse_args():
         help='Monitor periodically the Sqdc website for new available products. If any found, post to Slack if the slack-post-url was provided.')
     parser.add_argument(
         '--only-from-cache',
-        action='store_true')
+        action='store_true',
+        help='List the products from the catalog snapshot saved by the last scan, without fetching anything.')
     parser.add_argument(
         '--watch-interval',
         type=int, default=5, help='watcher execution interval, in minutes.')
@@ -59,6 +66,124 @@ def parse_args():
         help='Specify this flag to enable posting to Slack new products notifications. If not specified, new products to be notified are printed to the console.'
     )
 
+    parser.add_argument(
+        '--spec-refresh-budget',
+        type=int, default=25,
+        help='Maximum number of variant specifications re-fetched after each scan, oldest first. 0 disables the refresh.'
+    )
+
+    parser.add_argument(
+        '--notification-workers',
+        type=int, default=2,
+        help='Number of threads sending the Slack notifications.'
+    )
+
+    parser.add_argument(
+        '--digest-window',
+        type=int, default=0,
+        help='Buffer the trigger notifications of each user for this many minutes and send them as one message. 0 sends them after each scan.'
+    )
+
+    parser.add_argument(
+        '--adaptive-interval',
+        action='store_true',
+        help='Scan more often at the times of the week products usually come back in stock, and less often otherwise.'
+    )
+    parser.add_argument(
+        '--min-watch-interval',
+        type=float, default=2, help='With --adaptive-interval, shortest interval between scans, in minutes.'
+    )
+    parser.add_argument(
+        '--max-watch-interval',
+        type=float, default=30, help='With --adaptive-interval, longest interval between scans, in minutes.'
+    )
+    parser.add_argument(
+        '--full-scan-interval',
+        type=float, default=15,
+        help='Minimum duration between two scans of the whole catalog, in minutes. Scans in between only refresh the availability of known products.'
+    )
+
+    parser.add_argument(
+        '--hot-poll-interval',
+        type=float, default=10,
+        help='Seconds between two availability checks of the watched and frequently restocked variants. 0 disables it.'
+    )
+    parser.add_argument(
+        '--hot-poll-batch-size',
+        type=int, default=20, help='Number of variants checked per inventory request by the hot set poller.'
+    )
+
+    parser.add_argument(
+        '--trace-scans',
+        action='store_true',
+        help='Write a trace of each scan to data/trace-<timestamp>.json, to open in chrome://tracing or Perfetto.'
+    )
+    parser.add_argument(
+        '--trace-max-files',
+        type=int, default=20, help='With --trace-scans, number of scan traces kept.'
+    )
+
+    parser.add_argument(
+        '--parse-workers',
+        type=int, default=0,
+        help='Number of processes parsing the search result pages while the next ones are fetched. 0 parses them in the scan thread.'
+    )
+
+    parser.add_argument(
+        '--scan-shards',
+        type=int, default=0,
+        help='Number of processes sharing the crawl (by page ranges), the inventory and the specifications requests '
+             '(by SKU ranges). The watcher process merges their results, writes to the database and notifies. 0 disables it.'
+    )
+
+    parser.add_argument(
+        '--stale-page-fallback',
+        action='store_true',
+        help='When a search result page cannot be fetched, use its copy from the last complete scan instead of failing '
+             'the scan. Its products are flagged as stale.'
+    )
+
+    parser.add_argument(
+        '--request-rate',
+        type=parse_request_rate, action='append', default=[], metavar='FAMILY=RATE',
+        help='Requests per second allowed to a family of SQDC endpoints: search, prices, inventory or specifications. '
+             '0 does not limit it. Can be repeated.'
+    )
+    parser.add_argument(
+        '--max-concurrent-requests',
+        type=int, default=16,
+        help='Upper bound of the adaptive number of concurrent requests to the SQDC. It grows while the responses are fast '
+             'and is halved on 429, 5xx and slow responses.'
+    )
+
+    parser.add_argument(
+        '--profile-admin',
+        action='append', default=[], metavar='USERNAME',
+        help='Slack user allowed to profile the next scan with /watch profile. Can be repeated. Nobody can by default.'
+    )
+
+    parser.add_argument(
+        '--sqdc-url',
+        default='https://www.sqdc.ca',
+        help='URL of the SQDC website. Point it to a stand-in such as benchmarks/fake_sqdc.py to test offline.'
+    )
+    capture_group = parser.add_mutually_exclusive_group()
+    capture_group.add_argument(
+        '--record-requests',
+        nargs='?', type=Path, const=Path('data', 'requests.jsonl'), metavar='FILE',
+        help='Append every request to the SQDC, with its response and timing, to this JSONL file (data/requests.jsonl by default).'
+    )
+    capture_group.add_argument(
+        '--replay-requests',
+        type=Path, metavar='FILE',
+        help='Serve the responses recorded with --record-requests instead of calling the SQDC.'
+    )
+    parser.add_argument(
+        '--replay-speed',
+        default='fast', choices=['fast', 'original'],
+        help='With --replay-requests, respond as fast as possible, or as slowly as when recorded.'
+    )
+
     return parser.parse_args()
 
 
@@ -71,14 +196,12 @@ log_level_table = {
     'critical': logging.CRITICAL
 }
 
-args = parse_args()
-log_test_indicator = ' [TEST] ' if args.test else ''
-coloredlogs.install(level='debug')
-logging.basicConfig(level=log_level_table[args.log_level.lower()],
-                    datefmt='%Y-%m-%d %H:%M:%S',
-                    format='%(levelname)s' + log_test_indicator + ':%(name)s: %(asctime)s - %(message)s')
 
-if args.watch:
+# Modules are imported where they are needed: listing products must not pay for Tornado, bs4, requests, etc.
+def start_watcher(args, stop_event: Event):
+    from sqdc.watcher import SqdcWatcher
+    from sqdc.watcherOptions import WatcherOptions
+
     options = WatcherOptions.default()
     options.slack_post_url = args.slack_post_url
     options.is_test_mode = args.test
@@ -88,26 +211,111 @@ if args.watch:
     options.slack_port = int(args.slack_port)
     options.no_cache = args.no_cache
     options.enable_slack_post = args.enable_slack_post
+    options.spec_refresh_budget = args.spec_refresh_budget
+    options.notification_workers = args.notification_workers
+    options.digest_window = args.digest_window
+    options.adaptive_interval = args.adaptive_interval
+    options.min_interval = args.min_watch_interval
+    options.max_interval = args.max_watch_interval
+    options.full_scan_interval = args.full_scan_interval
+    options.hot_poll_interval = args.hot_poll_interval
+    options.hot_poll_batch_size = args.hot_poll_batch_size
+    options.trace_scans = args.trace_scans
+    options.trace_max_files = args.trace_max_files
+    options.sqdc_url = args.sqdc_url
+    options.record_requests = args.record_requests
+    options.replay_requests = args.replay_requests
+    options.replay_realtime = args.replay_speed == 'original'
+    options.parse_workers = args.parse_workers
+    options.scan_shards = args.scan_shards
+    options.stale_page_fallback = args.stale_page_fallback
+    options.request_rates = dict(args.request_rate)
+    options.max_concurrent_requests = args.max_concurrent_requests
+    options.profile_admins = args.profile_admin
 
-    stop_event = Event()
     watcher = SqdcWatcher(stop_event, options)
     watcher.daemon = True
     watcher.start()
     print('Watcher daemon started')
-else:
-    store = SqdcStore.SqdcStore(args.test)
-    updater = ProductsUpdater(store)
-    products = updater.get_products()
+    return watcher
+
+
+def list_products(args):
+    from sqdc.formatter import SqdcFormatter
+
+    if args.only_from_cache:
+        from sqdc.catalog_snapshot import CatalogSnapshot
+
+        snapshot_file = Path.cwd().joinpath('data', CatalogSnapshot.get_filename(args.test))
+        snapshot = CatalogSnapshot.read(snapshot_file, orm_instances=False)
+        if snapshot is None:
+            print(f'No catalog snapshot found at {snapshot_file}. Run the watcher at least once to create it.')
+        products = snapshot.products if snapshot else []
+    else:
+        from sqdc.SqdcStore import SqdcStore
+        from sqdc.products_updater import ProductsUpdater
+        from sqdc.sqdc_client import SqdcClient
+        from sqdc.http_capture import create_capture_adapter
+        from sqdc.request_limiter import RequestLimiter, RequestLimits, DEFAULT_RATES
+        from sqdc.process_pool import create_process_pool
+
+        store = SqdcStore(args.test)
+        store.initialize()
+        limits = RequestLimits({**DEFAULT_RATES, **dict(args.request_rate)}, args.max_concurrent_requests)
+        sqdc_client = SqdcClient(sqdc_url=args.sqdc_url, limiter=RequestLimiter(limits, stop_event))
+        capture_adapter = create_capture_adapter(args.record_requests, args.replay_requests, args.replay_speed == 'original')
+        if capture_adapter:
+            sqdc_client.use_adapter(capture_adapter)
+        parse_pool = create_process_pool(args.parse_workers) if args.parse_workers > 0 else None
+        updater = ProductsUpdater(store, sqdc_client, stop_event, parse_pool)
+        products = updater.get_products(store.get_products(), use_cached_products=False)
+        if parse_pool:
+            parse_pool.shutdown()
     products_in_stock = [p for p in products if p.is_in_stock()]
     print(SqdcFormatter.format_products(products_in_stock, args.display_format))
 
 
+watcher = None
+stop_event = Event()
+
+
 def on_control_c(signal, frame):
     print('CTRL+C pressed, exiting now.')
     if watcher:
-        stop_event.set()
+        watcher.stop()
+
+
+def on_profile_signal(signal, frame):
+    if watcher:
+        watcher.request_profile()
+
+
+def main():
+    global watcher
+    args = parse_args()
+    log_test_indicator = ' [TEST] ' if args.test else ''
+    if args.watch:
+        import coloredlogs
+
+        coloredlogs.install(level='debug')
+    logging.basicConfig(level=log_level_table[args.log_level.lower()],
+                        datefmt='%Y-%m-%d %H:%M:%S',
+                        format='%(levelname)s' + log_test_indicator + ':%(name)s: %(asctime)s - %(message)s')
+
+    if args.watch:
+        watcher = start_watcher(args, stop_event)
+    else:
+        list_products(args)
 
+    signal.signal(signal.SIGINT, on_control_c)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, on_profile_signal)
 
-signal.signal(signal.SIGINT, on_control_c)
+    # The watcher thread is a daemon: wait for it here. With a timeout, so the signals are still handled.
+    while watcher and watcher.is_alive():
+        watcher.join(1)
 
 
+# The worker processes (--parse-workers, --scan-shards) import this module: only run from the command line.
+if __name__ == '__main__':
+    main()
@@ -20,7 +20,9 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-fileConfig(config.config_file_name)
+# Without one, as in the migration tests, the logging configuration of the caller is kept.
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -34,6 +36,11 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+# The product search index (and its FTS5 shadow tables) is not part of the ORM metadata.
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == 'table' and name.startswith('products_fts'))
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -70,7 +77,7 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
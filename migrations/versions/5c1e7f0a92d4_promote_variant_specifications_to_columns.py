@@ -0,0 +1,79 @@
+"""promote frequently used variant specifications to typed columns
+
+Revision ID: 5c1e7f0a92d4
+Revises: 3753c981d83f
+Create Date: 2026-10-19 09:12:31.402117
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+from sqlalchemy import Column, FLOAT, VARCHAR
+
+revision = '5c1e7f0a92d4'
+down_revision = '3753c981d83f'
+branch_labels = None
+depends_on = None
+
+# specification key => (column name, type, indexed)
+PROMOTED_COLUMNS = {
+    'GramEquivalent': ('gram_equivalent', FLOAT, True),
+    'Strain': ('strain', VARCHAR, True),
+    'CannabisType': ('cannabis_type', VARCHAR, True),
+    'THCContentMin': ('thc_min', FLOAT, False),
+    'THCContentMax': ('thc_max', FLOAT, False),
+    'CBDContentMin': ('cbd_min', FLOAT, False),
+    'CBDContentMax': ('cbd_max', FLOAT, False),
+    'UnitOfMeasureThcCbd': ('unit_of_measure_thc_cbd', VARCHAR, False),
+    'ProducerName': ('producer_name', VARCHAR, True),
+    'LevelTwoCategory': ('level_two_category', VARCHAR, True)
+}
+
+
+def upgrade():
+    for column_name, column_type, indexed in PROMOTED_COLUMNS.values():
+        op.add_column('product_variants', Column(column_name, column_type))
+        if indexed:
+            op.create_index(f'ix_product_variants_{column_name}', 'product_variants', [column_name])
+
+    backfill_promoted_columns()
+
+
+def backfill_promoted_columns():
+    connection = op.get_bind()
+    variants_table = sa.table('product_variants',
+                              sa.column('id'),
+                              sa.column('product_id'),
+                              *[sa.column(column_name) for column_name, _, _ in PROMOTED_COLUMNS.values()])
+
+    rows = connection.execute(sa.text('SELECT id, product_id, specifications FROM product_variants WHERE specifications IS NOT NULL')).fetchall()
+    for variant_id, product_id, raw_specifications in rows:
+        specifications = json.loads(raw_specifications) if isinstance(raw_specifications, str) else raw_specifications
+        if not specifications:
+            continue
+
+        values = {}
+        for key, (column_name, column_type, _) in PROMOTED_COLUMNS.items():
+            value = specifications.get(key)
+            if value is not None and column_type is FLOAT:
+                try:
+                    value = float(value)
+                except ValueError:
+                    value = None
+            values[column_name] = value
+
+        connection.execute(variants_table.update()
+                           .where(variants_table.c.id == variant_id)
+                           .where(variants_table.c.product_id == product_id)
+                           .values(**values))
+
+
+def downgrade():
+    with op.batch_alter_table('product_variants') as batch_op:
+        for column_name, _, indexed in PROMOTED_COLUMNS.values():
+            if indexed:
+                batch_op.drop_index(f'ix_product_variants_{column_name}')
+            batch_op.drop_column(column_name)
@@ -0,0 +1,27 @@
+"""add the product_variants.spec_hash foreign key to spec_blobs
+
+Revision ID: 6b2f9c41d8e5
+Revises: d5b83e1f47a2
+Create Date: 2026-10-19 15:02:44.106382
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '6b2f9c41d8e5'
+down_revision = 'd5b83e1f47a2'
+branch_labels = None
+depends_on = None
+
+CONSTRAINT_NAME = 'fk_product_variants_spec_hash_spec_blobs'
+
+
+# SQLite cannot add a constraint to an existing table: the batch operations rebuild it.
+def upgrade():
+    with op.batch_alter_table('product_variants') as batch_op:
+        batch_op.create_foreign_key(CONSTRAINT_NAME, 'spec_blobs', ['spec_hash'], ['hash'])
+
+
+def downgrade():
+    with op.batch_alter_table('product_variants') as batch_op:
+        batch_op.drop_constraint(CONSTRAINT_NAME, type_='foreignkey')
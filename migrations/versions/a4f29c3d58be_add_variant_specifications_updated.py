@@ -0,0 +1,28 @@
+"""add product_variants.specifications_updated
+
+Revision ID: a4f29c3d58be
+Revises: e83b4d6a1f07
+Create Date: 2026-10-19 11:26:52.880341
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+from sqlalchemy import Column, DATETIME
+
+revision = 'a4f29c3d58be'
+down_revision = 'e83b4d6a1f07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # left empty on purpose: variants that were never refreshed are the first ones to be refreshed.
+    op.add_column('product_variants', Column('specifications_updated', DATETIME))
+    op.create_index('ix_product_variants_specifications_updated', 'product_variants', ['specifications_updated'])
+
+
+def downgrade():
+    with op.batch_alter_table('product_variants') as batch_op:
+        batch_op.drop_index('ix_product_variants_specifications_updated')
+        batch_op.drop_column('specifications_updated')
@@ -0,0 +1,29 @@
+"""add the products_fts full-text search index
+
+Revision ID: c81e5a7d3b20
+Revises: a4f29c3d58be
+Create Date: 2026-10-19 11:52:14.204118
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c81e5a7d3b20'
+down_revision = 'a4f29c3d58be'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE VIRTUAL TABLE IF NOT EXISTS products_fts '
+               'USING fts5(product_id UNINDEXED, title, brand, strain, producer, category, tokenize = "unicode61 remove_diacritics 2")')
+    op.execute('DELETE FROM products_fts')
+    op.execute('INSERT INTO products_fts (product_id, title, brand, strain, producer, category) '
+               'SELECT p.id, p.title, p.brand, group_concat(DISTINCT v.strain), coalesce(p.producer_name, max(v.producer_name)), '
+               'coalesce(p.category, max(v.level_two_category)) '
+               'FROM products p LEFT JOIN product_variants v ON v.product_id = p.id '
+               'GROUP BY p.id')
+
+
+def downgrade():
+    op.execute('DROP TABLE products_fts')
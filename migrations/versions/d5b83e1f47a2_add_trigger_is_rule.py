@@ -0,0 +1,26 @@
+"""add triggers.is_rule
+
+Revision ID: d5b83e1f47a2
+Revises: c81e5a7d3b20
+Create Date: 2026-10-19 12:31:08.517203
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+from sqlalchemy import Column, BOOLEAN, false
+
+revision = 'd5b83e1f47a2'
+down_revision = 'c81e5a7d3b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the existing triggers are plain keywords: "3.5g" or "Pink, Kush" keep matching as a whole.
+    op.add_column('triggers', Column('is_rule', BOOLEAN, nullable=False, server_default=false()))
+
+
+def downgrade():
+    with op.batch_alter_table('triggers') as batch_op:
+        batch_op.drop_column('is_rule')
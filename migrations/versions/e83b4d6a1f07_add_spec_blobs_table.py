@@ -0,0 +1,65 @@
+"""move variant specifications to the content-addressed spec_blobs table
+
+Revision ID: e83b4d6a1f07
+Revises: 5c1e7f0a92d4
+Create Date: 2026-10-19 10:41:07.518364
+
+"""
+import hashlib
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e83b4d6a1f07'
+down_revision = '5c1e7f0a92d4'
+branch_labels = None
+depends_on = None
+
+
+def compute_hash(specifications):
+    canonical_json = json.dumps(specifications, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical_json.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    spec_blobs_table = op.create_table('spec_blobs',
+                                       sa.Column('hash', sa.VARCHAR(length=64), primary_key=True),
+                                       sa.Column('specifications', sa.JSON(), nullable=False),
+                                       sa.Column('created', sa.DATETIME())
+                                       )
+    op.add_column('product_variants', sa.Column('spec_hash', sa.VARCHAR(length=64)))
+    op.create_index('ix_product_variants_spec_hash', 'product_variants', ['spec_hash'])
+
+    connection = op.get_bind()
+    variants_table = sa.table('product_variants', sa.column('id'), sa.column('product_id'), sa.column('spec_hash'))
+    rows = connection.execute(sa.text('SELECT id, product_id, specifications FROM product_variants WHERE specifications IS NOT NULL')).fetchall()
+    blobs = {}
+    for variant_id, product_id, raw_specifications in rows:
+        specifications = json.loads(raw_specifications) if isinstance(raw_specifications, str) else raw_specifications
+        if not specifications:
+            continue
+
+        spec_hash = compute_hash(specifications)
+        blobs[spec_hash] = specifications
+        connection.execute(variants_table.update()
+                           .where(variants_table.c.id == variant_id)
+                           .where(variants_table.c.product_id == product_id)
+                           .values(spec_hash=spec_hash))
+
+    if len(blobs) > 0:
+        op.bulk_insert(spec_blobs_table, [{'hash': h, 'specifications': s} for h, s in blobs.items()])
+
+    with op.batch_alter_table('product_variants') as batch_op:
+        batch_op.drop_column('specifications')
+
+
+def downgrade():
+    op.add_column('product_variants', sa.Column('specifications', sa.JSON()))
+    op.execute('UPDATE product_variants SET specifications = '
+               '(SELECT specifications FROM spec_blobs WHERE spec_blobs.hash = product_variants.spec_hash)')
+    with op.batch_alter_table('product_variants') as batch_op:
+        batch_op.drop_index('ix_product_variants_spec_hash')
+        batch_op.drop_column('spec_hash')
+    op.drop_table('spec_blobs')
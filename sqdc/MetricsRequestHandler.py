@@ -0,0 +1,10 @@
+import tornado.web
+
+from sqdc.metrics import REGISTRY
+
+
+class MetricsRequestHandler(tornado.web.RequestHandler):
+
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.write(REGISTRY.render())
@@ -4,6 +4,10 @@ import tornado.web
 
 from sqdc.SqdcStore import SqdcStore
 from sqdc.commandParser import CommandParser
+from sqdc.exceptions import InvalidRuleError
+from sqdc.formatter import SqdcFormatter
+
+SEARCH_RESULTS_LIMIT = 10
 
 
 class SlackRequestHandler(tornado.web.RequestHandler):
@@ -34,17 +38,42 @@ class SlackRequestHandler(tornado.web.RequestHandler):
 
         elif command.verb == 'add':
             keyword = command.args[0]
+            try:
+                CommandParser.parse_rule(keyword, username)
+            except InvalidRuleError as e:
+                self.write('Could not add *{}*: {}.'.format(keyword, e.reason))
+                return
             was_added = self.store.add_watch_keyword(username, keyword)
             if was_added:
+                self.watcher.invalidate_notification_rules()
                 self.write('*{}* keyword added. You will receive a notification whenever a match is found in new products.'
                            .format(keyword))
             else:
                 self.write('Keyword *{}* is already registered.'.format(keyword))
 
+        elif command.verb == 'search':
+            search = command.args[0]
+            products = self.store.search_products(search, SEARCH_RESULTS_LIMIT)
+            if len(products) == 0:
+                self.write('No product in stock matches *{}*.'.format(search))
+            else:
+                response = '*{} in stock matching {}:*\n'.format(len(products), search)
+                response += '\n'.join(['- ' + SqdcFormatter.format_product(p) for p in products])
+                self.write(response)
+
+        elif command.verb == 'profile':
+            if not self.watcher.is_profile_admin(username):
+                self.write('Only the administrators of the watcher can profile the scans.')
+            elif self.watcher.request_profile(username):
+                self.write('The next scan will be profiled. You will receive its hotspots and largest allocation sites.')
+            else:
+                self.write('A scan is already being profiled, or about to be. Try again after it.')
+
         elif command.verb == 'delete':
             keyword = command.args[0]
             was_deleted = self.store.delete_trigger(username, keyword)
             if was_deleted:
+                self.watcher.invalidate_notification_rules()
                 self.write('Keyword *{}* was removed.'.format(keyword))
             else:
                 self.write('Could not delete *{}* because it was not registered.'.format(keyword))
@@ -2,12 +2,15 @@ import datetime
 import logging
 import string
 from pathlib import Path
-from typing import List
+from typing import List, Dict
 
 from sqlalchemy import create_engine, func
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
+from sqdc.catalog_snapshot import CatalogSnapshot
 from sqdc.dataobjects.app_state import AppState
 from sqdc.dataobjects.base import Base
 from sqdc.dataobjects.product import Product as Product
@@ -15,8 +18,11 @@ from sqdc.dataobjects.product_history import ProductHistory
 from sqdc.dataobjects.product_variant import ProductVariant
 from sqdc.dataobjects.productevent import ProductEvent
 from sqdc.dataobjects.sessionwrapper import SessionWrapper
+from sqdc.dataobjects.spec_blob import SpecBlob
 from sqdc.dataobjects.trigger import Trigger
-from sqdc.logic.product_calculator import find_by_id
+from sqdc.metrics import instrument_engine
+from sqdc.product_search import create_search_index, update_search_index, search_in_stock_product_ids
+from sqdc.tracing import trace_public_methods
 
 log = logging.getLogger(__name__)
 
@@ -25,6 +31,7 @@ sqlalchemy_logger = logging.getLogger('sqlalchemy.engine')
 # sqlalchemy_logger.setLevel(logging.INFO)
 
 
+@trace_public_methods('store', exclude=['open_session'])
 class SqdcStore:
     engine: Engine
     session_maker: sessionmaker
@@ -39,7 +46,9 @@ class SqdcStore:
 
         test_suffix = '-test' if is_test else ''
         self.sqlite_db = self.dir.joinpath(f'data{test_suffix}.db')
+        self.snapshot_file = self.dir.joinpath(CatalogSnapshot.get_filename(is_test))
         self.db_url = 'sqlite+pysqlite:///' + self.sqlite_db.as_posix()
+        self.is_search_available = False
 
     def open_session(self) -> SessionWrapper:
         return SessionWrapper(self.session_maker(expire_on_commit=False))
@@ -48,17 +57,93 @@ class SqdcStore:
 
         print('connecting to database: ' + self.db_url)
         self.engine = create_engine(self.db_url)
+        instrument_engine(self.engine)
         self.session_maker = sessionmaker(bind=self.engine)
 
         Base.metadata.create_all(self.engine)
+        try:
+            with self.engine.begin() as connection:
+                create_search_index(connection)
+            self.is_search_available = True
+        except OperationalError as e:
+            log.warning(f'Product search is disabled, this SQLite has no FTS5 support: {e}')
+
+    # Returns the saved products, as they are now in the database.
+    def save_products(self, products: List[Product]) -> List[Product]:
+        if len(products) == 0:
+            return []
 
-    def save_products(self, products: List[Product]):
-        if len(products) > 0:
-            with self.open_session() as session:
-                for p in products:
-                    session.merge(p)
+        with self.open_session() as session:
+            self._add_new_spec_blobs(session, [v for p in products for v in p.variants])
+            saved_products = [session.merge(p) for p in products]
+            self._update_search_index(session, [p.id for p in products])
 
-                session.commit()
+            session.commit()
+            # merge does not populate the variants back-reference of newly inserted variants
+            for p in saved_products:
+                for v in p.variants:
+                    set_committed_value(v, 'product', p)
+            return saved_products
+
+    # Returns the saved variants, as they are now in the database.
+    def save_variants(self, variants: List[ProductVariant]) -> List[ProductVariant]:
+        if len(variants) == 0:
+            return []
+
+        with self.open_session() as session:
+            self._add_new_spec_blobs(session, variants)
+            saved_variants = [session.merge(v) for v in variants]
+            self._update_search_index(session, [v.product_id for v in variants])
+
+            session.commit()
+            return saved_variants
+
+    # The category, cannabis type and producer of a product come from the specifications of its variants, as in
+    # ProductsUpdater.populate_products_variants_details. Returns the updated products, without their variants.
+    def update_products_classification(self, variants: List[ProductVariant]) -> List[Product]:
+        if len(variants) == 0:
+            return []
+
+        with self.open_session() as session:
+            products = {}
+            for v in variants:
+                product = products.get(v.product_id) or session.query(Product).filter(Product.id == v.product_id).one_or_none()
+                if product is None:
+                    continue
+                product.category = v.level_two_category
+                product.cannabis_type = v.cannabis_type
+                product.producer_name = v.producer_name
+                products[product.id] = product
+            self._update_search_index(session, list(products.keys()))
+
+            session.commit()
+            return list(products.values())
+
+    @staticmethod
+    def _add_new_spec_blobs(session: Session, variants: List[ProductVariant]):
+        new_blobs = {v.new_spec_blob.hash: v.new_spec_blob for v in variants if v.new_spec_blob}
+        if len(new_blobs) == 0:
+            return
+
+        existing_hashes = {h for (h,) in session.query(SpecBlob.hash).filter(SpecBlob.hash.in_(new_blobs.keys()))}
+        session.add_all([SpecBlob(hash=h, specifications=blob.specifications)
+                         for h, blob in new_blobs.items()
+                         if h not in existing_hashes])
+
+    def _update_search_index(self, session: Session, product_ids: List[str]):
+        if self.is_search_available:
+            session.flush()
+            update_search_index(session.connection(), product_ids)
+
+    # The in-stock products matching all the words of the search, best matches first.
+    def search_products(self, search: str, limit: int) -> List[Product]:
+        if not self.is_search_available:
+            return []
+        with self.open_session() as session:
+            product_ids = search_in_stock_product_ids(session.connection(), search, limit)
+            products = session.query(Product).filter(Product.id.in_(product_ids)).all()
+            rank = {product_id: i for i, product_id in enumerate(product_ids)}
+            return sorted(products, key=lambda p: rank[p.id])
 
     def add_product_history_entries(self, entries: List[ProductHistory]):
         with self.open_session() as session:
@@ -78,6 +163,21 @@ class SqdcStore:
         with self.open_session() as session:
             return self._get_variant(product_id, variant_id, session)
 
+    def get_variant_specifications(self, product_id: string, variant_id: string) -> Dict[str, str]:
+        with self.open_session() as session:
+            return session.query(SpecBlob.specifications)\
+                .join(ProductVariant, ProductVariant.spec_hash == SpecBlob.hash)\
+                .filter(ProductVariant.product_id == product_id, ProductVariant.id == variant_id)\
+                .scalar()
+
+    def get_variants_with_oldest_specifications(self, limit: int) -> List[ProductVariant]:
+        with self.open_session() as session:
+            return session.query(ProductVariant)\
+                .filter(ProductVariant.spec_hash.isnot(None))\
+                .order_by(ProductVariant.specifications_updated)\
+                .limit(limit)\
+                .all()
+
     def get_variant_history(self, product_id, variant_id):
         with self.open_session() as session:
             return session.query(ProductHistory)\
@@ -92,11 +192,29 @@ class SqdcStore:
                 .order_by(ProductHistory.timestamp.desc())\
                 .first()
 
-    def mark_products_notified(self, products: List[Product]):
+    def get_restock_timestamps(self, since: datetime.datetime) -> List[datetime.datetime]:
+        with self.open_session() as session:
+            rows = session.query(ProductHistory.timestamp)\
+                .filter(ProductHistory.event == ProductEvent.IN_STOCK.name.lower(), ProductHistory.timestamp >= since)\
+                .all()
+            return [row.timestamp for row in rows]
+
+    def get_restock_counts(self, since: datetime.datetime) -> Dict[str, int]:
         with self.open_session() as session:
-            for p in [p for p in session.query(Product).all() if find_by_id(products, p)]:
+            rows = session.query(ProductHistory.variant_id, func.count())\
+                .filter(ProductHistory.event == ProductEvent.IN_STOCK.name.lower(), ProductHistory.timestamp >= since)\
+                .group_by(ProductHistory.variant_id)\
+                .all()
+            return {str(variant_id): count for variant_id, count in rows}
+
+    # Returns the updated products.
+    def mark_products_notified(self, products: List[Product]) -> List[Product]:
+        with self.open_session() as session:
+            notified_products = session.query(Product).filter(Product.id.in_([p.id for p in products])).all()
+            for p in notified_products:
                 p.last_in_stock_notification = datetime.datetime.now()
             session.commit()
+            return notified_products
 
     @staticmethod
     def _get_variant(product_id, variant_id, session: Session):
@@ -108,7 +226,9 @@ class SqdcStore:
 
     def get_products_last_saved_timestamp(self):
         with self.open_session() as session:
-            result = session.query(func.max(Product.last_updated)).scalar()
+            result = max(filter(None, [session.query(func.max(Product.last_updated)).scalar(),
+                                       session.query(func.max(ProductVariant.last_updated)).scalar()]),
+                         default=None)
             if not result:
                 result = datetime.datetime.now()
             return result
@@ -120,7 +240,7 @@ class SqdcStore:
             if trigger is not None:
                 return False
 
-            trigger = Trigger(username=username, keyword=keyword)
+            trigger = Trigger(username=username, keyword=keyword, is_rule=True)
             session.add(trigger)
             session.commit()
             return True
@@ -147,12 +267,18 @@ class SqdcStore:
     def update_last_scan_timestamp(self, last_scan_timestamp):
         with self.open_session() as session:
             state = session.query(AppState).first()
+            if state is None:
+                state = AppState()
+                session.add(state)
             state.last_scan_timestamp = last_scan_timestamp
             session.commit()
 
-    @staticmethod
-    def get_all_notification_rules():
-        return {}
+    def get_all_notification_rules(self) -> Dict[str, List[Trigger]]:
+        with self.open_session() as session:
+            rules = {}
+            for trigger in session.query(Trigger).order_by(Trigger.username, Trigger.keyword):
+                rules.setdefault(trigger.username, []).append(trigger)
+            return rules
 
     @staticmethod
     def _get_notification_rule(session: Session, username: string, keyword: string):
@@ -0,0 +1,198 @@
+import json
+import logging
+import mmap
+import os
+import struct
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from sqdc.dataobjects.product_mixins import ProductMixin, ProductVariantMixin
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'SQDCSNAP'
+SNAPSHOT_VERSION = 1
+
+# magic, version, reserved, created timestamp, products count, variants count, schema length
+HEADER_FORMAT = '<8sHHdIII'
+
+TYPE_STRING = 's'
+TYPE_FLOAT = 'f'
+TYPE_BOOLEAN = 'b'
+TYPE_DATETIME = 't'
+
+
+class SnapshotProduct(ProductMixin):
+    def __init__(self, **columns):
+        self.__dict__.update(columns)
+        self.variants = []
+
+
+class SnapshotProductVariant(ProductVariantMixin):
+    def __init__(self, **columns):
+        self.__dict__.update(columns)
+        self.product = None
+
+
+# Columnar, versioned binary copy of the products catalog, written after each scan.
+# Every column of the products and product_variants tables is stored as a null mask followed by
+# either a float64 array (floats, datetimes), a byte array (booleans) or offsets + utf-8 data (strings).
+# SQLAlchemy is only imported when writing, or when reading ORM instances: see SnapshotProduct.
+class CatalogSnapshot:
+    def __init__(self, products: list, created: datetime):
+        self.products = products
+        self.created = created
+
+    @staticmethod
+    def get_filename(is_test: bool) -> str:
+        test_suffix = '-test' if is_test else ''
+        return f'catalog{test_suffix}.snapshot'
+
+    @staticmethod
+    def write(path: Path, products: list):
+        from sqdc.dataobjects.product import Product
+        from sqdc.dataobjects.product_variant import ProductVariant
+
+        variants = [v for p in products for v in p.variants]
+        schema = {
+            'products': CatalogSnapshot.get_schema(Product),
+            'product_variants': CatalogSnapshot.get_schema(ProductVariant)
+        }
+        schema_json = json.dumps(schema).encode('utf-8')
+
+        content = bytearray(struct.pack(HEADER_FORMAT, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, datetime.now().timestamp(),
+                                        len(products), len(variants), len(schema_json)))
+        content += schema_json
+        for name, type_code in schema['products']:
+            CatalogSnapshot._align(content)
+            content += CatalogSnapshot.encode_column([getattr(p, name) for p in products], type_code)
+        for name, type_code in schema['product_variants']:
+            CatalogSnapshot._align(content)
+            content += CatalogSnapshot.encode_column([getattr(v, name) for v in variants], type_code)
+
+        temp_path = path.with_suffix('.tmp')
+        temp_path.write_bytes(content)
+        os.replace(temp_path, path)
+        log.debug(f'Catalog snapshot written to {path}: {len(products)} products, {len(content)} bytes')
+
+    # With orm_instances=False, the products are SnapshotProduct instances: they can be formatted, not saved.
+    @staticmethod
+    def read(path: Path, orm_instances=True) -> Optional['CatalogSnapshot']:
+        if not path.is_file() or path.stat().st_size == 0:
+            return None
+
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, version, _, created, nb_products, nb_variants, schema_length = struct.unpack_from(HEADER_FORMAT, mapped)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                log.warning(f'Ignoring catalog snapshot {path}: unsupported format')
+                return None
+
+            offset = struct.calcsize(HEADER_FORMAT)
+            schema = json.loads(mapped[offset:offset + schema_length].decode('utf-8'))
+            offset += schema_length
+            if orm_instances:
+                from sqdc.dataobjects.product import Product
+                from sqdc.dataobjects.product_variant import ProductVariant
+
+                product_model, variant_model = Product, ProductVariant
+                if schema['products'] != CatalogSnapshot.get_schema(Product) \
+                        or schema['product_variants'] != CatalogSnapshot.get_schema(ProductVariant):
+                    log.warning(f'Ignoring catalog snapshot {path}: it was written with a different schema')
+                    return None
+            else:
+                product_model, variant_model = SnapshotProduct, SnapshotProductVariant
+
+            products_columns = {}
+            for name, type_code in schema['products']:
+                offset = CatalogSnapshot._aligned(offset)
+                products_columns[name], offset = CatalogSnapshot.decode_column(mapped, offset, nb_products, type_code)
+            variants_columns = {}
+            for name, type_code in schema['product_variants']:
+                offset = CatalogSnapshot._aligned(offset)
+                variants_columns[name], offset = CatalogSnapshot.decode_column(mapped, offset, nb_variants, type_code)
+
+        products = CatalogSnapshot._build_objects(product_model, products_columns, nb_products)
+        variants = CatalogSnapshot._build_objects(variant_model, variants_columns, nb_variants)
+        variants_by_product = {p.id: [] for p in products}
+        for v in variants:
+            variants_by_product[v.product_id].append(v)
+
+        set_value = setattr
+        if orm_instances:
+            from sqlalchemy.orm.attributes import set_committed_value as set_value
+        for p in products:
+            set_value(p, 'variants', variants_by_product[p.id])
+            for v in p.variants:
+                set_value(v, 'product', p)
+
+        return CatalogSnapshot(products, datetime.fromtimestamp(created))
+
+    @staticmethod
+    def get_schema(model) -> List[List[str]]:
+        return [[c.key, CatalogSnapshot.get_type_code(c.type)] for c in model.__table__.columns]
+
+    @staticmethod
+    def get_type_code(column_type) -> str:
+        from sqlalchemy import Boolean, DateTime, Float
+
+        if isinstance(column_type, Float):
+            return TYPE_FLOAT
+        elif isinstance(column_type, Boolean):
+            return TYPE_BOOLEAN
+        elif isinstance(column_type, DateTime):
+            return TYPE_DATETIME
+        return TYPE_STRING
+
+    @staticmethod
+    def encode_column(values: list, type_code: str) -> bytes:
+        null_mask = bytes(1 if v is None else 0 for v in values)
+        if type_code == TYPE_STRING:
+            encoded_values = [b'' if v is None else str(v).encode('utf-8') for v in values]
+            offsets = array('I', [0])
+            for v in encoded_values:
+                offsets.append(offsets[-1] + len(v))
+            return null_mask + offsets.tobytes() + b''.join(encoded_values)
+        elif type_code == TYPE_BOOLEAN:
+            return null_mask + bytes(1 if v else 0 for v in values)
+        elif type_code == TYPE_DATETIME:
+            return null_mask + array('d', [0 if v is None else v.timestamp() for v in values]).tobytes()
+        else:
+            return null_mask + array('d', [0 if v is None else v for v in values]).tobytes()
+
+    @staticmethod
+    def decode_column(buffer, offset: int, count: int, type_code: str):
+        null_mask = buffer[offset:offset + count]
+        offset += count
+        if type_code == TYPE_STRING:
+            offsets = array('I')
+            offsets.frombytes(buffer[offset:offset + (count + 1) * 4])
+            offset += (count + 1) * 4
+            data = buffer[offset:offset + offsets[-1]]
+            values = [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)]
+            offset += offsets[-1]
+        elif type_code == TYPE_BOOLEAN:
+            values = [b == 1 for b in buffer[offset:offset + count]]
+            offset += count
+        else:
+            values = array('d')
+            values.frombytes(buffer[offset:offset + count * 8])
+            offset += count * 8
+            if type_code == TYPE_DATETIME:
+                values = [datetime.fromtimestamp(v) for v in values]
+
+        return [None if null_mask[i] else values[i] for i in range(count)], offset
+
+    @staticmethod
+    def _build_objects(model, columns: dict, count: int) -> list:
+        names = list(columns.keys())
+        return [model(**{name: columns[name][i] for name in names}) for i in range(count)]
+
+    @staticmethod
+    def _aligned(offset: int) -> int:
+        return (offset + 7) // 8 * 8
+
+    @staticmethod
+    def _align(content: bytearray):
+        content += bytes(CatalogSnapshot._aligned(len(content)) - len(content))
@@ -1,6 +1,26 @@
+from sqdc.exceptions import InvalidRuleError
+from sqdc.notificationRule import NotificationRule, RuleCondition, DISCRETE_ATTRIBUTES
 from sqdc.slackWatchCommand import SlackWatchCommand
 import re
 
+RULE_ATTRIBUTES = {
+    'category': 'category',
+    'type': 'cannabis_type',
+    'cannabis_type': 'cannabis_type',
+    'producer': 'producer_name',
+    'producer_name': 'producer_name',
+    'price': 'price',
+    'price_per_gram': 'price_per_gram',
+    'ppg': 'price_per_gram',
+    'thc': 'thc',
+    'cbd': 'cbd',
+    'format': 'gram_equivalent',
+    'grams': 'gram_equivalent'
+}
+
+CONDITION_REGEX = re.compile(r'^([a-z_]+)\s*(<=|>=|=|<|>)\s*(.+)$', re.IGNORECASE)
+FORMAT_REGEX = re.compile(r'^(\d+(?:\.\d+)?)\s*g(?:\s+format)?$', re.IGNORECASE)
+
 
 class CommandParser:
     @staticmethod
@@ -10,13 +30,19 @@ class CommandParser:
 
         add_match = re.compile('^add (.+)$').match(args)
         delete_match = re.compile('^(delete|del) (.+)$').match(args)
+        profile_match = re.compile('^profile( next)?$').match(args)
+        search_match = re.compile('^search (.+)$').match(args)
         if args == "":
             return SlackWatchCommand(verb='list')
+        elif profile_match:
+            return SlackWatchCommand(verb='profile')
         elif add_match:
             args_array = [
                 CommandParser.strip_arg(add_match.group(1))
             ]
             return SlackWatchCommand(verb='add', args=args_array)
+        elif search_match:
+            return SlackWatchCommand(verb='search', args=[CommandParser.strip_arg(search_match.group(1))])
         elif delete_match:
             args_array = [
                 CommandParser.strip_arg(delete_match.group(2))
@@ -28,3 +54,43 @@ class CommandParser:
     @staticmethod
     def strip_arg(arg: str):
         return arg.strip().strip('"\'')
+
+    # Parses a rule such as "category=Dried flowers, type=Indica, price_per_gram < 8, THC >= 20, 3.5g format".
+    # Clauses are separated by commas; a clause that is not a condition is a keyword, matched in the title and strain.
+    @staticmethod
+    def parse_rule(rule: str, username: str) -> NotificationRule:
+        conditions = []
+        keywords = []
+        for clause in (c.strip() for c in rule.split(',')):
+            if clause == '':
+                continue
+            format_match = FORMAT_REGEX.match(clause)
+            condition_match = CONDITION_REGEX.match(clause)
+            if format_match:
+                conditions.append(RuleCondition('gram_equivalent', '=', float(format_match.group(1))))
+            elif condition_match:
+                conditions.append(CommandParser.parse_condition(rule, *condition_match.groups()))
+            elif re.search('[<>=]', clause):
+                raise InvalidRuleError(rule, 'could not understand "{}"'.format(clause))
+            else:
+                keywords.append(CommandParser.strip_arg(clause))
+
+        if len(conditions) == 0 and len(keywords) == 0:
+            raise InvalidRuleError(rule, 'the rule is empty')
+        return NotificationRule(rule, username, conditions, keywords)
+
+    @staticmethod
+    def parse_condition(rule: str, name: str, operator: str, value: str) -> RuleCondition:
+        attribute = RULE_ATTRIBUTES.get(name.lower())
+        if attribute is None:
+            raise InvalidRuleError(rule, 'unknown attribute "{}"'.format(name))
+        value = CommandParser.strip_arg(value)
+        if attribute in DISCRETE_ATTRIBUTES:
+            if operator != '=':
+                raise InvalidRuleError(rule, '"{}" can only be compared with ='.format(name))
+            return RuleCondition(attribute, operator, value.lower())
+
+        try:
+            return RuleCondition(attribute, operator, float(value.strip('$%g ')))
+        except ValueError:
+            raise InvalidRuleError(rule, '"{}" is not a number'.format(value))
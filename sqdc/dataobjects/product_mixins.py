@@ -0,0 +1,83 @@
+from typing import List
+
+# Behaviour shared by the ORM products and the products read from a catalog snapshot.
+# This module must not import SQLAlchemy: listing products from the snapshot does not load the ORM.
+
+# Specifications that are read on every scan are stored in their own typed columns,
+# so the full document (in spec_blobs) only needs to be loaded on demand.
+PROMOTED_SPECIFICATIONS = {
+    'GramEquivalent': 'gram_equivalent',
+    'Strain': 'strain',
+    'CannabisType': 'cannabis_type',
+    'THCContentMin': 'thc_min',
+    'THCContentMax': 'thc_max',
+    'CBDContentMin': 'cbd_min',
+    'CBDContentMax': 'cbd_max',
+    'UnitOfMeasureThcCbd': 'unit_of_measure_thc_cbd',
+    'ProducerName': 'producer_name',
+    'LevelTwoCategory': 'level_two_category'
+}
+
+NUMERIC_SPECIFICATIONS = ['GramEquivalent', 'THCContentMin', 'THCContentMax', 'CBDContentMin', 'CBDContentMax']
+
+
+def parse_specification(key: str, raw_value):
+    if raw_value is None or key not in NUMERIC_SPECIFICATIONS:
+        return raw_value
+    try:
+        return float(raw_value)
+    except ValueError:
+        return None
+
+
+class ProductVariantMixin:
+    # Not mapped: set when specifications were just fetched and their blob may not be saved yet.
+    new_spec_blob = None
+
+    def has_specifications(self) -> bool:
+        return self.spec_hash is not None
+
+    def get_specification(self, key):
+        attribute = PROMOTED_SPECIFICATIONS.get(key)
+        if attribute:
+            return getattr(self, attribute)
+        return self.new_spec_blob and self.new_spec_blob.specifications.get(key)
+
+    def __repr__(self):
+        return f'ProductVariant(id={self.id}, product={self.product.title}, in_stock={self.in_stock})'
+
+    def detailed_description(self):
+        return f'ProductVariant(id={self.id}, product={self.product.title}, in_stock={self.in_stock}, spec_hash={self.spec_hash})'
+
+
+class ProductMixin:
+    # Not mapped: set when the product comes from the last known good copy of a search result page that could not be fetched.
+    is_stale = False
+
+    def has_specifications(self) -> bool:
+        return self.find_variant_with_specs() is not None
+
+    def get_specification(self, key) -> str:
+        variant_with_spec = self.find_variant_with_specs()
+        return '' if variant_with_spec is None else variant_with_spec.get_specification(key)
+
+    def find_variant_with_specs(self) -> ProductVariantMixin:
+        return next((v for v in self.variants if v.has_specifications()), None)
+
+    def is_in_stock(self) -> bool:
+        return len(self.get_variants_in_stock()) > 0
+
+    def get_variants_in_stock(self) -> List[ProductVariantMixin]:
+        return [v for v in self.variants if v.in_stock]
+
+    def get_variant(self, variant_id) -> ProductVariantMixin:
+        return next((v for v in self.variants if v.id == variant_id), None)
+
+    def get_property(self, name) -> str:
+        return self.data[name]
+
+    def __repr__(self):
+        return f'id={self.id}, title={self.title}, {self.category}, in_stock={self.in_stock}, brand={self.brand}, {len(self.variants)} : {len(self.get_variants_in_stock())} variants)'
+
+    def get_sorting_key(self):
+        return ('1' if self.is_new else '0') + (self.category or '') + (self.producer_name or '') + (self.brand or '')
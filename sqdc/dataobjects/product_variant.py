@@ -1,12 +1,15 @@
 from datetime import datetime
+from typing import Dict
 
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, JSON, Float
+from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Float
 from sqlalchemy.orm import relationship
 
 from sqdc.dataobjects.base import Base
+from sqdc.dataobjects.product_mixins import ProductVariantMixin, PROMOTED_SPECIFICATIONS, parse_specification
+from sqdc.dataobjects.spec_blob import SpecBlob
 
 
-class ProductVariant(Base):
+class ProductVariant(ProductVariantMixin, Base):
     __tablename__ = 'product_variants'
 
     id = Column(String(50), primary_key=True)
@@ -14,17 +17,43 @@ class ProductVariant(Base):
     created = Column(DateTime, default=datetime.now)
     last_updated = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     in_stock = Column(Boolean)
-    specifications = Column(JSON)
+    spec_hash = Column(String(64), ForeignKey('spec_blobs.hash'), index=True)
+    specifications_updated = Column(DateTime, index=True)
     list_price = Column(Float)
     price = Column(Float)
     price_per_gram = Column(Float)
     quantity_description = Column(String)
     out_of_stock_since = Column(DateTime)
 
-    product = relationship('Product', lazy='subquery', back_populates='variants')
+    gram_equivalent = Column(Float, index=True)
+    strain = Column(String, index=True)
+    cannabis_type = Column(String, index=True)
+    thc_min = Column(Float)
+    thc_max = Column(Float)
+    cbd_min = Column(Float)
+    cbd_max = Column(Float)
+    unit_of_measure_thc_cbd = Column(String)
+    producer_name = Column(String, index=True)
+    level_two_category = Column(String, index=True)
 
-    def __repr__(self):
-        return f'ProductVariant(id={self.id}, product={self.product.title}, in_stock={self.in_stock})'
+    product = relationship('Product', lazy='subquery', back_populates='variants')
 
-    def detailed_description(self):
-        return f'ProductVariant(id={self.id}, product={self.product.title}, in_stock={self.in_stock})\n{self.specifications}'
+    # Returns False when the specifications are identical to the current ones (same content hash).
+    def set_specifications(self, specifications: Dict[str, str]) -> bool:
+        self.specifications_updated = datetime.now()
+        spec_hash = SpecBlob.compute_hash(specifications)
+        if spec_hash == self.spec_hash:
+            return False
+
+        self.spec_hash = spec_hash
+        self.new_spec_blob = SpecBlob(hash=spec_hash, specifications=specifications)
+        for key, attribute in PROMOTED_SPECIFICATIONS.items():
+            setattr(self, attribute, parse_specification(key, specifications.get(key)))
+        return True
+
+    def copy_specifications(self, source: 'ProductVariant'):
+        self.spec_hash = source.spec_hash
+        self.specifications_updated = source.specifications_updated
+        self.new_spec_blob = source.new_spec_blob
+        for attribute in PROMOTED_SPECIFICATIONS.values():
+            setattr(self, attribute, getattr(source, attribute))
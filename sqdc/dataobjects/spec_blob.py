@@ -0,0 +1,24 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import Column, String, DateTime, JSON
+
+from sqdc.dataobjects.base import Base
+
+
+class SpecBlob(Base):
+    __tablename__ = 'spec_blobs'
+
+    hash = Column(String(64), primary_key=True)
+    specifications = Column(JSON, nullable=False)
+    created = Column(DateTime, default=datetime.now)
+
+    @staticmethod
+    def compute_hash(specifications: Dict[str, str]) -> str:
+        canonical_json = json.dumps(specifications, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical_json.encode('utf-8')).hexdigest()
+
+    def __repr__(self):
+        return f'SpecBlob(hash={self.hash})'
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String
+from sqlalchemy import Column, String, Boolean, false
 
 from sqdc.dataobjects.base import Base
 
@@ -7,4 +7,7 @@ class Trigger(Base):
     __tablename__ = 'triggers'
 
     username = Column(String, primary_key=True)
-    keyword = Column(String, primary_key=True)
\ No newline at end of file
+    keyword = Column(String, primary_key=True)
+    # True when the keyword column holds a rule, see CommandParser.parse_rule. The triggers added before rules
+    # existed hold a single keyword, matched as a whole.
+    is_rule = Column(Boolean, nullable=False, default=False, server_default=false())
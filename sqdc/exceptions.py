@@ -12,3 +12,29 @@ class UnsupportedAccountTypeForDownload(RuntimeError):
 
     def __str__(self):
         return 'Transaction download is not supported for account type {!r}'.format(self.account_type)
+
+
+class InvalidRuleError(ValueError):
+    def __init__(self, rule, reason):
+        self.rule = rule
+        self.reason = reason
+
+    def __str__(self):
+        return 'Invalid notification rule {!r}: {}'.format(self.rule, self.reason)
+
+
+class ScanPageError(RuntimeError):
+    def __init__(self, page, reason):
+        self.page = page
+        self.reason = reason
+
+    def __str__(self):
+        return 'Search result page {} could not be fetched: {}'.format(self.page, self.reason)
+
+
+class ScanShardTimeoutError(RuntimeError):
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def __str__(self):
+        return 'A scan shard task did not finish within {}s, its worker processes were terminated'.format(self.timeout)
@@ -1,32 +1,80 @@
 import re
-from typing import List
-
-from babel.dates import format_timedelta
+from collections import OrderedDict
 from datetime import datetime
-from tabulate import tabulate
-
-from sqdc.dataobjects.product import Product
-from sqdc.dataobjects.product_variant import ProductVariant
+from threading import Lock
+from typing import List, TYPE_CHECKING, Callable
 
-tabulate.PRESERVE_WHITESPACE = True
+if TYPE_CHECKING:
+    # the formatter also formats products read from a catalog snapshot, without loading the ORM
+    from sqdc.dataobjects.product import Product
+    from sqdc.dataobjects.product_variant import ProductVariant
 
 TITLE_MAX_WIDTH = 20
 STRAIN_MAX_WIDTH = 25
 SINGLE_BRANDING_MAX_WIDTH = 25
 DUAL_BRANDING_MAX_COMP_WIDTH = 12
 
+# the variant path component of product URLs
+VARIANT_PATH_REGEX = re.compile(r'(.+/\d+-P)(/\d+)')
+
+RENDER_CACHE_MAX_SIZE = 4096
+
+
+# Rendered strings by product id and kind of rendering, with least recently used eviction.
+# An entry is only reused if the product content version is unchanged, see SqdcFormatter.get_content_version
+class RenderCache:
+    def __init__(self, max_size=RENDER_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, product: 'Product', kind: str, render: Callable[[], object]):
+        key = (product.id, kind)
+        version = SqdcFormatter.get_content_version(product)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = render()
+        with self.lock:
+            self.entries[key] = (version, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
 
 class SqdcFormatter:
+    render_cache = RenderCache()
 
     @staticmethod
-    def format_products(products: List[Product], display_format='table'):
+    def format_products(products: List['Product'], display_format='table'):
         if display_format == 'table':
             return SqdcFormatter.build_products_table(products)
         elif display_format == 'list':
             return '\n'.join([SqdcFormatter.format_product(p) for p in products])
 
     @staticmethod
-    def format_product(product: Product):
+    def format_product(product: 'Product'):
+        return SqdcFormatter.render_cache.get_or_render(product, 'product', lambda: SqdcFormatter.render_product(product))
+
+    @staticmethod
+    def render_product(product: 'Product'):
         new_product_prefix = SqdcFormatter.format_new_product_prefix(product)
         display_name = SqdcFormatter.format_name_with_type(product)
         variants_available = SqdcFormatter.format_variants_available(product)
@@ -34,11 +82,11 @@ class SqdcFormatter:
         return f'{new_product_prefix}*{display_name}* / {product.brand} - ({variants_available}) {display_url}'
 
     @staticmethod
-    def format_variants_available(product: Product):
-        variants_in_stock: List[ProductVariant] = sorted(product.get_variants_in_stock(),
-                                                         key=lambda v: float(v.specifications['GramEquivalent']))
+    def format_variants_available(product: 'Product'):
+        variants_in_stock: List['ProductVariant'] = sorted(product.get_variants_in_stock(),
+                                                         key=lambda v: v.gram_equivalent or 0)
         variants_descriptions = ', '.join(
-            [SqdcFormatter.format_variant_quantity(variant.specifications['GramEquivalent']) + f' ${variant.price:.2f}' for variant in
+            [SqdcFormatter.format_variant_quantity(variant.gram_equivalent) + f' ${variant.price:.2f}' for variant in
              variants_in_stock])
         return variants_descriptions
 
@@ -48,7 +96,7 @@ class SqdcFormatter:
         return f'{grams_float}g'
 
     @staticmethod
-    def format_brand_and_supplier(product: Product):
+    def format_brand_and_supplier(product: 'Product'):
         producer_name = product.producer_name
         brand = product.brand
         components = []
@@ -107,7 +155,7 @@ class SqdcFormatter:
             return SqdcFormatter.format_cannabinoid_concentration(product, raw_cbd_min, raw_cbd_max)
 
     @staticmethod
-    def format_thc(product: Product):
+    def format_thc(product: 'Product'):
         if product.has_specifications():
             raw_thc_min = product.get_specification('THCContentMin')
             raw_thc_max = product.get_specification('THCContentMax')
@@ -125,18 +173,21 @@ class SqdcFormatter:
         return formatted_value_or_range
 
     @staticmethod
-    def format_type(product: Product):
+    def format_type(product: 'Product'):
         return product.get_specification('CannabisType')
 
     @staticmethod
     def format_url(product):
         url = product.url.replace('www.', '')
         # remove the variant path component
-        url = re.sub(r'(.+/\d+-P)(/\d+)', r'\1', url)
+        url = VARIANT_PATH_REGEX.sub(r'\1', url)
         return url
 
     @staticmethod
-    def build_products_table(products: List[Product], prepend_with_newline=True):
+    def build_products_table(products: List['Product'], prepend_with_newline=True):
+        import tabulate
+        tabulate.PRESERVE_WHITESPACE = True
+
         grid_fmt = 'fancy_grid'
         headers = [
             '% avail.',
@@ -148,17 +199,31 @@ class SqdcFormatter:
             'formats',
             'URL'
         ]
-        tabulated_data = [
-            [SqdcFormatter.format_availability(p),
-             SqdcFormatter.apply_max_length(p.title, TITLE_MAX_WIDTH),
-             SqdcFormatter.apply_max_length(p.get_specification('Strain'), STRAIN_MAX_WIDTH),
-             SqdcFormatter.format_brand_and_supplier(p),
-             SqdcFormatter.apply_max_length(p.category, 50),
-             SqdcFormatter.format_type(p),
-             SqdcFormatter.format_variants_available(p),
-             SqdcFormatter.format_url(p)] for p in products]
+        tabulated_data = [SqdcFormatter.format_table_row(p) for p in products]
         prefix = '\n' if prepend_with_newline else ''
-        return prefix + tabulate(tabulated_data, headers=headers, tablefmt=grid_fmt) + '\n'
+        # the cells are formatted text: a title made of digits is not a number to right-align
+        return prefix + tabulate.tabulate(tabulated_data, headers=headers, tablefmt=grid_fmt, disable_numparse=True) + '\n'
+
+    @staticmethod
+    def format_table_row(product: 'Product') -> List[str]:
+        return SqdcFormatter.render_cache.get_or_render(product, 'table_row', lambda: [
+            SqdcFormatter.format_availability(product),
+            SqdcFormatter.apply_max_length(product.title, TITLE_MAX_WIDTH),
+            SqdcFormatter.apply_max_length(product.get_specification('Strain'), STRAIN_MAX_WIDTH),
+            SqdcFormatter.format_brand_and_supplier(product),
+            SqdcFormatter.apply_max_length(product.category, 50),
+            SqdcFormatter.format_type(product),
+            SqdcFormatter.format_variants_available(product),
+            SqdcFormatter.format_url(product)])
+
+    # Everything the renderings depend on. The variant specification columns are covered by spec_hash,
+    # and the availability duration is only displayed with an hour granularity.
+    @staticmethod
+    def get_content_version(product: 'Product') -> tuple:
+        hours_since_created = product.created and int((datetime.now() - product.created).total_seconds() // 3600)
+        return (product.title, product.url, product.brand, product.category, product.cannabis_type, product.producer_name,
+                product.is_new, product.availability_stats, hours_since_created,
+                tuple((v.id, v.in_stock, v.price, v.spec_hash) for v in product.variants))
 
     @staticmethod
     def trim_zeros(text):
@@ -171,7 +236,8 @@ class SqdcFormatter:
     @staticmethod
     def format_availability(product):
         if product.availability_stats:
+            from babel.dates import format_timedelta
             delta = format_timedelta(datetime.now() - product.created, granularity='hour')
-            availability_percent = str(round(product.availability_stats)).rjust(3, ' ')
+            availability_percent = str(round(float(product.availability_stats))).rjust(3, ' ')
             availability = f'|{availability_percent}%'
             return f'{availability} ({delta})'
@@ -0,0 +1,53 @@
+import logging
+import traceback
+from threading import Thread, Event
+from typing import Callable, List
+
+from sqdc.logic.hot_set import HotSet
+from sqdc.request_limiter import RequestAbortedError
+from sqdc.sqdc_client import SqdcClient
+
+log = logging.getLogger(__name__)
+
+
+# Checks the availability of the hot set variants every few seconds, between scans.
+# When some are back in stock, on_restock is called: the watcher then scans right away.
+class HotSetPoller(Thread):
+    hot_set: HotSet
+    sqdc_client: SqdcClient
+
+    def __init__(self, hot_set: HotSet, sqdc_client: SqdcClient, stop_event: Event, on_restock: Callable[[List[str]], None],
+                 interval: float, batch_size: int):
+        Thread.__init__(self, name='hot-set-poller', daemon=True)
+        self.hot_set = hot_set
+        self.sqdc_client = sqdc_client
+        self.stop_event = stop_event
+        self.on_restock = on_restock
+        self.interval = interval
+        self.batch_size = batch_size
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except RequestAbortedError:
+                break
+            except:
+                log.error('hot set polling encountered an error:')
+                log.error(traceback.format_exc())
+
+    def poll(self) -> List[str]:
+        variant_ids = self.hot_set.get_variants_to_poll()
+        restocked = []
+        for start in range(0, len(variant_ids), self.batch_size):
+            if self.stop_event.is_set():
+                return restocked
+            batch = variant_ids[start:start + self.batch_size]
+            in_stock = set(str(sku) for sku in self.sqdc_client.api_find_inventory_items(batch))
+            restocked += [variant_id for variant_id in batch if str(variant_id) in in_stock]
+
+        if len(restocked) > 0:
+            log.info(f'Hot set: {len(restocked)} variants back in stock, scanning now: {", ".join(str(v) for v in restocked)}')
+            self.hot_set.mark_in_stock(restocked)
+            self.on_restock(restocked)
+        return restocked
@@ -0,0 +1,138 @@
+import base64
+import json
+import logging
+import time
+from collections import deque
+from datetime import timedelta
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Tuple, Deque, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter, BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+log = logging.getLogger(__name__)
+
+
+# Requests are matched on the method, path, query and body: not on the host, so a recording of www.sqdc.ca
+# can be replayed whatever the --sqdc-url.
+def get_request_key(method: str, url: str, body: Optional[str]) -> Tuple[str, str, str]:
+    parts = urlsplit(url)
+    path = parts.path + ('?' + parts.query if parts.query else '')
+    return method.upper(), path, body or ''
+
+
+def decode_body(body) -> Optional[str]:
+    if body is None or isinstance(body, str):
+        return body
+    return body.decode('utf-8')
+
+
+# Sends the requests, and appends each one with its response and timing to a JSONL file.
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, path: Path):
+        super().__init__()
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = Lock()
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        elapsed = time.perf_counter() - start
+        try:
+            self.record(response, elapsed)
+        except Exception as e:
+            log.warning(f'could not record {request.method} {request.url}: {e}')
+        return response
+
+    # response.elapsed is only set by the session, once the adapter returns.
+    def record(self, response: requests.Response, elapsed: float):
+        request = response.request
+        record = {
+            'timestamp': time.time(),
+            'method': request.method,
+            'url': request.url,
+            'request_body': decode_body(request.body),
+            'status': response.status_code,
+            'reason': response.reason,
+            'content_type': response.headers.get('Content-Type'),
+            'elapsed': elapsed
+        }
+        try:
+            record['body'] = response.content.decode('utf-8')
+        except UnicodeDecodeError:
+            record['body_base64'] = base64.b64encode(response.content).decode('ascii')
+
+        line = json.dumps(record) + '\n'
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line)
+
+
+# Serves the responses of a recording instead of sending the requests. Identical requests get the recorded
+# responses in order, then the last one again. With realtime, each response takes as long as it did when recorded.
+class ReplayAdapter(BaseAdapter):
+    responses: Dict[Tuple[str, str, str], Deque[dict]]
+
+    def __init__(self, path: Path, realtime: bool = False):
+        super().__init__()
+        self.path = path
+        self.realtime = realtime
+        self.responses = {}
+        self.lock = Lock()
+        self.load()
+
+    def load(self):
+        nb_records = 0
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                key = get_request_key(record['method'], record['url'], record.get('request_body'))
+                self.responses.setdefault(key, deque()).append(record)
+                nb_records += 1
+        log.info(f'{nb_records} recorded requests loaded from {self.path}')
+
+    def send(self, request, **kwargs):
+        key = get_request_key(request.method, request.url, decode_body(request.body))
+        with self.lock:
+            records = self.responses.get(key)
+            if not records:
+                raise requests.ConnectionError(f'No recorded response for {request.method} {request.url}', request=request)
+            record = records.popleft() if len(records) > 1 else records[0]
+
+        if self.realtime:
+            time.sleep(record['elapsed'])
+        return self.build_response(request, record)
+
+    @staticmethod
+    def build_response(request, record: dict) -> requests.Response:
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = record['status']
+        response.reason = record.get('reason')
+        response.headers = CaseInsensitiveDict({'Content-Type': record['content_type']} if record.get('content_type') else {})
+        response.encoding = 'utf-8'
+        response.elapsed = timedelta(seconds=record['elapsed'])
+        if 'body_base64' in record:
+            response._content = base64.b64decode(record['body_base64'])
+        else:
+            response._content = record['body'].encode('utf-8')
+        return response
+
+    def close(self):
+        pass
+
+
+def create_capture_adapter(record_path: Optional[Path], replay_path: Optional[Path], replay_realtime: bool) -> Optional[BaseAdapter]:
+    if replay_path:
+        return ReplayAdapter(replay_path, replay_realtime)
+    elif record_path:
+        log.info(f'Recording the SQDC requests to {record_path}')
+        return RecordingAdapter(record_path)
+    return None
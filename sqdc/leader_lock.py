@@ -0,0 +1,65 @@
+import logging
+import os
+from pathlib import Path
+from threading import Event
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+
+# Only one watcher at a time scans, writes to the database and notifies: the one holding an exclusive lock
+# on a file of the data directory. The lock is released by the OS if the process dies, so a standby watcher
+# takes over without any cleanup.
+class LeaderLock:
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = None
+
+    def try_acquire(self) -> bool:
+        if self.file is not None:
+            return True
+        file = open(self.path, 'a+')
+        if fcntl is None:
+            log.warning('file locks are not supported on this platform: other watchers are not detected')
+        else:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                file.close()
+                return False
+
+        file.seek(0)
+        file.truncate()
+        file.write(str(os.getpid()))
+        file.flush()
+        self.file = file
+        return True
+
+    # Returns False when stopped before the lock could be acquired.
+    def wait_until_acquired(self, stop_event: Event, retry_interval: float) -> bool:
+        if self.try_acquire():
+            return True
+        log.warning(f'Another watcher (pid {self.get_holder_pid()}) holds {self.path}: waiting to take over')
+        while not stop_event.wait(retry_interval):
+            if self.try_acquire():
+                log.info(f'Lock acquired on {self.path}, this watcher is now the leader')
+                return True
+        return False
+
+    def get_holder_pid(self) -> str:
+        try:
+            return self.path.read_text().strip() or '?'
+        except OSError:
+            return '?'
+
+    def release(self):
+        if self.file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.file.close()
+        self.file = None
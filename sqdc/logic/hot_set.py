@@ -0,0 +1,68 @@
+import logging
+from threading import Lock
+from typing import Dict, List, Iterable
+
+from sqdc.dataobjects.product_mixins import ProductMixin
+from sqdc.logic.rule_engine import RuleEngine
+
+log = logging.getLogger(__name__)
+
+
+# Variants worth polling between scans: the out of stock variants of products matching a notification rule,
+# and those that often come back in stock.
+# Kept up to date incrementally: trigger matches are computed again for the products of each update, as their
+# title, specifications or variants may have changed, and restock counts are incremented from the in stock events
+# of each scan. Matches of products missing from an update are dropped when the rules change.
+class HotSet:
+    restock_counts: Dict[str, int]
+    watched_products: Dict[str, bool]
+    out_of_stock_variants: Dict[str, str]
+
+    def __init__(self, restock_threshold=3, max_size=100):
+        self.restock_threshold = restock_threshold
+        self.max_size = max_size
+        self.restock_counts = {}
+        self.rule_engine = None
+        self.watched_products = {}
+        # variant id -> product id
+        self.out_of_stock_variants = {}
+        self.lock = Lock()
+
+    def set_restock_counts(self, restock_counts: Dict[str, int]):
+        with self.lock:
+            self.restock_counts = dict(restock_counts)
+
+    def add_restocks(self, variant_ids: Iterable[str]):
+        with self.lock:
+            for variant_id in variant_ids:
+                self.restock_counts[variant_id] = self.restock_counts.get(variant_id, 0) + 1
+
+    def update(self, products: List[ProductMixin], rule_engine: RuleEngine):
+        with self.lock:
+            if rule_engine is not self.rule_engine:
+                self.rule_engine = rule_engine
+                self.watched_products = {}
+            for product in products:
+                self.watched_products[product.id] = len(rule_engine.find_matching_rules(product)) > 0
+                for variant in product.variants:
+                    if variant.in_stock:
+                        self.out_of_stock_variants.pop(variant.id, None)
+                    else:
+                        self.out_of_stock_variants[variant.id] = product.id
+
+    # Until the next update, variants found in stock by the poller are not polled again.
+    def mark_in_stock(self, variant_ids: Iterable[str]):
+        with self.lock:
+            for variant_id in variant_ids:
+                self.out_of_stock_variants.pop(variant_id, None)
+
+    # Watched variants first, then the most frequently restocked ones.
+    def get_variants_to_poll(self) -> List[str]:
+        with self.lock:
+            candidates = []
+            for variant_id, product_id in self.out_of_stock_variants.items():
+                is_watched = self.watched_products.get(product_id, False)
+                restock_count = self.restock_counts.get(variant_id, 0)
+                if is_watched or restock_count >= self.restock_threshold:
+                    candidates.append((not is_watched, -restock_count, variant_id))
+            return [variant_id for _, _, variant_id in sorted(candidates)[:self.max_size]]
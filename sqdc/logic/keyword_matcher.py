@@ -0,0 +1,67 @@
+from collections import deque
+from typing import Iterable, Tuple, Set, Any, List, Dict
+
+
+# Aho-Corasick automaton: finds every registered keyword occurring in a text in a single pass over it.
+# Matching is case insensitive. Each keyword is registered with a payload, which is what find() returns.
+class KeywordMatcher:
+    transitions: List[Dict[str, int]]
+    failures: List[int]
+    outputs: List[List[Any]]
+
+    def __init__(self, keywords: Iterable[Tuple[str, Any]]):
+        self.transitions = [{}]
+        self.failures = [0]
+        self.outputs = [[]]
+        self.nb_keywords = 0
+
+        for keyword, payload in keywords:
+            self._add_keyword(keyword.lower(), payload)
+        self._build_failures()
+
+    def _add_keyword(self, keyword: str, payload):
+        if not keyword:
+            return
+
+        state = 0
+        for char in keyword:
+            next_state = self.transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self.transitions)
+                self.transitions.append({})
+                self.failures.append(0)
+                self.outputs.append([])
+                self.transitions[state][char] = next_state
+            state = next_state
+        self.outputs[state].append(payload)
+        self.nb_keywords += 1
+
+    def _build_failures(self):
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                failure = self.failures[state]
+                while failure and char not in self.transitions[failure]:
+                    failure = self.failures[failure]
+                self.failures[next_state] = self.transitions[failure].get(char, 0)
+                # a keyword that ends here also ends every keyword that is one of its suffixes
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.failures[next_state]]
+
+    def find(self, text: str) -> Set[Any]:
+        found = set()
+        if self.nb_keywords == 0 or not text:
+            return found
+
+        state = 0
+        for char in text.lower():
+            while state and char not in self.transitions[state]:
+                state = self.failures[state]
+            state = self.transitions[state].get(char, 0)
+            if self.outputs[state]:
+                found.update(self.outputs[state])
+        return found
+
+    def __len__(self):
+        return self.nb_keywords
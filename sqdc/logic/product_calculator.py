@@ -30,9 +30,10 @@ class ProductCalculator:
         self.store = store
         self.updated_products = updated_products
         self.previous_products = previous_products
+        self.previous_products_by_id = {p.id: p for p in previous_products}
 
     def get_became_out_of_stock(self):
-        return sorted([p for p in self.updated_products if not p.is_in_stock() and find_by_id(self.previous_products, p, lambda p: p.is_in_stock())],
+        return sorted([p for p in self.updated_products if not p.is_in_stock() and self.was_in_stock(p)],
                       key=lambda p: p.get_sorting_key())
 
     def get_became_in_stock(self):
@@ -40,9 +41,13 @@ class ProductCalculator:
                        for p
                        in self.updated_products
                        if p.is_in_stock()
-                       and not find_by_id(self.previous_products, p, lambda x: x.is_in_stock())],
+                       and not self.was_in_stock(p)],
                       key=lambda p: p.get_sorting_key())
 
+    def was_in_stock(self, product: Product) -> bool:
+        previous_product = self.previous_products_by_id.get(product.id)
+        return previous_product is not None and previous_product.is_in_stock()
+
     def was_product_recently_in_stock(self, product: Product):
         last_in_stock = self.store.get_last_in_stock_product_history(product_id=product.id, event=ProductEvent.IN_STOCK)
         time_since_last_in_stock = datetime.now() - last_in_stock.timestamp if last_in_stock else datetime.min
@@ -50,4 +55,5 @@ class ProductCalculator:
         return was_in_stock_recently
 
     def get_new_products(self):
-        return sorted([p for p in self.updated_products if p.is_in_stock() and not find_by_id(self.previous_products, p)], key=lambda p: p.get_sorting_key())
+        return sorted([p for p in self.updated_products if p.is_in_stock() and p.id not in self.previous_products_by_id],
+                      key=lambda p: p.get_sorting_key())
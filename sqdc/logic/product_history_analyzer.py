@@ -6,18 +6,22 @@ from sqdc.dataobjects.product import Product
 from sqdc.dataobjects.product_history import ProductHistory
 from sqdc.dataobjects.product_variant import ProductVariant
 from sqdc.dataobjects.productevent import ProductEvent
+from sqdc.tracing import trace_public_methods
 
 log = logging.getLogger(__name__)
 
 
+@trace_public_methods('analytics')
 class ProductHistoryAnalyzer:
     def __init__(self, variant: ProductVariant):
         self.variant = variant
 
-    def calculate_percentage_in_stock(self, product: Product, history_entries: List[ProductHistory], end_datetime=datetime.now()):
+    def calculate_percentage_in_stock(self, product: Product, history_entries: List[ProductHistory], end_datetime: datetime = None):
         if not product.created and len(history_entries) == 0:
             return 0
 
+        end_datetime = end_datetime or datetime.now()
+
         variant_created = self.variant.created
         if not variant_created:
             first_in_stock = ProductHistoryAnalyzer.find_first_event_of_type(history_entries, ProductEvent.IN_STOCK)
@@ -33,7 +37,7 @@ class ProductHistoryAnalyzer:
         prev_event = (is_in_stock and ProductEvent.IN_STOCK) or ProductEvent.NOT_IN_STOCK
 
         for entry in history_entries:
-            current_in_stock = entry.event == ProductEvent.NOT_IN_STOCK.name.lower()
+            current_in_stock = entry.event == ProductEvent.IN_STOCK.name.lower()
             just_became_out_of_stock = prev_event == ProductEvent.IN_STOCK and not current_in_stock
 
             if just_became_out_of_stock:
@@ -45,7 +49,7 @@ class ProductHistoryAnalyzer:
             prev_event = ProductEvent[entry.event.upper()]
 
         if len(history_entries) > 0 and prev_event == ProductEvent.IN_STOCK:
-            time_in_stock += (datetime.now() - prev_time)
+            time_in_stock += (end_datetime - prev_time)
 
         percentage_in_stock = (time_in_stock / total_delta) * 100
         return percentage_in_stock
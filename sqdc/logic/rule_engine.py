@@ -0,0 +1,131 @@
+import logging
+import operator
+from typing import List, Dict, Tuple, Iterable
+
+from sqdc.commandParser import CommandParser
+from sqdc.dataobjects.product_mixins import ProductMixin, ProductVariantMixin
+from sqdc.dataobjects.trigger import Trigger
+from sqdc.exceptions import InvalidRuleError
+from sqdc.logic.keyword_matcher import KeywordMatcher
+from sqdc.notificationRule import NotificationRule, RuleCondition
+
+log = logging.getLogger(__name__)
+
+OPERATORS = {
+    '=': operator.eq,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge
+}
+
+GRAM_EQUIVALENT_TOLERANCE = 0.01
+
+# THC and CBD rules are in percent. Contents in mg/g convert to percent; those in mg/mL or mg per unit (oils,
+# edibles) do not, and never match a THC or CBD condition.
+THC_CBD_PERCENT_FACTORS = {
+    '%': 1.0,
+    'mg/g': 0.1
+}
+
+
+# Compiled set of notification rules.
+# Discrete conditions and keywords are indexed: a product only counts hits for the rules it can match,
+# and a rule is a candidate when all of its indexed clauses were hit. Numeric conditions are then
+# checked on the candidates only, against the product variants.
+class RuleEngine:
+    rules: List[NotificationRule]
+    discrete_index: Dict[Tuple[str, str], List[int]]
+    nb_indexed_clauses: List[int]
+    unindexed_rules: List[int]
+
+    def __init__(self, rules: List[NotificationRule]):
+        self.rules = rules
+        self.discrete_index = {}
+        self.nb_indexed_clauses = []
+        self.unindexed_rules = []
+
+        keywords = []
+        for rule_id, rule in enumerate(rules):
+            discrete_conditions = rule.get_discrete_conditions()
+            for condition in discrete_conditions:
+                self.discrete_index.setdefault((condition.attribute, condition.value), []).append(rule_id)
+            for keyword in rule.keywords:
+                keywords.append((keyword, (rule_id, keyword.lower())))
+
+            nb_indexed = len(discrete_conditions) + len(set(k.lower() for k in rule.keywords))
+            self.nb_indexed_clauses.append(nb_indexed)
+            if nb_indexed == 0:
+                self.unindexed_rules.append(rule_id)
+        self.keyword_matcher = KeywordMatcher(keywords)
+
+    # Triggers that cannot be parsed are ignored.
+    @staticmethod
+    def from_triggers(triggers: Iterable[Trigger]) -> 'RuleEngine':
+        rules = []
+        for trigger in triggers:
+            try:
+                rules.append(RuleEngine.get_trigger_rule(trigger))
+            except InvalidRuleError as e:
+                log.warning(f'Ignoring trigger of @{trigger.username}: {e}')
+        return RuleEngine(rules)
+
+    @staticmethod
+    def get_trigger_rule(trigger: Trigger) -> NotificationRule:
+        if trigger.is_rule:
+            return CommandParser.parse_rule(trigger.keyword, trigger.username)
+        return NotificationRule(trigger.keyword, trigger.username, keywords=[trigger.keyword])
+
+    def find_matching_rules(self, product: ProductMixin) -> List[NotificationRule]:
+        hits = {}
+        for attribute in ['category', 'cannabis_type', 'producer_name']:
+            value = getattr(product, attribute)
+            if value:
+                for rule_id in self.discrete_index.get((attribute, value.lower()), []):
+                    hits[rule_id] = hits.get(rule_id, 0) + 1
+        for rule_id, _ in self.keyword_matcher.find(self.get_searchable_text(product)):
+            hits[rule_id] = hits.get(rule_id, 0) + 1
+
+        candidates = [rule_id for rule_id, count in hits.items() if count == self.nb_indexed_clauses[rule_id]]
+        candidates += self.unindexed_rules
+        return [self.rules[rule_id] for rule_id in sorted(candidates)
+                if self.match_numeric_conditions(self.rules[rule_id], product)]
+
+    @staticmethod
+    def get_searchable_text(product: ProductMixin) -> str:
+        return '\n'.join([product.title or '', product.get_specification('Strain') or ''])
+
+    @staticmethod
+    def match_numeric_conditions(rule: NotificationRule, product: ProductMixin) -> bool:
+        conditions = rule.get_numeric_conditions()
+        if len(conditions) == 0:
+            return True
+        variants = product.get_variants_in_stock() or product.variants
+        return any(all(RuleEngine.match_condition(c, v) for c in conditions) for v in variants)
+
+    @staticmethod
+    def match_condition(condition: RuleCondition, variant: ProductVariantMixin) -> bool:
+        value = RuleEngine.get_variant_value(variant, condition.attribute)
+        if value is None:
+            return False
+        if condition.attribute == 'gram_equivalent' and condition.operator == '=':
+            return abs(value - condition.value) < GRAM_EQUIVALENT_TOLERANCE
+        return OPERATORS[condition.operator](value, condition.value)
+
+    @staticmethod
+    def get_variant_value(variant: ProductVariantMixin, attribute: str):
+        if attribute == 'thc':
+            return RuleEngine.to_percent(variant.thc_max if variant.thc_max is not None else variant.thc_min, variant)
+        elif attribute == 'cbd':
+            return RuleEngine.to_percent(variant.cbd_max if variant.cbd_max is not None else variant.cbd_min, variant)
+        return getattr(variant, attribute)
+
+    @staticmethod
+    def to_percent(value: float, variant: ProductVariantMixin):
+        factor = THC_CBD_PERCENT_FACTORS.get((variant.unit_of_measure_thc_cbd or '').strip().lower())
+        if value is None or factor is None:
+            return None
+        return value * factor
+
+    def __len__(self):
+        return len(self.rules)
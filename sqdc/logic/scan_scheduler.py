@@ -0,0 +1,63 @@
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+log = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 7 * 24
+
+
+# Learns when restocks happen, by weekday and hour, from the in stock events of the last weeks.
+# The scan interval goes from max_interval in hours without restocks down to min_interval in the busiest hour.
+# An hour also counts as hot when the next one is: scans are already frequent when a restock wave starts.
+class ScanScheduler:
+    histogram: List[float]
+
+    def __init__(self, default_interval: float, min_interval: float, max_interval: float, lookback_days=28,
+                 refresh_interval=timedelta(hours=1)):
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.lookback_days = lookback_days
+        self.refresh_interval = refresh_interval
+        self.histogram = [0.0] * HOURS_PER_WEEK
+        self.max_intensity = 0.0
+        self.last_refresh: Optional[datetime] = None
+
+    def get_history_start(self, now: datetime) -> datetime:
+        return now - timedelta(days=self.lookback_days)
+
+    def needs_refresh(self, now: datetime) -> bool:
+        return self.last_refresh is None or now - self.last_refresh >= self.refresh_interval
+
+    # restock_timestamps: one timestamp per restocked variant, since get_history_start()
+    def update_histogram(self, restock_timestamps: List[datetime], now: datetime):
+        histogram = [0.0] * HOURS_PER_WEEK
+        for timestamp in restock_timestamps:
+            histogram[self.get_hour_of_week(timestamp)] += 1
+        self.histogram = histogram
+        self.max_intensity = max(self.get_intensity(h) for h in range(HOURS_PER_WEEK))
+        self.last_refresh = now
+        log.debug(f'Scan schedule updated from {len(restock_timestamps)} restocks')
+
+    def get_intensity(self, hour_of_week: int) -> float:
+        return max(self.histogram[hour_of_week], self.histogram[(hour_of_week + 1) % HOURS_PER_WEEK])
+
+    # In seconds, like the bounds
+    def get_next_interval(self, now: datetime) -> float:
+        if self.max_intensity == 0:
+            return min(max(self.default_interval, self.min_interval), self.max_interval)
+
+        ratio = self.get_intensity(self.get_hour_of_week(now)) / self.max_intensity
+        # geometric interpolation: the interval halves several times before reaching the busiest hours
+        interval = self.max_interval * (self.min_interval / self.max_interval) ** ratio
+        # never sleep past the start of the next hour if it is hotter than the current one
+        next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        next_ratio = self.get_intensity(self.get_hour_of_week(next_hour)) / self.max_intensity
+        if next_ratio > ratio:
+            interval = min(interval, max(self.min_interval, (next_hour - now).total_seconds()))
+        return interval
+
+    @staticmethod
+    def get_hour_of_week(timestamp: datetime) -> int:
+        return timestamp.weekday() * 24 + timestamp.hour
@@ -0,0 +1,18 @@
+from sqdc.catalog_snapshot import CatalogSnapshot
+from sqdc.logic.test.products_catalog_tests import CatalogTestBase
+
+
+class CatalogSnapshotTests(CatalogTestBase):
+
+    def test_snapshot_round_trip(self):
+        self.save_products()
+        products = self.store.get_products()
+        CatalogSnapshot.write(self.store.snapshot_file, products)
+
+        for orm_instances in [False, True]:
+            snapshot = CatalogSnapshot.read(self.store.snapshot_file, orm_instances=orm_instances)
+
+            self.assertSameProducts(snapshot.products, products)
+            pink_kush = next(p for p in snapshot.products if p.title == 'Pink Kush')
+            self.assertEqual(pink_kush.get_specification('Strain'), 'Pink Kush')
+            self.assertEqual(pink_kush.variants[0].gram_equivalent, 3.5)
@@ -0,0 +1,73 @@
+from threading import Event
+
+from sqdc.commandParser import CommandParser
+from sqdc.hot_set_poller import HotSetPoller
+from sqdc.logic.hot_set import HotSet
+from sqdc.logic.rule_engine import RuleEngine
+from sqdc.logic.test.test_base import TestBase
+
+
+class FakeInventoryClient:
+    def __init__(self, in_stock):
+        self.in_stock = in_stock
+        self.requests = []
+
+    def api_find_inventory_items(self, skus):
+        self.requests.append(list(skus))
+        return [sku for sku in skus if sku in self.in_stock]
+
+
+class HotSetTests(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.watched = self.create_product(title='Pink Kush', in_stock=False)
+        self.frequent = self.create_product(title='Blue Dream', in_stock=False)
+        self.other = self.create_product(title='Jack Herer', in_stock=False)
+        for product in [self.watched, self.frequent, self.other]:
+            product.variants[0].in_stock = False
+        self.products = [self.watched, self.frequent, self.other]
+        self.engine = RuleEngine([CommandParser.parse_rule('kush', 'bob')])
+
+    def test_watched_and_frequently_restocked_variants(self):
+        hot_set = HotSet(restock_threshold=2)
+        hot_set.set_restock_counts({self.frequent.variants[0].id: 1, self.other.variants[0].id: 1})
+        hot_set.update(self.products, self.engine)
+        self.assertEqual(hot_set.get_variants_to_poll(), [self.watched.variants[0].id])
+
+        hot_set.add_restocks([self.frequent.variants[0].id])
+        self.assertEqual(hot_set.get_variants_to_poll(), [self.watched.variants[0].id, self.frequent.variants[0].id])
+
+    def test_membership_follows_stock_and_rules(self):
+        hot_set = HotSet()
+        hot_set.update(self.products, self.engine)
+
+        self.watched.variants[0].in_stock = True
+        hot_set.update([self.watched], self.engine)
+        self.assertEqual(hot_set.get_variants_to_poll(), [])
+
+        hot_set.update(self.products, RuleEngine([CommandParser.parse_rule('jack', 'bob')]))
+        self.assertEqual(hot_set.get_variants_to_poll(), [self.other.variants[0].id])
+
+    def test_membership_follows_product_changes(self):
+        hot_set = HotSet()
+        hot_set.update(self.products, self.engine)
+
+        self.other.title = 'Jack Kush'
+        self.watched.title = 'Pink Dream'
+        hot_set.update(self.products, self.engine)
+        self.assertEqual(hot_set.get_variants_to_poll(), [self.other.variants[0].id])
+
+    def test_poller_reports_restocks_once(self):
+        hot_set = HotSet(restock_threshold=1)
+        hot_set.set_restock_counts({v.id: 1 for p in self.products for v in p.variants})
+        hot_set.update(self.products, self.engine)
+        client = FakeInventoryClient(in_stock=[self.frequent.variants[0].id])
+        restocks = []
+        poller = HotSetPoller(hot_set, client, Event(), restocks.append, interval=1, batch_size=2)
+
+        poller.poll()
+        poller.poll()
+
+        self.assertEqual(restocks, [[self.frequent.variants[0].id]])
+        self.assertEqual([len(r) for r in client.requests], [2, 1, 2])
@@ -0,0 +1,42 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import requests
+
+from sqdc.http_capture import RecordingAdapter, ReplayAdapter
+from sqdc.sqdc_client import SqdcClient
+
+
+def create_response(session: requests.Session, method: str, url: str, body: str, json_body=None) -> requests.Response:
+    response = requests.Response()
+    response.request = session.prepare_request(requests.Request(method, url, json=json_body))
+    response.status_code = 200
+    response.reason = 'OK'
+    response.headers['Content-Type'] = 'application/json'
+    response._content = body.encode('utf-8')
+    return response
+
+
+class HttpCaptureTests(TestCase):
+
+    def test_replay_recorded_requests(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory).joinpath('requests.jsonl')
+            session = requests.Session()
+            recorder = RecordingAdapter(path)
+            skus_url = 'https://www.sqdc.ca/api/inventory/findInventoryItems'
+            recorder.record(create_response(session, 'POST', skus_url, '["1"]', {'skus': ['1', '2']}), 0.1)
+            recorder.record(create_response(session, 'POST', skus_url, '["2"]', {'skus': ['1', '2']}), 0.1)
+            recorder.record(create_response(session, 'POST', skus_url, '["3"]', {'skus': ['3']}), 0.1)
+
+            # replayed against another host: requests are matched on their path and body
+            client = SqdcClient(sqdc_url='http://localhost:8765')
+            client.use_adapter(ReplayAdapter(path))
+
+            self.assertEqual(client.api_find_inventory_items(['1', '2']), ['1'])
+            self.assertEqual(client.api_find_inventory_items(['1', '2']), ['2'])
+            self.assertEqual(client.api_find_inventory_items(['1', '2']), ['2'])
+            self.assertEqual(client.api_find_inventory_items(['3']), ['3'])
+            with self.assertRaises(requests.ConnectionError):
+                client.api_find_inventory_items(['4'])
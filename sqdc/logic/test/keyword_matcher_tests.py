@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+from sqdc.logic.keyword_matcher import KeywordMatcher
+
+
+class KeywordMatcherTests(TestCase):
+
+    def test_find_all_keywords_in_text(self):
+        matcher = KeywordMatcher([('kush', ('bob', 'kush')), ('pink kush', ('alice', 'pink kush')), ('haze', ('bob', 'haze'))])
+
+        found = matcher.find('Pink Kush (Blend)')
+
+        self.assertEqual(found, {('bob', 'kush'), ('alice', 'pink kush')})
+
+    def test_overlapping_keywords(self):
+        matcher = KeywordMatcher([('he', 'he'), ('she', 'she'), ('his', 'his'), ('hers', 'hers')])
+
+        self.assertEqual(matcher.find('ushers'), {'he', 'she', 'hers'})
+
+    def test_no_keywords(self):
+        matcher = KeywordMatcher([])
+
+        self.assertEqual(len(matcher), 0)
+        self.assertEqual(matcher.find('Pink Kush'), set())
+
+    def test_same_keyword_for_many_users(self):
+        matcher = KeywordMatcher([('OG', 'alice'), ('og', 'bob')])
+
+        self.assertEqual(matcher.find('Blue Dream / OG Kush'), {'alice', 'bob'})
@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+from sqdc.metrics import MetricsRegistry, ScanTimer, SCAN_STAGE_SECONDS, REGISTRY
+from sqdc.sqdc_client import SqdcClient
+from sqdc.logic.test.request_limiter_tests import StatusSequenceAdapter
+
+
+class MetricsTests(TestCase):
+
+    def test_render_prometheus_text(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('request_seconds', 'Latency.', ['endpoint'], buckets=[0.1, 1])
+        histogram.observe(0.05, 'search')
+        histogram.observe(0.5, 'search')
+        histogram.observe(2, 'search')
+        registry.gauge('queue_depth', 'Depth.', ['queue']).set_function(lambda: 4, 'notifications')
+        registry.counter('retries', 'Retries.').inc()
+
+        self.assertEqual(registry.render().splitlines(), [
+            '# HELP request_seconds Latency.',
+            '# TYPE request_seconds histogram',
+            'request_seconds_bucket{endpoint="search",le="0.1"} 1',
+            'request_seconds_bucket{endpoint="search",le="1"} 2',
+            'request_seconds_bucket{endpoint="search",le="+Inf"} 3',
+            'request_seconds_sum{endpoint="search"} 2.55',
+            'request_seconds_count{endpoint="search"} 3',
+            '# HELP queue_depth Depth.',
+            '# TYPE queue_depth gauge',
+            'queue_depth{queue="notifications"} 4',
+            '# HELP retries Retries.',
+            '# TYPE retries counter',
+            'retries 1',
+        ])
+
+    def test_scan_stages_are_accumulated(self):
+        timer = ScanTimer()
+        nb_observed = SCAN_STAGE_SECONDS.get_count('fetch')
+
+        timer.start_scan()
+        for page in range(3):
+            with timer.stage('fetch'):
+                pass
+        stages = timer.end_scan()
+
+        self.assertEqual(set(stages.keys()), {'fetch', 'total'})
+        self.assertEqual(SCAN_STAGE_SECONDS.get_count('fetch'), nb_observed + 1)
+
+    def test_urls_are_not_rendered(self):
+        webhook_url = 'https://hooks.slack.com/services/T0000/B0000/webhooksecret'
+        client = SqdcClient(sqdc_url='http://localhost:8765')
+        client.session.mount(webhook_url, StatusSequenceAdapter([]))
+        client.post_to_slack(webhook_url, 'message')
+        client.use_adapter(StatusSequenceAdapter([]))
+        client.get_product_result_page_html(3)
+
+        rendered = REGISTRY.render()
+        self.assertIn('endpoint="slack_webhook"', rendered)
+        self.assertIn('endpoint="search"', rendered)
+        self.assertNotIn('webhooksecret', rendered)
+        self.assertNotIn('hooks.slack.com', rendered)
+        self.assertNotIn('localhost', rendered)
@@ -0,0 +1,93 @@
+import json
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+
+from sqdc.SqdcStore import SqdcStore
+from sqdc.dataobjects.base import Base
+from sqdc.dataobjects.spec_blob import SpecBlob
+
+MIGRATIONS_DIRECTORY = Path(__file__).parents[3].joinpath('migrations')
+
+# The revision before the specifications were promoted to columns, then moved to spec_blobs.
+BEFORE_SPECIFICATIONS_MIGRATIONS = '3753c981d83f'
+
+PINK_KUSH_SPECIFICATIONS = {'Strain': 'Pink Kush', 'GramEquivalent': '3.5', 'THCContentMax': '21.5', 'Terpenes': 'Myrcene'}
+BLUE_DREAM_SPECIFICATIONS = {'Strain': 'Blue Dream', 'THCContentMin': 'n/a'}
+
+
+class MigrationsTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SqdcStore(True, root_directory=self.directory.name)
+        self.config = Config()
+        self.config.set_main_option('script_location', str(MIGRATIONS_DIRECTORY))
+        self.config.set_main_option('sqlalchemy.url', self.store.db_url)
+
+    def tearDown(self):
+        if hasattr(self.store, 'engine'):
+            self.store.engine.dispose()
+        self.directory.cleanup()
+
+    def insert_variants(self, rows):
+        with sqlite3.connect(str(self.store.sqlite_db)) as connection:
+            connection.execute("INSERT INTO products (id, url, title) VALUES ('1', 'https://www.sqdc.ca/1', 'Pink Kush')")
+            connection.executemany('INSERT INTO product_variants (id, product_id, specifications) VALUES (?, ?, ?)',
+                                   [(variant_id, '1', None if s is None else json.dumps(s)) for variant_id, s in rows])
+
+    def test_specifications_migrations(self):
+        command.upgrade(self.config, BEFORE_SPECIFICATIONS_MIGRATIONS)
+        self.insert_variants([('10', PINK_KUSH_SPECIFICATIONS), ('11', PINK_KUSH_SPECIFICATIONS),
+                              ('12', BLUE_DREAM_SPECIFICATIONS), ('13', None)])
+        command.upgrade(self.config, 'head')
+        self.store.initialize()
+
+        # promoted columns are backfilled, numbers that cannot be parsed are left empty
+        pink_kush = self.store.get_variant('1', '10')
+        self.assertEqual((pink_kush.strain, pink_kush.gram_equivalent, pink_kush.thc_max), ('Pink Kush', 3.5, 21.5))
+        blue_dream = self.store.get_variant('1', '12')
+        self.assertEqual((blue_dream.strain, blue_dream.thc_min), ('Blue Dream', None))
+
+        # identical specifications are stored once, under their content hash
+        self.assertEqual(pink_kush.spec_hash, SpecBlob.compute_hash(PINK_KUSH_SPECIFICATIONS))
+        self.assertEqual(self.store.get_variant('1', '11').spec_hash, pink_kush.spec_hash)
+        self.assertEqual(self.store.get_variant_specifications('1', '11'), PINK_KUSH_SPECIFICATIONS)
+        self.assertEqual(self.store.get_variant_specifications('1', '12'), BLUE_DREAM_SPECIFICATIONS)
+        self.assertIsNone(self.store.get_variant('1', '13').spec_hash)
+        with sqlite3.connect(str(self.store.sqlite_db)) as connection:
+            self.assertEqual(connection.execute('SELECT count(*) FROM spec_blobs').fetchone(), (2,))
+
+    def test_downgrade_restores_the_specifications(self):
+        command.upgrade(self.config, BEFORE_SPECIFICATIONS_MIGRATIONS)
+        self.insert_variants([('10', PINK_KUSH_SPECIFICATIONS)])
+        command.upgrade(self.config, 'head')
+        command.downgrade(self.config, BEFORE_SPECIFICATIONS_MIGRATIONS)
+
+        with sqlite3.connect(str(self.store.sqlite_db)) as connection:
+            (specifications,) = connection.execute("SELECT specifications FROM product_variants WHERE id = '10'").fetchone()
+        self.assertEqual(json.loads(specifications), PINK_KUSH_SPECIFICATIONS)
+
+    def test_migrated_schema_matches_the_models(self):
+        command.upgrade(self.config, 'head')
+
+        engine = create_engine(self.store.db_url)
+        try:
+            with engine.connect() as connection:
+                # The types are not compared: the first migrations declared some columns loosely (e.g. BOOLEAN for
+                # DateTime), which SQLite's type affinity tolerates. The search index is not part of the models.
+                context = MigrationContext.configure(connection, opts={
+                    'compare_type': False,
+                    'include_object': lambda object, name, type_, reflected, compare_to:
+                        not (type_ == 'table' and name.startswith('products_fts'))
+                })
+                self.assertEqual(compare_metadata(context, Base.metadata), [])
+        finally:
+            engine.dispose()
@@ -0,0 +1,32 @@
+from sqdc.logic.test.test_base import TestBase
+from sqdc.notification_digest import NotificationDigest
+
+
+class NotificationDigestTests(TestBase):
+
+    def test_buffers_until_window_is_over(self):
+        digest = NotificationDigest(window_seconds=600)
+        first, second = self.create_products(2)
+        digest.add('bob', [first], now=0)
+        digest.add('bob', [second], now=300)
+        digest.add('alice', [second], now=300)
+
+        self.assertEqual(digest.pop_due(now=599), {})
+        self.assertEqual(digest.get_next_due_in(now=599), 1)
+
+        due = digest.pop_due(now=600)
+        self.assertEqual(list(due.keys()), ['bob'])
+        self.assertEqual(due['bob'].get_products(), [first, second])
+        self.assertEqual(digest.get_next_due_in(now=600), 300)
+
+    def test_deduplicates_products(self):
+        digest = NotificationDigest(window_seconds=600)
+        product = self.create_product()
+        digest.add('bob', [product], now=0)
+        digest.add('bob', [product], now=60)
+
+        due = digest.pop_due(now=0, force=True)
+
+        self.assertEqual(due['bob'].get_products(), [product])
+        self.assertEqual(due['bob'].nb_matches, 2)
+        self.assertIsNone(digest.get_next_due_in(now=0))
@@ -0,0 +1,104 @@
+from unittest import TestCase
+
+import requests
+
+from sqdc.notification_dispatcher import NotificationDispatcher
+
+
+def http_error(status_code: int, headers=None) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return requests.HTTPError(response=response)
+
+
+class FakeSlack:
+    def __init__(self, failures=None):
+        self.failures = failures or []
+        self.sent = []
+
+    def send(self, text: str):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append(text)
+
+
+class NotificationDispatcherTests(TestCase):
+
+    def create_dispatcher(self, nb_workers=2) -> NotificationDispatcher:
+        return NotificationDispatcher(nb_workers, max_attempts=3, backoff_base_seconds=0.01, backoff_max_seconds=0.05)
+
+    def test_batches_messages_for_same_recipient(self):
+        dispatcher = self.create_dispatcher()
+        bob, alice = FakeSlack(), FakeSlack()
+        delivered = []
+        dispatcher.send_message('first', '@bob', bob.send, on_delivered=lambda: delivered.append('first'))
+        dispatcher.send_message('second', '@bob', bob.send, on_delivered=lambda: delivered.append('second'))
+        dispatcher.send_message('hello', '@alice', alice.send)
+
+        dispatcher.start()
+        dispatcher.stop()
+
+        self.assertEqual(bob.sent, ['first\nsecond'])
+        self.assertEqual(alice.sent, ['hello'])
+        self.assertEqual(delivered, ['first', 'second'])
+        metrics = dispatcher.get_metrics()
+        self.assertEqual(metrics['delivered'], 3)
+        self.assertEqual(metrics['batches'], 2)
+        self.assertEqual(metrics['queue_depth'], 0)
+
+    def test_retry_after_rate_limit(self):
+        dispatcher = self.create_dispatcher()
+        slack = FakeSlack([http_error(429, {'Retry-After': '0.05'})])
+        dispatcher.send_message('restock', '@bob', slack.send)
+
+        dispatcher.start()
+        dispatcher.stop()
+
+        self.assertEqual(slack.sent, ['restock'])
+        self.assertEqual(dispatcher.get_metrics()['rate_limited'], 1)
+
+    def test_retries_server_errors_then_gives_up(self):
+        dispatcher = self.create_dispatcher(nb_workers=1)
+        flaky = FakeSlack([http_error(503), requests.ConnectionError()])
+        down = FakeSlack([http_error(500)] * 3)
+        dispatcher.send_message('flaky', '@bob', flaky.send)
+        dispatcher.send_message('down', '@alice', down.send)
+
+        dispatcher.start()
+        dispatcher.stop()
+
+        self.assertEqual(flaky.sent, ['flaky'])
+        self.assertEqual(down.sent, [])
+        metrics = dispatcher.get_metrics()
+        self.assertEqual(metrics['delivered'], 1)
+        self.assertEqual(metrics['failed'], 1)
+
+    def test_client_errors_are_not_retried(self):
+        dispatcher = self.create_dispatcher()
+        slack = FakeSlack([http_error(400)])
+        delivered = []
+        dispatcher.send_message('invalid', '@bob', slack.send, on_delivered=lambda: delivered.append(True))
+
+        dispatcher.start()
+        dispatcher.stop()
+
+        self.assertEqual(slack.sent, [])
+        self.assertEqual(delivered, [])
+        self.assertEqual(dispatcher.get_metrics()['failed'], 1)
+
+    def test_webhook_url_is_not_logged(self):
+        webhook_url = 'https://hooks.slack.com/services/T0000/B0000/webhooksecret'
+        not_found = http_error(404)
+        not_found.response.url = webhook_url
+        not_found.args = (f'404 Client Error: Not Found for url: {webhook_url}',)
+        slack = FakeSlack([requests.ConnectionError(f'Max retries exceeded with url: {webhook_url}'), not_found])
+        dispatcher = self.create_dispatcher(nb_workers=1)
+        dispatcher.send_message('in stock', '#channel', slack.send)
+
+        with self.assertLogs('sqdc.notification_dispatcher', level='INFO') as logs:
+            dispatcher.start()
+            dispatcher.stop()
+
+        self.assertTrue(any('#channel' in line for line in logs.output))
+        self.assertFalse(any('webhooksecret' in line for line in logs.output))
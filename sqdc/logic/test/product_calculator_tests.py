@@ -1,5 +1,4 @@
-import unittest
-
+from sqdc.dataobjects.product import Product
 from sqdc.logic.product_calculator import ProductCalculator
 from sqdc.logic.test.test_base import TestBase
 
@@ -9,24 +8,22 @@ class ProductCalculatorTests(TestBase):
     def test_product_became_in_stock(self):
         prev_producs = self.create_products(5)
         current_products = prev_producs.copy()
-        print(prev_producs)
 
         new_product = self.create_product()
         current_products.append(new_product)
-        calculator = ProductCalculator(prev_producs, current_products)
-        differences = calculator.calculate_stock_differences()
+        calculator = ProductCalculator(None, prev_producs, current_products)
 
-        self.assertIs(len(differences.became_in_stock), 1)
-        self.assertIs(len(differences.became_out_of_stock), 0)
+        self.assertEqual(calculator.get_became_in_stock(), [new_product])
+        self.assertEqual(len(calculator.get_became_out_of_stock()), 0)
 
     def test_product_became_out_of_stock(self):
         prev_producs = self.create_products(5)
         current_products = prev_producs.copy()
 
-        current_products.remove(current_products[0])
-        calculator = ProductCalculator(prev_producs, current_products)
-        differences = calculator.calculate_stock_differences()
-
-        self.assertIs(len(differences.became_out_of_stock), 1)
+        out_of_stock_product = Product(id=current_products[0].id, in_stock=False)
+        out_of_stock_product.variants.append(self.create_variant(out_of_stock_product.id, in_stock=False))
+        current_products[0] = out_of_stock_product
+        calculator = ProductCalculator(None, prev_producs, current_products)
 
-        self.assertIs(len(differences.became_in_stock), 0)
\ No newline at end of file
+        self.assertEqual(calculator.get_became_out_of_stock(), [out_of_stock_product])
+        self.assertEqual(len(calculator.get_became_in_stock()), 0)
@@ -19,7 +19,7 @@ class HistoryAnalyzerTests(TestBase):
             create_entry(ProductEvent.NOT_IN_STOCK, product.created + timedelta(hours=4))
         ]
 
-        analyzer = ProductHistoryAnalyzer(product)
-        percentage = analyzer.calculate_percentage_in_stock(entries)
+        analyzer = ProductHistoryAnalyzer(product.variants[0])
+        percentage = analyzer.calculate_percentage_in_stock(product, entries, product.created + timedelta(hours=8))
 
         self.assertAlmostEqual(percentage, 50, 4)
\ No newline at end of file
@@ -0,0 +1,59 @@
+import tempfile
+
+from sqdc.SqdcStore import SqdcStore
+from sqdc.commandParser import CommandParser
+from sqdc.logic.test.test_base import TestBase
+from sqdc.product_search import build_match_query
+
+
+class ProductSearchTests(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SqdcStore(True, root_directory=self.directory.name)
+        self.store.initialize()
+
+    def tearDown(self):
+        self.store.engine.dispose()
+        self.directory.cleanup()
+
+    def create_searchable_product(self, title, brand, strain, in_stock=True):
+        product = self.create_product(in_stock=in_stock, title=title, brand=brand, url='https://www.sqdc.ca/' + title,
+                                      category='Dried flowers')
+        product.id = str(product.id)
+        for v in product.variants:
+            v.product_id = product.id
+            v.id = str(v.id)
+            v.strain = strain
+            v.price = 10.0
+        return product
+
+    def test_search_in_stock_products(self):
+        self.store.save_products([
+            self.create_searchable_product('Pink Kush', 'Redecan', 'Pink Kush'),
+            self.create_searchable_product('Kush Mints', 'Tweed', 'Kush Mints'),
+            self.create_searchable_product('Pink Kush Sold Out', 'Tweed', 'Pink Kush', in_stock=False),
+            self.create_searchable_product('Blue Dream', 'Pink Kush Farms', 'Blue Dream'),
+        ])
+
+        self.assertEqual([p.title for p in self.store.search_products('pink kus', 10)], ['Pink Kush', 'Blue Dream'])
+        self.assertEqual([p.title for p in self.store.search_products('tweed', 10)], ['Kush Mints'])
+        self.assertEqual(self.store.search_products('OR NEAR(', 10), [])
+        self.assertEqual(len(self.store.search_products('pink kush', 10)[0].variants), 1)
+
+    def test_index_follows_saved_products(self):
+        product = self.create_searchable_product('Pink Kush', 'Redecan', 'Hybrid')
+        self.store.save_products([product])
+        product.title = 'Death Star'
+        self.store.save_products([product])
+
+        self.assertEqual(self.store.search_products('pink', 10), [])
+        self.assertEqual([p.title for p in self.store.search_products('death', 10)], ['Death Star'])
+        self.assertEqual(len(self.store.search_products('redecan', 10)), 1)
+
+    def test_parse_search_command(self):
+        command = CommandParser.parse('/watch', 'search "Pink Kush"')
+        self.assertEqual((command.verb, command.args), ('search', ['Pink Kush']))
+        self.assertEqual(build_match_query('pink-kush'), '"pink"* "kush"*')
+        self.assertIsNone(build_match_query('  *  '))
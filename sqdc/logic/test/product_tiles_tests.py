@@ -0,0 +1,25 @@
+from concurrent.futures import ProcessPoolExecutor
+from unittest import TestCase
+
+from sqdc.product_tiles import parse_product_tiles, ProductTile
+
+PAGE_HTML = '<html><body>' \
+            '<div class="product-tile"><a data-qa="search-product-title" data-productid="100" href="/en-CA/p-kush/100-P/628">Kush</a>' \
+            '<div class="js-equalized-brand">Brand</div></div>' \
+            '<div class="product-tile product-outofstock"><a data-qa="search-product-title" data-productid="101" href="/en-CA/p-haze/101-P/629">Haze</a>' \
+            '<div class="js-equalized-brand"></div></div>' \
+            '</body></html>'
+
+
+class ProductTilesTests(TestCase):
+
+    def test_parse_product_tiles(self):
+        tiles = parse_product_tiles(PAGE_HTML)
+
+        self.assertEqual(tiles, [ProductTile('100', 'Kush', 'https://www.sqdc.ca/en-CA/p-kush/100-P/628', 'Brand', True),
+                                 ProductTile('101', 'Haze', 'https://www.sqdc.ca/en-CA/p-haze/101-P/629', '', False)])
+        self.assertEqual(parse_product_tiles('<html></html>'), [])
+
+    def test_parse_in_worker_process(self):
+        with ProcessPoolExecutor(1) as pool:
+            self.assertEqual(pool.submit(parse_product_tiles, PAGE_HTML).result(), parse_product_tiles(PAGE_HTML))
@@ -0,0 +1,79 @@
+import tempfile
+from datetime import datetime, timedelta
+
+from sqdc.SqdcStore import SqdcStore
+from sqdc.dataobjects.product import Product
+from sqdc.dataobjects.product_variant import ProductVariant
+from sqdc.logic.test.test_base import TestBase
+from sqdc.products_catalog import ProductsCatalog
+
+
+def get_columns(instance, model) -> dict:
+    return {c.key: getattr(instance, c.key) for c in model.__table__.columns}
+
+
+# Saved products with two variants each, and their comparison column by column.
+class CatalogTestBase(TestBase):
+    maxDiff = None
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SqdcStore(True, root_directory=self.directory.name)
+        self.store.initialize()
+
+    def tearDown(self):
+        self.store.engine.dispose()
+        self.directory.cleanup()
+
+    def create_saved_product(self, title: str, specifications: dict, **kwargs) -> Product:
+        product = self.create_product(title=title, url=f'https://www.sqdc.ca/en-CA/{title}/1-P', brand='Brand',
+                                      category='Dried flowers', **kwargs)
+        product.id = str(product.id)
+        product.variants.append(self.create_variant(product.id, in_stock=False))
+        for v in product.variants:
+            v.product_id = product.id
+            v.id = str(v.id)
+            v.price = 10.5
+            v.set_specifications(specifications)
+        product.variants[1].out_of_stock_since = datetime.now() - timedelta(days=2)
+        return product
+
+    def save_products(self):
+        self.store.save_products([
+            self.create_saved_product('Pink Kush', {'Strain': 'Pink Kush', 'GramEquivalent': '3.5', 'THCContentMax': '21'},
+                                      availability_stats='87.5'),
+            self.create_saved_product('大麻 Blue Dream', {'Strain': 'Blue Dream', 'CannabisType': 'Sativa'}, in_stock=False),
+        ])
+
+    def assertSameProducts(self, products: list, expected: list):
+        products = sorted(products, key=lambda p: p.id)
+        expected = sorted(expected, key=lambda p: p.id)
+        self.assertEqual([get_columns(p, Product) for p in products], [get_columns(p, Product) for p in expected])
+        for product, expected_product in zip(products, expected):
+            self.assertEqual([get_columns(v, ProductVariant) for v in product.variants],
+                             [get_columns(v, ProductVariant) for v in expected_product.variants])
+            self.assertTrue(all(v.product is product for v in product.variants))
+
+
+class ProductsCatalogTests(CatalogTestBase):
+
+    def test_catalog_follows_store_writes(self):
+        self.save_products()
+        catalog = ProductsCatalog(self.store)
+        catalog.load()
+
+        products = catalog.get_products()
+        products[0].title = 'Pink Kush Renamed'
+        products[1].variants[0].in_stock = True
+        catalog.update(self.store.save_products(products))
+        self.assertSameProducts(catalog.get_products(), self.store.get_products())
+
+        variant = self.store.get_variant(products[0].id, products[0].variants[0].id)
+        variant.set_specifications({'Strain': 'Pink Kush', 'GramEquivalent': '7'})
+        catalog.update_variants_specifications(self.store.save_variants([variant]))
+        self.assertSameProducts(catalog.get_products(), self.store.get_products())
+
+        catalog.update_products_notification(self.store.mark_products_notified(products[:1]))
+        self.assertIsNotNone(next(p for p in catalog.get_products() if p.id == products[0].id).last_in_stock_notification)
+        self.assertSameProducts(catalog.get_products(), self.store.get_products())
@@ -0,0 +1,48 @@
+import logging
+
+from sqdc.formatter import SqdcFormatter
+from sqdc.logic.test.test_base import TestBase
+from sqdc.products_table import ProductsTable
+
+
+class ProductsTableTests(TestBase):
+
+    def create_listed_product(self, title: str):
+        product = self.create_product(title=title, url=f'https://www.sqdc.ca/en-CA/{title}/1-P', brand='Brand',
+                                      producer_name='Producer', category='Dried flowers')
+        product.variants[0].price = 10
+        product.variants[0].gram_equivalent = 3.5
+        return product
+
+    def test_same_layout_as_formatter(self):
+        products = [self.create_listed_product('Pink Kush'), self.create_listed_product('Blue Dream')]
+
+        self.assertEqual(ProductsTable().render(products), SqdcFormatter.build_products_table(products))
+
+    def test_same_layout_as_formatter_for_numeric_wide_and_multiline_titles(self):
+        for titles in [['420', '1000'], ['大麻', 'Blue Dream'], ['Pink\nKush', 'Blue Dream']]:
+            products = [self.create_listed_product(title) for title in titles]
+
+            self.assertEqual(ProductsTable().render(products), SqdcFormatter.build_products_table(products), titles)
+
+    def test_only_changed_lines_are_rendered(self):
+        table = ProductsTable()
+        products = [self.create_listed_product('Pink Kush'), self.create_listed_product('Blue Dream')]
+        table.render(products)
+
+        products[1].variants[0].price = 12
+        table.render(products)
+        self.assertEqual(table.nb_rendered_lines, 3)
+
+        products.append(self.create_listed_product('A much longer product title'))
+        table.render(products)
+        self.assertEqual(table.nb_rendered_lines, 6)
+
+    def test_not_rendered_when_not_logged(self):
+        table = ProductsTable()
+        logger = logging.getLogger('products_table_tests')
+        logger.setLevel(logging.WARNING)
+
+        logger.info(table.lazy([self.create_listed_product('Pink Kush')]))
+
+        self.assertEqual(table.nb_rendered_lines, 0)
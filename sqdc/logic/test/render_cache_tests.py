@@ -0,0 +1,35 @@
+from sqdc.formatter import RenderCache
+from sqdc.logic.test.test_base import TestBase
+
+
+class RenderCacheTests(TestBase):
+
+    def test_rendering_is_reused_until_product_changes(self):
+        cache = RenderCache()
+        product = self.create_product(title='Pink Kush')
+        renders = []
+
+        def render():
+            renders.append(product.title)
+            return product.title
+
+        cache.get_or_render(product, 'product', render)
+        cache.get_or_render(product, 'product', render)
+        product.variants[0].in_stock = False
+        cache.get_or_render(product, 'product', render)
+
+        self.assertEqual(len(renders), 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_least_recently_used_are_evicted(self):
+        cache = RenderCache(max_size=2)
+        first, second, third = self.create_products(3)
+
+        cache.get_or_render(first, 'product', lambda: 'first')
+        cache.get_or_render(second, 'product', lambda: 'second')
+        cache.get_or_render(first, 'product', lambda: 'first')
+        cache.get_or_render(third, 'product', lambda: 'third')
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get_or_render(first, 'product', lambda: 'rendered again'), 'first')
+        self.assertEqual(cache.get_or_render(second, 'product', lambda: 'rendered again'), 'rendered again')
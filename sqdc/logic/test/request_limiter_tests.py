@@ -0,0 +1,111 @@
+import time
+from threading import Event, Timer
+from unittest import TestCase
+
+import requests
+import requests.adapters
+
+from sqdc.request_limiter import ConcurrencyWindow, TokenBucket, RequestLimits, RequestLimiter, RequestAbortedError, \
+    get_retry_delay
+from sqdc.sqdc_client import SqdcClient
+
+
+# Answers with the given status codes in turn, then 200.
+class StatusSequenceAdapter(requests.adapters.BaseAdapter):
+    def __init__(self, statuses, retry_after=None):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.retry_after = retry_after
+        self.nb_requests = 0
+
+    def send(self, request, **kwargs):
+        self.nb_requests += 1
+        response = requests.Response()
+        response.request = request
+        response.status_code = self.statuses.pop(0) if self.statuses else 200
+        response.headers['Content-Type'] = 'application/json'
+        if self.retry_after:
+            response.headers['Retry-After'] = self.retry_after
+        response._content = b'["1"]'
+        return response
+
+    def close(self):
+        pass
+
+
+class RequestLimiterTests(TestCase):
+
+    def test_concurrency_window_aimd(self):
+        window = ConcurrencyWindow(initial=4, maximum=8)
+        for _ in range(4):
+            window.release(window.acquire(), is_overloaded=False)
+        self.assertAlmostEqual(window.limit, 5, delta=0.1)
+
+        # overloads of the requests sent before the window shrank only shrink it once
+        in_flight = [window.acquire() for _ in range(3)]
+        for started in in_flight:
+            window.release(started, is_overloaded=True)
+        self.assertAlmostEqual(window.limit, 2.5, delta=0.1)
+        window.release(window.acquire(), is_overloaded=True)
+        self.assertAlmostEqual(window.limit, 1.25, delta=0.1)
+        self.assertEqual(window.in_flight, 0)
+
+    def test_stop_while_the_window_is_full(self):
+        stopped = Event()
+        window = ConcurrencyWindow(initial=1, maximum=1, stop_event=stopped)
+        window.acquire()
+        Timer(0.2, stopped.set).start()
+        start = time.monotonic()
+        with self.assertRaises(RequestAbortedError):
+            window.acquire()
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(window.in_flight, 1)
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), 0)
+        self.assertAlmostEqual(bucket.take(), 0.1, delta=0.01)
+        self.assertFalse(bucket.try_take())
+        self.assertTrue(TokenBucket(rate=0).try_take())
+
+    def test_divide_limits(self):
+        limits = RequestLimits({'search': 10.0}, 16).divide(4)
+        self.assertEqual(limits, RequestLimits({'search': 2.5}, 4))
+
+    def test_retry_delay(self):
+        for attempt in range(1, 10):
+            self.assertLessEqual(get_retry_delay(attempt), 10)
+        self.assertGreaterEqual(get_retry_delay(1, '3'), 3)
+
+    def test_retry_overloaded_responses(self):
+        client = SqdcClient(sqdc_url='http://localhost:8765')
+        adapter = StatusSequenceAdapter([503])
+        client.use_adapter(adapter)
+        self.assertEqual(client.api_find_inventory_items(['1']), ['1'])
+        self.assertEqual(adapter.nb_requests, 2)
+
+        adapter = StatusSequenceAdapter([429, 503, 503])
+        client.use_adapter(adapter)
+        start = time.monotonic()
+        with self.assertRaises(requests.HTTPError):
+            client.api_find_inventory_items(['1'])
+        self.assertEqual(adapter.nb_requests, 3)
+        self.assertLess(time.monotonic() - start, 4)
+
+    def test_stop_aborts_waits(self):
+        stopped = Event()
+        client = SqdcClient(sqdc_url='http://localhost:8765', limiter=RequestLimiter(RequestLimits({'inventory': 0.1}, 4), stopped))
+        adapter = StatusSequenceAdapter([429], retry_after='30')
+        client.use_adapter(adapter)
+        Timer(0.2, stopped.set).start()
+        start = time.monotonic()
+        with self.assertRaises(RequestAbortedError):
+            client.api_find_inventory_items(['1'])
+        self.assertEqual(adapter.nb_requests, 1)
+
+        # no token left for 10s: the next request is not sent either
+        with self.assertRaises(RequestAbortedError):
+            client.api_find_inventory_items(['1'])
+        self.assertEqual(adapter.nb_requests, 1)
+        self.assertLess(time.monotonic() - start, 4)
@@ -0,0 +1,93 @@
+from sqdc.commandParser import CommandParser
+from sqdc.dataobjects.trigger import Trigger
+from sqdc.exceptions import InvalidRuleError
+from sqdc.logic.rule_engine import RuleEngine
+from sqdc.logic.test.test_base import TestBase
+
+
+class RuleEngineTests(TestBase):
+
+    def create_flower(self, title='Pink Kush', category='Dried flowers', cannabis_type='Indica', price_per_gram=7.5,
+                      thc_max=21.0, gram_equivalent=3.5, unit_of_measure_thc_cbd='%'):
+        product = self.create_product(title=title, category=category, cannabis_type=cannabis_type,
+                                      producer_name='Producer')
+        variant = product.variants[0]
+        variant.price_per_gram = price_per_gram
+        variant.thc_max = thc_max
+        variant.unit_of_measure_thc_cbd = unit_of_measure_thc_cbd
+        variant.gram_equivalent = gram_equivalent
+        return product
+
+    @staticmethod
+    def create_engine(*rules: str) -> RuleEngine:
+        return RuleEngine([CommandParser.parse_rule(rule, 'bob') for rule in rules])
+
+    def test_parse_rule(self):
+        rule = CommandParser.parse_rule('category=Dried flowers, type=Indica, price_per_gram < 8, THC >= 20, 3.5g format, kush',
+                                        'bob')
+
+        self.assertEqual([(c.attribute, c.operator, c.value) for c in rule.conditions], [
+            ('category', '=', 'dried flowers'),
+            ('cannabis_type', '=', 'indica'),
+            ('price_per_gram', '<', 8.0),
+            ('thc', '>=', 20.0),
+            ('gram_equivalent', '=', 3.5)
+        ])
+        self.assertEqual(rule.keywords, ['kush'])
+
+    def test_parse_plain_keyword(self):
+        rule = CommandParser.parse_rule('Pink Kush', 'bob')
+
+        self.assertEqual(rule.conditions, [])
+        self.assertEqual(rule.keywords, ['Pink Kush'])
+
+    def test_parse_invalid_rules(self):
+        for rule in ['color=green', 'type > Indica', 'thc >= lots', ' , ', 'price =< 3']:
+            with self.assertRaises(InvalidRuleError, msg=rule):
+                CommandParser.parse_rule(rule, 'bob')
+
+    def test_match_structured_rule(self):
+        engine = self.create_engine('category=Dried flowers, type=Indica, price_per_gram < 8, THC >= 20, 3.5g format')
+
+        self.assertEqual(len(engine.find_matching_rules(self.create_flower())), 1)
+        self.assertEqual(engine.find_matching_rules(self.create_flower(cannabis_type='Sativa')), [])
+        self.assertEqual(engine.find_matching_rules(self.create_flower(price_per_gram=9)), [])
+        self.assertEqual(engine.find_matching_rules(self.create_flower(thc_max=None)), [])
+        self.assertEqual(engine.find_matching_rules(self.create_flower(gram_equivalent=7)), [])
+
+    def test_thc_conditions_are_in_percent(self):
+        engine = self.create_engine('THC >= 20')
+
+        self.assertEqual(len(engine.find_matching_rules(self.create_flower(thc_max=210, unit_of_measure_thc_cbd='mg/g'))), 1)
+        self.assertEqual(engine.find_matching_rules(self.create_flower(thc_max=150, unit_of_measure_thc_cbd='mg/g')), [])
+        self.assertEqual(engine.find_matching_rules(self.create_flower(thc_max=30, unit_of_measure_thc_cbd='mg/mL')), [])
+        self.assertEqual(engine.find_matching_rules(self.create_flower(thc_max=25, unit_of_measure_thc_cbd=None)), [])
+
+    def test_numeric_conditions_match_a_single_variant(self):
+        engine = self.create_engine('ppg < 8, 3.5g')
+        product = self.create_flower(price_per_gram=9)
+        other_variant = self.create_variant(product.id)
+        other_variant.price_per_gram = 6
+        other_variant.gram_equivalent = 28
+        product.variants.append(other_variant)
+
+        self.assertEqual(engine.find_matching_rules(product), [])
+
+    def test_keywords_and_numeric_only_rules(self):
+        engine = self.create_engine('pink kush', 'kush, type=Sativa', 'thc > 25', 'og')
+
+        matching = engine.find_matching_rules(self.create_flower(title='Pink Kush', thc_max=26))
+
+        self.assertEqual([r.keyword for r in matching], ['pink kush', 'thc > 25'])
+
+    def test_legacy_keyword_triggers(self):
+        engine = RuleEngine.from_triggers([Trigger(username='bob', keyword='Pink, Kush', is_rule=False),
+                                           Trigger(username='bob', keyword='3.5g', is_rule=False),
+                                           Trigger(username='bob', keyword='<3 Kush', is_rule=False),
+                                           Trigger(username='bob', keyword='thc >= lots', is_rule=True),
+                                           Trigger(username='bob', keyword='kush, 3.5g', is_rule=True)])
+
+        self.assertEqual([r.keyword for r in engine.rules], ['Pink, Kush', '3.5g', '<3 Kush', 'kush, 3.5g'])
+        self.assertEqual([r.keyword for r in engine.find_matching_rules(self.create_flower(title='Pink Kush'))], ['kush, 3.5g'])
+        matching = engine.find_matching_rules(self.create_flower(title='Pink, Kush 3.5g', gram_equivalent=7))
+        self.assertEqual([r.keyword for r in matching], ['Pink, Kush', '3.5g'])
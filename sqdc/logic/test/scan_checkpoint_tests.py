@@ -0,0 +1,81 @@
+import tempfile
+from pathlib import Path
+from threading import Event
+from unittest import TestCase
+
+from requests import ConnectionError
+
+from sqdc.exceptions import ScanPageError
+from sqdc.product_tiles import ProductTile
+from sqdc.products_updater import ProductsUpdater
+from sqdc.scan_checkpoint import ScanCheckpoint
+
+
+def create_page_html(product_ids):
+    return '<html><body>' + ''.join(
+        f'<div class="product-tile"><a data-qa="search-product-title" data-productid="{pid}" href="/en-CA/p/{pid}-P/1">P{pid}</a>'
+        f'<div class="js-equalized-brand">Brand</div></div>' for pid in product_ids) + '</body></html>'
+
+
+# Pages of 2 products, 3 pages. Pages listed in failing_pages raise.
+class FakePagesClient:
+    def __init__(self, failing_pages=()):
+        self.failing_pages = set(failing_pages)
+        self.fetched_pages = []
+
+    def get_product_result_page_html(self, page: int) -> str:
+        self.fetched_pages.append(page)
+        if page in self.failing_pages:
+            raise ConnectionError('connection reset')
+        return create_page_html([f'{page}0', f'{page}1'] if page <= 3 else [])
+
+
+class FakeStore:
+    def update_last_scan_timestamp(self, timestamp):
+        pass
+
+
+class ScanCheckpointTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = Path(self.directory.name)
+        self.checkpoint = ScanCheckpoint(path.joinpath('scan-checkpoint.jsonl'), path.joinpath('scan-last-good.jsonl'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def fetch(self, client, use_stale_fallback=False):
+        updater = ProductsUpdater(FakeStore(), client, Event(), checkpoint=self.checkpoint, use_stale_fallback=use_stale_fallback)
+        return updater.fetch_all_products_summary(max_pages=10)
+
+    def test_failed_scan_resumes_from_checkpoint(self):
+        self.checkpoint.start()
+        with self.assertRaises(ScanPageError):
+            self.fetch(FakePagesClient(failing_pages=[3]))
+
+        self.assertTrue(self.checkpoint.has_pending_scan())
+        self.checkpoint.start()
+        client = FakePagesClient()
+        products = self.fetch(client)
+
+        self.assertEqual([p.id for p in products], ['10', '11', '20', '21', '30', '31'])
+        self.assertEqual(client.fetched_pages, [3, 4])
+
+        self.checkpoint.complete()
+        self.assertFalse(self.checkpoint.has_pending_scan())
+        self.assertEqual(self.checkpoint.get_fallback_page(1), [ProductTile('10', 'P10', 'https://www.sqdc.ca/en-CA/p/10-P/1', 'Brand', True),
+                                                                ProductTile('11', 'P11', 'https://www.sqdc.ca/en-CA/p/11-P/1', 'Brand', True)])
+        self.assertEqual(self.checkpoint.get_fallback_page(7), [])
+
+    def test_stale_page_fallback(self):
+        self.checkpoint.start()
+        self.fetch(FakePagesClient())
+        self.checkpoint.complete()
+
+        self.checkpoint.start()
+        products = self.fetch(FakePagesClient(failing_pages=[2]), use_stale_fallback=True)
+
+        self.assertEqual([(p.id, p.is_stale) for p in products],
+                         [('10', False), ('11', False), ('20', True), ('21', True), ('30', False), ('31', False)])
+        self.assertEqual(self.checkpoint.get_resumable_pages(), [1])
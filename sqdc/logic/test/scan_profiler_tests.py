@@ -0,0 +1,32 @@
+import tempfile
+import tracemalloc
+from pathlib import Path
+from unittest import TestCase
+
+from sqdc.commandParser import CommandParser
+from sqdc.scan_profiler import ScanProfiler
+
+
+def allocate_and_compute():
+    blocks = [bytearray(1024) for _ in range(200)]
+    return sum(len(b) for b in blocks)
+
+
+class ScanProfilerTests(TestCase):
+
+    def test_profile_scan(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiles_directory = Path(directory).joinpath('profiles')
+
+            report = ScanProfiler(profiles_directory).profile(allocate_and_compute)
+
+            self.assertTrue(report.stats_path.is_file())
+            self.assertTrue(report.memory_path.is_file())
+            self.assertTrue(any('allocate_and_compute' in line for line in report.hotspots))
+            self.assertTrue(any('scan_profiler_tests.py' in line for line in report.allocations))
+            self.assertIn(report.stats_path.name, report.format_message())
+            self.assertFalse(tracemalloc.is_tracing())
+
+    def test_parse_profile_command(self):
+        self.assertEqual(CommandParser.parse('/watch', 'profile').verb, 'profile')
+        self.assertEqual(CommandParser.parse('/watch', 'profile next').verb, 'profile')
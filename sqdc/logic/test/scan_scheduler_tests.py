@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from sqdc.logic.scan_scheduler import ScanScheduler
+
+# a Tuesday
+TUESDAY = datetime(2026, 10, 13)
+
+
+class ScanSchedulerTests(TestCase):
+
+    def create_scheduler(self) -> ScanScheduler:
+        return ScanScheduler(default_interval=300, min_interval=60, max_interval=1800)
+
+    def test_default_interval_without_history(self):
+        scheduler = self.create_scheduler()
+        scheduler.update_histogram([], TUESDAY)
+
+        self.assertEqual(scheduler.get_next_interval(TUESDAY), 300)
+
+    def test_scans_often_in_hot_hours(self):
+        scheduler = self.create_scheduler()
+        restocks = [TUESDAY.replace(hour=10, minute=m) - timedelta(weeks=w) for w in range(3) for m in range(0, 60, 10)]
+        restocks += [TUESDAY.replace(hour=15) - timedelta(weeks=1)]
+        scheduler.update_histogram(restocks, TUESDAY)
+
+        self.assertEqual(scheduler.get_next_interval(TUESDAY.replace(hour=10, minute=30)), 60)
+        self.assertEqual(scheduler.get_next_interval(TUESDAY.replace(hour=3)), 1800)
+        quiet_interval = scheduler.get_next_interval(TUESDAY.replace(hour=15, minute=5))
+        self.assertTrue(60 < quiet_interval < 1800)
+
+    def test_wakes_up_before_hot_hour(self):
+        scheduler = self.create_scheduler()
+        scheduler.update_histogram([TUESDAY.replace(hour=10)] * 5, TUESDAY)
+
+        # 8:50 is quiet, but 9:00 counts as hot since restocks happen at 10:00
+        self.assertEqual(scheduler.get_next_interval(TUESDAY.replace(hour=8, minute=50)), 600)
+        self.assertEqual(scheduler.get_next_interval(TUESDAY.replace(hour=8, minute=59, second=30)), 60)
+
+    def test_refresh(self):
+        scheduler = self.create_scheduler()
+        self.assertTrue(scheduler.needs_refresh(TUESDAY))
+
+        scheduler.update_histogram([], TUESDAY)
+
+        self.assertFalse(scheduler.needs_refresh(TUESDAY + timedelta(minutes=59)))
+        self.assertTrue(scheduler.needs_refresh(TUESDAY + timedelta(hours=1)))
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+from threading import Event
+from unittest import TestCase
+
+from sqdc.leader_lock import LeaderLock
+from sqdc import scan_shards
+from sqdc.exceptions import ScanShardTimeoutError
+from sqdc.scan_shards import split_ranges, ScanShards
+
+
+# Worker processes are children of the fork server: polled with signal 0 rather than joined.
+def wait_for_exit(pid: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class ScanShardsTests(TestCase):
+
+    def test_split_ranges(self):
+        self.assertEqual(split_ranges(list(range(7)), 3), [[0, 1, 2], [3, 4], [5, 6]])
+        self.assertEqual(split_ranges([1, 2], 4), [[1], [2]])
+        self.assertEqual(split_ranges([], 2), [])
+
+    def test_single_leader(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory).joinpath('watcher.lock')
+            leader = LeaderLock(path)
+            standby = LeaderLock(path)
+
+            self.assertTrue(leader.try_acquire())
+            self.assertFalse(standby.try_acquire())
+            stopped = Event()
+            stopped.set()
+            self.assertFalse(standby.wait_until_acquired(stopped, 0.01))
+
+            leader.release()
+            self.assertTrue(standby.try_acquire())
+            standby.release()
+
+    def test_stuck_worker_is_terminated(self):
+        shards = ScanShards(1, 'http://localhost:8765')
+        timeout = scan_shards.TASK_TIMEOUT_SECONDS
+        scan_shards.TASK_TIMEOUT_SECONDS = 0.5
+        try:
+            pool = shards.get_pool()
+            self.assertEqual(shards.get_result(pool.submit(sorted, [2, 1])), [1, 2])
+            with self.assertRaises(ScanShardTimeoutError):
+                shards.get_result(pool.submit(time.sleep, 30))
+            self.assertIsNone(shards.pool)
+            pids = pool.get_worker_pids()
+            self.assertEqual(len(pids), 1)
+            self.assertTrue(all(wait_for_exit(pid, 5) for pid in pids))
+        finally:
+            scan_shards.TASK_TIMEOUT_SECONDS = timeout
+            shards.shutdown()
@@ -0,0 +1,98 @@
+import tempfile
+import time
+from datetime import datetime, timedelta
+from threading import Event
+
+from requests import ConnectionError
+
+from sqdc.SqdcStore import SqdcStore
+from sqdc.logic.test.test_base import TestBase
+from sqdc.products_catalog import ProductsCatalog
+from sqdc.specifications_refresher import SpecificationsRefresher
+
+
+# Answers from a dict of specifications by variant id, raising for the variants that are missing.
+class FakeSpecificationsClient:
+    def __init__(self, specifications):
+        self.specifications = specifications
+        self.requested = []
+
+    def get_specifications_attributes(self, product_id, variant_id):
+        self.requested.append(variant_id)
+        if variant_id not in self.specifications:
+            raise ConnectionError(f'no specifications for {variant_id}')
+        return self.specifications[variant_id]
+
+
+class SpecificationsRefresherTests(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SqdcStore(True, root_directory=self.directory.name)
+        self.store.initialize()
+        self.catalog = ProductsCatalog(self.store)
+
+    def tearDown(self):
+        self.store.engine.dispose()
+        self.directory.cleanup()
+
+    def save_products_with_specifications(self, number: int):
+        products = [self.create_product(url=f'https://www.sqdc.ca/{i}') for i in range(number)]
+        refreshed_long_ago = datetime.now() - timedelta(days=30)
+        for i, product in enumerate(products):
+            product.id = str(product.id)
+            for v in product.variants:
+                v.product_id = product.id
+                v.id = str(v.id)
+                v.set_specifications({'Strain': 'Old'})
+                v.specifications_updated = refreshed_long_ago + timedelta(minutes=i)
+        self.store.save_products(products)
+
+    def refresh(self, client, budget, deadline=None):
+        SpecificationsRefresher(self.store, self.catalog, client, Event(), budget).refresh_oldest(deadline)
+
+    def test_refresh_oldest(self):
+        self.save_products_with_specifications(3)
+        client = FakeSpecificationsClient({'0': {'Strain': 'Old'}, '1': {'Strain': 'New'}})
+        self.refresh(client, 2)
+
+        self.assertEqual(client.requested, ['0', '1'])
+        self.assertEqual(self.store.get_variant_specifications('0', '0'), {'Strain': 'Old'})
+        self.assertEqual(self.store.get_variant_specifications('1', '1'), {'Strain': 'New'})
+        self.assertEqual(self.store.get_variant('1', '1').strain, 'New')
+        # the oldest is now the one that was not refreshed
+        self.assertEqual([v.id for v in self.store.get_variants_with_oldest_specifications(1)], ['2'])
+
+    def test_failed_variants_do_not_block_the_queue(self):
+        self.save_products_with_specifications(3)
+        client = FakeSpecificationsClient({'1': {'Strain': 'New'}})
+        self.refresh(client, 2)
+
+        self.assertEqual(client.requested, ['0', '1'])
+        self.assertEqual(self.store.get_variant_specifications('0', '0'), {'Strain': 'Old'})
+        self.assertEqual(self.store.get_variant_specifications('1', '1'), {'Strain': 'New'})
+
+        self.refresh(client, 2)
+        self.assertEqual(client.requested, ['0', '1', '2', '0'])
+
+    def test_changed_specifications_update_the_product(self):
+        self.save_products_with_specifications(2)
+        self.catalog.load()
+        specifications = {'Strain': 'New', 'LevelTwoCategory': 'Pre-rolls', 'CannabisType': 'Sativa', 'ProducerName': 'Tweed'}
+        self.refresh(FakeSpecificationsClient({'0': specifications, '1': {'Strain': 'Old'}}), 2)
+
+        product = next(p for p in self.store.get_products() if p.id == '0')
+        self.assertEqual((product.category, product.cannabis_type, product.producer_name), ('Pre-rolls', 'Sativa', 'Tweed'))
+        catalog_product = next(p for p in self.catalog.get_products() if p.id == '0')
+        self.assertEqual((catalog_product.category, catalog_product.cannabis_type, catalog_product.producer_name,
+                          catalog_product.last_updated),
+                         (product.category, product.cannabis_type, product.producer_name, product.last_updated))
+        self.assertIsNone(next(p for p in self.store.get_products() if p.id == '1').category)
+
+    def test_refresh_stops_at_the_deadline(self):
+        self.save_products_with_specifications(2)
+        client = FakeSpecificationsClient({'0': {'Strain': 'New'}, '1': {'Strain': 'New'}})
+        self.refresh(client, 2, deadline=time.monotonic())
+
+        self.assertEqual(client.requested, [])
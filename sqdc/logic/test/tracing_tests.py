@@ -0,0 +1,50 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from sqdc import tracing
+from sqdc.tracing import TraceWriter, trace_public_methods, span, start_tracing, stop_tracing
+
+
+@trace_public_methods('test')
+class TracedService:
+    def fetch(self):
+        with span('parse', 'test', page=1):
+            return self.helper()
+
+    @staticmethod
+    def helper():
+        return 'ok'
+
+
+class TracingTests(TestCase):
+
+    def tearDown(self):
+        stop_tracing()
+
+    def test_nested_spans(self):
+        tracer = start_tracing()
+        TracedService().fetch()
+        stop_tracing()
+        TracedService().fetch()
+
+        events = tracer.to_json()['traceEvents']
+        spans = [e for e in events if e['ph'] == 'X']
+        self.assertEqual([e['name'] for e in spans], ['TracedService.helper', 'parse', 'TracedService.fetch'])
+        self.assertEqual(spans[1]['args'], {'page': 1})
+        fetch, parse = spans[2], spans[1]
+        self.assertTrue(fetch['ts'] <= parse['ts'] and parse['ts'] + parse['dur'] <= fetch['ts'] + fetch['dur'])
+        self.assertEqual([e['name'] for e in events if e['ph'] == 'M'], ['thread_name'])
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(tracing._tracer)
+        self.assertIs(span('parse'), tracing.NOOP_SPAN)
+
+    def test_rotation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            writer = TraceWriter(Path(directory), max_files=2)
+            paths = [writer.write(start_tracing()) for _ in range(3)]
+
+            self.assertEqual(sorted(Path(directory).iterdir()), paths[1:])
+            self.assertEqual(json.loads(paths[2].read_text())['traceEvents'], [])
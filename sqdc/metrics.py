@@ -0,0 +1,248 @@
+import logging
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, Tuple, List, Callable, Optional
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = '') -> str:
+    labels = [f'{name}="{escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    metric_type = ''
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.lock = Lock()
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.metric_type}'] + self.render_samples()
+
+    def render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    metric_type = 'counter'
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, description, label_names)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, *label_values):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values) -> float:
+        with self.lock:
+            return self.values.get(label_values, 0)
+
+    def render_samples(self) -> List[str]:
+        with self.lock:
+            return [f'{self.name}{format_labels(self.label_names, labels)} {format_value(value)}'
+                    for labels, value in sorted(self.values.items())]
+
+
+# A gauge is either set, or read from a function when rendered.
+class Gauge(Metric):
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, description, label_names)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, *label_values):
+        with self.lock:
+            self.values[label_values] = value
+
+    def set_function(self, function: Callable[[], float], *label_values):
+        with self.lock:
+            self.functions[label_values] = function
+
+    def render_samples(self) -> List[str]:
+        with self.lock:
+            values = dict(self.values)
+            functions = dict(self.functions)
+        for labels, function in functions.items():
+            try:
+                values[labels] = function()
+            except Exception as e:
+                log.warning(f'could not read gauge {self.name}: {e}')
+        return [f'{self.name}{format_labels(self.label_names, labels)} {format_value(value)}'
+                for labels, value in sorted(values.items())]
+
+
+class Histogram(Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # label values -> (bucket counts, sum, count)
+        self.values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, *label_values):
+        with self.lock:
+            counts, total, count = self.values.get(label_values) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self.values[label_values] = (counts, total + value, count + 1)
+
+    def get_count(self, *label_values) -> int:
+        with self.lock:
+            entry = self.values.get(label_values)
+            return entry[2] if entry else 0
+
+    def render_samples(self) -> List[str]:
+        lines = []
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = 'le="{}"'.format(format_value(bound))
+                    lines.append(f'{self.name}_bucket{format_labels(self.label_names, labels, le)} {cumulative}')
+                lines.append(f'{self.name}_sum{format_labels(self.label_names, labels)} {format_value(total)}')
+                lines.append(f'{self.name}_count{format_labels(self.label_names, labels)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    metrics: Dict[str, Metric]
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = Lock()
+
+    def _register(self, metric_class, name: str, description: str, label_names, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, description, tuple(label_names), **kwargs)
+            return metric
+
+    def counter(self, name: str, description: str, label_names=()) -> Counter:
+        return self._register(Counter, name, description, label_names)
+
+    def gauge(self, name: str, description: str, label_names=()) -> Gauge:
+        return self._register(Gauge, name, description, label_names)
+
+    def histogram(self, name: str, description: str, label_names=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, description, label_names, buckets=buckets)
+
+    # Prometheus text exposition format
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+SCAN_STAGE_SECONDS = REGISTRY.histogram('sqdc_scan_stage_seconds', 'Time spent in each stage of a scan.', ['stage'])
+SCAN_SECONDS = REGISTRY.histogram('sqdc_scan_seconds', 'Duration of the scans.')
+HTTP_REQUEST_SECONDS = REGISTRY.histogram('sqdc_http_request_seconds', 'Latency of the outgoing HTTP requests, by endpoint family.',
+                                          ['method', 'endpoint', 'status'])
+DB_QUERY_SECONDS = REGISTRY.histogram('sqdc_db_query_seconds', 'Duration of the database queries.', ['statement'])
+QUEUE_DEPTH = REGISTRY.gauge('sqdc_queue_depth', 'Number of items waiting in the internal queues.', ['queue'])
+HTTP_RATE_LIMIT = REGISTRY.gauge('sqdc_http_rate_limit', 'Requests per second allowed to each SQDC endpoint family, 0 if unlimited.',
+                                 ['family'])
+HTTP_CONCURRENCY_LIMIT = REGISTRY.gauge('sqdc_http_concurrency_limit', 'Concurrent SQDC requests currently allowed by the adaptive window.')
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge('sqdc_http_requests_in_flight', 'SQDC requests currently sent and not answered yet.')
+HTTP_THROTTLED_SECONDS = REGISTRY.counter('sqdc_http_throttled_seconds_total', 'Time the SQDC requests waited for the rate limits.',
+                                          ['family'])
+HTTP_RETRIES = REGISTRY.counter('sqdc_http_retries_total', 'SQDC requests retried, by reason: the status code, or error.',
+                                ['family', 'reason'])
+
+
+# Accumulates the time spent in each stage of the current scan: a stage can be entered many times per scan,
+# e.g. once per page fetched. At the end of the scan, each stage total is observed once.
+class ScanTimer:
+    stages: Dict[str, float]
+
+    def __init__(self):
+        self.stages = {}
+        self.scan_start: Optional[float] = None
+        self.lock = Lock()
+
+    def start_scan(self):
+        with self.lock:
+            self.stages = {}
+            self.scan_start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def end_scan(self) -> Dict[str, float]:
+        with self.lock:
+            stages = self.stages
+            self.stages = {}
+            scan_duration = time.perf_counter() - self.scan_start if self.scan_start is not None else None
+            self.scan_start = None
+        for name, elapsed in stages.items():
+            SCAN_STAGE_SECONDS.observe(elapsed, name)
+        if scan_duration is not None:
+            SCAN_SECONDS.observe(scan_duration)
+            stages['total'] = scan_duration
+        return stages
+
+
+SCAN_TIMER = ScanTimer()
+
+
+def scan_stage(name: str):
+    return SCAN_TIMER.stage(name)
+
+
+# endpoint: a fixed family name, never the URL. URLs carry secrets (Slack incoming webhooks) and per-request
+# values (page numbers), and /metrics is served without authentication.
+def observe_http_request(method: str, endpoint: str, status: int, elapsed_seconds: float):
+    HTTP_REQUEST_SECONDS.observe(elapsed_seconds, method, endpoint, str(status))
+
+
+def instrument_engine(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_times', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get('query_start_times')
+        if start_times:
+            statement_type = statement.lstrip().split(' ', 1)[0].upper()
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start_times.pop(), statement_type)
@@ -1,4 +1,37 @@
+from typing import List
+
+DISCRETE_ATTRIBUTES = ['category', 'cannabis_type', 'producer_name']
+NUMERIC_ATTRIBUTES = ['price', 'price_per_gram', 'thc', 'cbd', 'gram_equivalent']
+
+
+class RuleCondition:
+    def __init__(self, attribute: str, operator: str, value):
+        self.attribute = attribute
+        self.operator = operator
+        self.value = value
+
+    def is_discrete(self) -> bool:
+        return self.attribute in DISCRETE_ATTRIBUTES
+
+    def __repr__(self):
+        return f'{self.attribute} {self.operator} {self.value}'
+
+
+# A rule matches a product when every condition and every keyword match.
+# Discrete conditions (category, cannabis type, producer) only support equality; numeric ones are variant attributes.
 class NotificationRule:
-    def __init__(self, keyword: str, username_to_notify: str):
+    def __init__(self, keyword: str, username_to_notify: str, conditions: List[RuleCondition] = None,
+                 keywords: List[str] = None):
         self.username_to_notify = username_to_notify
         self.keyword = keyword
+        self.conditions = conditions or []
+        self.keywords = keywords or []
+
+    def get_discrete_conditions(self) -> List[RuleCondition]:
+        return [c for c in self.conditions if c.is_discrete()]
+
+    def get_numeric_conditions(self) -> List[RuleCondition]:
+        return [c for c in self.conditions if not c.is_discrete()]
+
+    def __repr__(self):
+        return f'NotificationRule(@{self.username_to_notify}: {self.keyword})'
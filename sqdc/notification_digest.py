@@ -0,0 +1,52 @@
+import time
+from threading import Lock
+from typing import Dict, List, Optional
+
+from sqdc.dataobjects.product_mixins import ProductMixin
+
+
+class PendingDigest:
+    def __init__(self, due: float):
+        self.due = due
+        self.products: Dict[str, ProductMixin] = {}
+        self.nb_matches = 0
+
+    def get_products(self) -> List[ProductMixin]:
+        return list(self.products.values())
+
+
+# Buffers the products matching each user's rules for a window, starting at the first match,
+# so restock waves spread over consecutive scans produce one message per user.
+# Products are deduplicated by id: the most recent instance is kept.
+class NotificationDigest:
+    pending: Dict[str, PendingDigest]
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self.pending = {}
+        self.lock = Lock()
+
+    def add(self, username: str, products: List[ProductMixin], now: float = None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            digest = self.pending.get(username)
+            if digest is None:
+                digest = self.pending[username] = PendingDigest(now + self.window_seconds)
+            for product in products:
+                digest.products[product.id] = product
+            digest.nb_matches += len(products)
+
+    # Removes and returns the digests whose window is over, or all of them when force is set.
+    def pop_due(self, now: float = None, force=False) -> Dict[str, PendingDigest]:
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            due_usernames = [u for u, d in self.pending.items() if force or d.due <= now]
+            return {u: self.pending.pop(u) for u in due_usernames}
+
+    def get_next_due_in(self, now: float = None) -> Optional[float]:
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if len(self.pending) == 0:
+                return None
+            return max(0.0, min(d.due for d in self.pending.values()) - now)
+
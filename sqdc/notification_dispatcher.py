@@ -0,0 +1,236 @@
+import logging
+import time
+import traceback
+from collections import OrderedDict
+from threading import Thread, Condition
+from typing import Callable, List, Dict, Optional
+
+import requests
+
+log = logging.getLogger(__name__)
+
+DEFAULT_RETRY_AFTER_SECONDS = 30
+
+
+# recipient: a key to group and log the messages by, such as '@bob' or '#channel'. Never a URL: webhook URLs
+# are secrets, and the recipient is written in the logs. The destination belongs in the send callable.
+class Notification:
+    def __init__(self, recipient: str, text: str, send: Callable[[str], None], on_delivered: Callable[[], None] = None):
+        self.recipient = recipient
+        self.text = text
+        self.send = send
+        self.on_delivered = on_delivered
+        self.enqueued = time.monotonic()
+
+
+class DeliveryMetrics:
+    def __init__(self):
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+        self.rate_limited = 0
+        self.batches = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def add_delivered(self, notifications: List[Notification]):
+        now = time.monotonic()
+        self.batches += 1
+        for n in notifications:
+            latency = now - n.enqueued
+            self.delivered += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def get_latency_average(self) -> float:
+        return self.latency_total / self.delivered if self.delivered else 0.0
+
+
+# The messages of the requests exceptions contain the URL, which may be a webhook secret.
+def describe_error(error: requests.RequestException) -> str:
+    response = error.response
+    if response is not None:
+        return f'{type(error).__name__} {response.status_code} {response.reason or ""}'.rstrip()
+    return type(error).__name__
+
+
+# Outbound Slack messages are queued here and sent by a pool of worker threads, so the scan loop never waits on Slack.
+# Messages waiting for the same recipient are sent as a single batch, and a recipient is only sent
+# one batch at a time so messages keep their order.
+# A 429 response pauses every worker for its Retry-After delay; other failures are retried with exponential backoff.
+class NotificationDispatcher:
+    pending: Dict[str, List[Notification]]
+
+    def __init__(self, nb_workers=2, max_attempts=5, backoff_base_seconds=2.0, backoff_max_seconds=120.0):
+        self.nb_workers = nb_workers
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.pending = OrderedDict()
+        self.in_flight = set()
+        self.not_before: Dict[str, float] = {}
+        self.attempts: Dict[str, int] = {}
+        self.paused_until = 0.0
+        self.metrics = DeliveryMetrics()
+        self.condition = Condition()
+        self.is_closing = False
+        self.workers: List[Thread] = []
+
+    def start(self):
+        for i in range(self.nb_workers):
+            worker = Thread(target=self._work, name=f'notification-worker-{i}', daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    # Delivers what is still queued, up to the timeout, then stops the workers.
+    def stop(self, timeout: float = 10):
+        with self.condition:
+            self.is_closing = True
+            self.condition.notify_all()
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        nb_dropped = self.get_queue_depth()
+        if nb_dropped > 0:
+            log.warning(f'{nb_dropped} notifications were not delivered before shutdown')
+
+    def send_message(self, text: str, recipient: str, send: Callable[[str], None], on_delivered: Callable[[], None] = None):
+        with self.condition:
+            self.pending.setdefault(recipient, []).append(Notification(recipient, text, send, on_delivered))
+            self.condition.notify()
+
+    def get_queue_depth(self) -> int:
+        with self.condition:
+            return sum(len(notifications) for notifications in self.pending.values())
+
+    def get_metrics(self) -> dict:
+        with self.condition:
+            queue_depth = sum(len(notifications) for notifications in self.pending.values())
+            return {
+                'queue_depth': queue_depth,
+                'in_flight': len(self.in_flight),
+                'delivered': self.metrics.delivered,
+                'failed': self.metrics.failed,
+                'retried': self.metrics.retried,
+                'rate_limited': self.metrics.rate_limited,
+                'batches': self.metrics.batches,
+                'latency_average_seconds': self.metrics.get_latency_average(),
+                'latency_max_seconds': self.metrics.latency_max
+            }
+
+    def _work(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            self._deliver(batch)
+
+    # Blocks until a recipient has messages that can be sent now. Returns None when closing and nothing is left.
+    def _take_batch(self) -> Optional[List[Notification]]:
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                wait_time = None
+                if now < self.paused_until:
+                    wait_time = self.paused_until - now
+                else:
+                    for recipient in self.pending:
+                        if recipient in self.in_flight:
+                            continue
+                        not_before = self.not_before.get(recipient, 0.0)
+                        if not_before > now:
+                            wait_time = min(wait_time or not_before - now, not_before - now)
+                            continue
+                        self.in_flight.add(recipient)
+                        return self.pending.pop(recipient)
+
+                if self.is_closing and len(self.pending) == 0:
+                    return None
+                self.condition.wait(wait_time)
+
+    def _deliver(self, batch: List[Notification]):
+        recipient = batch[0].recipient
+        retry_delay = None
+        try:
+            batch[0].send('\n'.join(n.text for n in batch))
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 429:
+                retry_delay = self._get_retry_after(e.response)
+                self._pause(retry_delay)
+            elif e.response is not None and e.response.status_code < 500:
+                log.error(f'Notification to {recipient} rejected, it will not be retried: {describe_error(e)}')
+                self._complete(batch, delivered=False)
+                return
+            else:
+                retry_delay = self._get_backoff_delay(recipient)
+        except requests.RequestException as e:
+            log.warning(f'Notification to {recipient} failed: {describe_error(e)}')
+            retry_delay = self._get_backoff_delay(recipient)
+        except Exception:
+            log.error(f'Notification to {recipient} failed, it will not be retried:\n{traceback.format_exc()}')
+            self._complete(batch, delivered=False)
+            return
+
+        if retry_delay is None:
+            self._complete(batch, delivered=True)
+        else:
+            self._retry_later(batch, retry_delay)
+
+    def _complete(self, batch: List[Notification], delivered: bool):
+        recipient = batch[0].recipient
+        with self.condition:
+            self.in_flight.discard(recipient)
+            self.attempts.pop(recipient, None)
+            self.not_before.pop(recipient, None)
+            if delivered:
+                self.metrics.add_delivered(batch)
+            else:
+                self.metrics.failed += len(batch)
+            self.condition.notify_all()
+
+        if delivered:
+            log.debug(f'{len(batch)} notifications delivered to {recipient}')
+            for notification in batch:
+                if notification.on_delivered:
+                    try:
+                        notification.on_delivered()
+                    except:
+                        log.error(f'Notification delivery callback failed:\n{traceback.format_exc()}')
+
+    def _retry_later(self, batch: List[Notification], delay: float):
+        recipient = batch[0].recipient
+        with self.condition:
+            attempts = self.attempts.get(recipient, 0) + 1
+            if attempts >= self.max_attempts:
+                log.error(f'Giving up on {len(batch)} notifications to {recipient} after {attempts} attempts')
+                self.in_flight.discard(recipient)
+            else:
+                log.info(f'Notification to {recipient} will be retried in {delay:.1f}s')
+                self.attempts[recipient] = attempts
+                self.metrics.retried += len(batch)
+                self.not_before[recipient] = time.monotonic() + delay
+                # messages queued meanwhile for this recipient are sent in the same batch, after these ones
+                self.pending[recipient] = batch + self.pending.get(recipient, [])
+                self.pending.move_to_end(recipient, last=False)
+                self.in_flight.discard(recipient)
+                self.condition.notify_all()
+                return
+        self._complete(batch, delivered=False)
+
+    def _pause(self, delay: float):
+        with self.condition:
+            self.metrics.rate_limited += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        log.warning(f'Slack rate limit reached, pausing notifications for {delay:.1f}s')
+
+    def _get_backoff_delay(self, recipient: str) -> float:
+        with self.condition:
+            attempts = self.attempts.get(recipient, 0)
+        return min(self.backoff_base_seconds * 2 ** attempts, self.backoff_max_seconds)
+
+    @staticmethod
+    def _get_retry_after(response) -> float:
+        try:
+            return float(response.headers.get('Retry-After', DEFAULT_RETRY_AFTER_SECONDS))
+        except ValueError:
+            return DEFAULT_RETRY_AFTER_SECONDS
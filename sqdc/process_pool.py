@@ -0,0 +1,56 @@
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Set
+
+log = logging.getLogger(__name__)
+
+# The pools are created while other threads run (Tornado, notification workers, hot set poller). A forked worker
+# would inherit the locks those threads held at that instant, such as the metrics registry's, and could deadlock
+# on its first task. Workers are forked from a single-threaded fork server instead.
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def report_worker_pid(worker_pids):
+    worker_pids.put(os.getpid())
+
+
+# Each worker reports its process id when it starts, so that stuck workers can be killed: shutdown() would wait
+# for them forever, and the executor has no public way to terminate them.
+class ProcessPool(ProcessPoolExecutor):
+    def __init__(self, max_workers: int, mp_context):
+        self.reported_pids = mp_context.SimpleQueue()
+        self.worker_pids = set()
+        super().__init__(max_workers, mp_context=mp_context, initializer=report_worker_pid, initargs=(self.reported_pids,))
+
+    def get_worker_pids(self) -> Set[int]:
+        while not self.reported_pids.empty():
+            self.worker_pids.add(self.reported_pids.get())
+        return set(self.worker_pids)
+
+    def terminate(self):
+        for pid in self.get_worker_pids():
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        self.shutdown(wait=False)
+
+
+def create_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    if sys.version_info < (3, 7):
+        log.warning('Python 3.6 cannot choose how the worker processes start: they are forked from the watcher')
+        return ProcessPoolExecutor(max_workers)
+    return ProcessPool(max_workers, multiprocessing.get_context(START_METHOD))
+
+
+# For a pool whose workers stopped responding.
+def terminate_process_pool(pool: ProcessPoolExecutor):
+    if isinstance(pool, ProcessPool):
+        pool.terminate()
+    else:
+        log.warning('the worker processes cannot be terminated with Python 3.6, they are left running')
+        pool.shutdown(wait=False)
@@ -0,0 +1,69 @@
+import re
+from typing import List, Optional, Iterable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Full-text index of the products, for /watch search. An FTS5 virtual table is not part of the ORM metadata:
+# it is created by SqdcStore.initialize, and kept in sync by SqdcStore.save_products and save_variants.
+SEARCH_TABLE = 'products_fts'
+
+CREATE_SEARCH_TABLE = text(f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE}
+    USING fts5(product_id UNINDEXED, title, brand, strain, producer, category, tokenize = "unicode61 remove_diacritics 2")
+''')
+
+# The strains and producers of a product are those of its variants.
+INDEX_PRODUCTS = f'''
+    INSERT INTO {SEARCH_TABLE} (product_id, title, brand, strain, producer, category)
+    SELECT p.id, p.title, p.brand, group_concat(DISTINCT v.strain), coalesce(p.producer_name, max(v.producer_name)),
+           coalesce(p.category, max(v.level_two_category))
+    FROM products p LEFT JOIN product_variants v ON v.product_id = p.id
+    {{where}}
+    GROUP BY p.id
+'''
+
+# Ranked by bm25, a match in the title weighing the most. The weights follow the columns, product_id first.
+SEARCH_IN_STOCK_PRODUCTS = text(f'''
+    SELECT {SEARCH_TABLE}.product_id FROM {SEARCH_TABLE}
+    JOIN products ON products.id = {SEARCH_TABLE}.product_id
+    WHERE {SEARCH_TABLE} MATCH :query AND products.in_stock = 1
+    ORDER BY bm25({SEARCH_TABLE}, 0.0, 10.0, 5.0, 5.0, 3.0, 1.0)
+    LIMIT :limit
+''')
+
+# SQLite limits the number of variables of a statement.
+MAX_IDS_PER_STATEMENT = 500
+
+
+def create_search_index(connection: Connection):
+    connection.execute(CREATE_SEARCH_TABLE)
+    is_empty = connection.execute(text(f'SELECT count(*) FROM {SEARCH_TABLE}')).scalar() == 0
+    if is_empty:
+        connection.execute(text(INDEX_PRODUCTS.format(where='')))
+
+
+def update_search_index(connection: Connection, product_ids: Iterable[str]):
+    product_ids = list(set(product_ids))
+    for start in range(0, len(product_ids), MAX_IDS_PER_STATEMENT):
+        chunk = product_ids[start:start + MAX_IDS_PER_STATEMENT]
+        parameters = {f'id{i}': product_id for i, product_id in enumerate(chunk)}
+        in_clause = '(' + ', '.join(f':{name}' for name in parameters) + ')'
+        connection.execute(text(f'DELETE FROM {SEARCH_TABLE} WHERE product_id IN {in_clause}'), parameters)
+        connection.execute(text(INDEX_PRODUCTS.format(where=f'WHERE p.id IN {in_clause}')), parameters)
+
+
+# Every word must match, as a prefix: "pink kus" finds Pink Kush. Words are quoted, so that the FTS5
+# query syntax (AND, OR, NEAR, column filters) typed by users is searched for rather than interpreted.
+def build_match_query(search: str) -> Optional[str]:
+    words = re.findall(r'\w+', search)
+    if len(words) == 0:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_in_stock_product_ids(connection: Connection, search: str, limit: int) -> List[str]:
+    query = build_match_query(search)
+    if query is None:
+        return []
+    return [product_id for (product_id,) in connection.execute(SEARCH_IN_STOCK_PRODUCTS, {'query': query, 'limit': limit})]
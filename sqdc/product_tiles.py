@@ -0,0 +1,35 @@
+import logging
+from typing import List, NamedTuple
+
+from bs4 import BeautifulSoup
+
+log = logging.getLogger(__name__)
+
+DOMAIN = 'https://www.sqdc.ca'
+
+
+# What a search result page tells about a product. Plain data: tiles are parsed in worker processes
+# when --parse-workers is set, and sent back to the scan.
+class ProductTile(NamedTuple):
+    id: str
+    title: str
+    url: str
+    brand: str
+    in_stock: bool
+
+
+# Module level so it can run in a ProcessPoolExecutor.
+def parse_product_tiles(raw_html: str) -> List[ProductTile]:
+    soup = BeautifulSoup(raw_html, 'html.parser')
+    tiles = []
+    for ptag in soup.select('div.product-tile'):
+        title_anchor = ptag.select_one('a[data-qa="search-product-title"]')
+        title = str(title_anchor.contents[0])
+        url = DOMAIN + title_anchor['href']
+        try:
+            brand_tag = ptag.select_one('div[class="js-equalized-brand"]')
+            brand = "" if len(brand_tag.contents) == 0 else str(brand_tag.contents[0])
+            tiles.append(ProductTile(title_anchor['data-productid'], title, url, brand, 'product-outofstock' not in ptag['class']))
+        except Exception as e:
+            log.warning(f'Failed to parse product {title} URL={url}: {e}')
+    return tiles
@@ -0,0 +1,94 @@
+import logging
+from typing import Dict, List
+
+from sqdc.SqdcStore import SqdcStore
+from sqdc.catalog_snapshot import CatalogSnapshot
+from sqdc.dataobjects.product import Product
+from sqdc.dataobjects.product_variant import ProductVariant
+
+log = logging.getLogger(__name__)
+
+
+# In-memory copy of the products table, loaded once and then kept in sync with the watcher's own writes.
+class ProductsCatalog:
+    store: SqdcStore
+    products: Dict[str, Product]
+
+    def __init__(self, store: SqdcStore):
+        self.store = store
+        self.products = None
+
+    def is_loaded(self) -> bool:
+        return self.products is not None
+
+    def load(self):
+        products = self.load_snapshot()
+        source = 'snapshot'
+        if products is None:
+            products = self.store.get_products()
+            source = 'database'
+
+        self.products = {p.id: p for p in products}
+        log.info(f'Products catalog loaded from {source}: {len(self.products)} products')
+
+    # Returns None if there is no snapshot, or if products were saved to the database after it was written.
+    def load_snapshot(self) -> List[Product]:
+        try:
+            snapshot = CatalogSnapshot.read(self.store.snapshot_file)
+        except Exception as e:
+            log.warning(f'Could not read catalog snapshot {self.store.snapshot_file}: {e}')
+            return None
+
+        if snapshot is None or snapshot.created < self.store.get_products_last_saved_timestamp():
+            return None
+        return snapshot.products
+
+    def save_snapshot(self):
+        if self.is_loaded():
+            CatalogSnapshot.write(self.store.snapshot_file, list(self.products.values()))
+
+    def get_products(self) -> List[Product]:
+        if not self.is_loaded():
+            self.load()
+        return list(self.products.values())
+
+    def update(self, products: List[Product]):
+        if not self.is_loaded():
+            return
+        for p in products:
+            self.products[p.id] = p
+
+    def update_variants_specifications(self, variants: List[ProductVariant]):
+        if not self.is_loaded():
+            return
+        for v in variants:
+            product = self.products.get(v.product_id)
+            catalog_variant = product and product.get_variant(v.id)
+            if catalog_variant:
+                catalog_variant.copy_specifications(v)
+                catalog_variant.last_updated = v.last_updated
+
+    def update_products_classification(self, products: List[Product]):
+        if not self.is_loaded():
+            return
+        for p in products:
+            catalog_product = self.products.get(p.id)
+            if catalog_product:
+                catalog_product.category = p.category
+                catalog_product.cannabis_type = p.cannabis_type
+                catalog_product.producer_name = p.producer_name
+                catalog_product.last_updated = p.last_updated
+
+    # Only copies the notification columns: a scan may have saved a newer version of the products since they were sent.
+    def update_products_notification(self, products: List[Product]):
+        if not self.is_loaded():
+            return
+        for p in products:
+            catalog_product = self.products.get(p.id)
+            if catalog_product:
+                catalog_product.last_in_stock_notification = p.last_in_stock_notification
+                catalog_product.last_updated = p.last_updated
+
+    def invalidate(self):
+        log.info('Products catalog invalidated, it will be reloaded on next scan')
+        self.products = None
@@ -0,0 +1,89 @@
+from typing import List, Dict, Tuple, Callable
+
+from sqdc.dataobjects.product_mixins import ProductMixin
+from sqdc.formatter import SqdcFormatter
+
+# as tabulate, wide characters (CJK) count for two columns when wcwidth is installed
+try:
+    from wcwidth import wcswidth as get_text_width
+except ImportError:
+    get_text_width = len
+
+TABLE_HEADERS = ['% avail.', 'Name', 'Strain', 'Brand', 'Category', 'Type', 'formats', 'URL']
+
+# as tabulate, columns are at least 2 characters wider than their header
+HEADER_MIN_PADDING = 2
+
+
+# Defers a log message until a handler emits it: logging only calls str() on records that pass the level checks.
+class LazyMessage:
+    def __init__(self, render: Callable[[], str]):
+        self.render = render
+        self.rendered = None
+
+    def __str__(self):
+        if self.rendered is None:
+            self.rendered = self.render()
+        return self.rendered
+
+
+# Renders the products table in the same fancy_grid layout as SqdcFormatter.build_products_table, keeping the
+# rendered lines between scans: a product line is only rendered again if its cells or the column widths changed.
+class ProductsTable:
+    lines: Dict[str, Tuple[tuple, tuple, str]]
+
+    def __init__(self):
+        self.lines = {}
+        self.nb_rendered_lines = 0
+
+    def lazy(self, products: List[ProductMixin]) -> LazyMessage:
+        return LazyMessage(lambda: self.render(products))
+
+    def render(self, products: List[ProductMixin]) -> str:
+        rows = [(p.id, tuple('' if cell is None else str(cell) for cell in SqdcFormatter.format_table_row(p)))
+                for p in products]
+        widths = [len(h) + HEADER_MIN_PADDING for h in TABLE_HEADERS]
+        for _, cells in rows:
+            widths = [max(width, self.get_cell_width(cell)) for width, cell in zip(widths, cells)]
+        widths = tuple(widths)
+
+        lines = {}
+        for product_id, cells in rows:
+            line = self.lines.get(product_id)
+            if line is None or line[0] != cells or line[1] != widths:
+                line = (cells, widths, self.render_line(cells, widths))
+                self.nb_rendered_lines += 1
+            lines[product_id] = line
+        # products that are not displayed anymore are dropped
+        self.lines = lines
+
+        separator = self.render_border('├', '─', '┼', '┤', widths)
+        body = ('\n' + separator + '\n').join(lines[product_id][2] for product_id, _ in rows)
+        table = [self.render_border('╒', '═', '╤', '╕', widths),
+                 self.render_line(TABLE_HEADERS, widths),
+                 self.render_border('╞', '═', '╪', '╡', widths)]
+        if body:
+            table.append(body)
+        table.append(self.render_border('╘', '═', '╧', '╛', widths))
+        return '\n' + '\n'.join(table) + '\n'
+
+    @staticmethod
+    def get_cell_width(cell: str) -> int:
+        return max((get_text_width(line) for line in cell.splitlines()), default=0)
+
+    # A cell with line breaks spans several lines of the table, the other cells of its row are padded with blank lines.
+    @staticmethod
+    def render_line(cells, widths) -> str:
+        cells_lines = [cell.splitlines() for cell in cells]
+        nb_lines = max(1, max(len(lines) for lines in cells_lines))
+        return '\n'.join('│ ' + ' │ '.join(ProductsTable.pad(lines[i] if i < len(lines) else '', width)
+                                           for lines, width in zip(cells_lines, widths)) + ' │'
+                         for i in range(nb_lines))
+
+    @staticmethod
+    def pad(text: str, width: int) -> str:
+        return text + ' ' * (width - get_text_width(text))
+
+    @staticmethod
+    def render_border(left: str, fill: str, middle: str, right: str, widths) -> str:
+        return left + middle.join(fill * (width + 2) for width in widths) + right
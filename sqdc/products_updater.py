@@ -2,19 +2,27 @@ import logging
 import random
 import string
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
 from datetime import datetime
 from threading import Event
-from typing import List, Dict, Iterable
+from typing import List, Dict, Iterable, Tuple, Deque, Iterator
 
 from babel.dates import format_timedelta
-from bs4 import BeautifulSoup
+from requests import RequestException
 
 from sqdc import SqdcStore
 from sqdc.dataobjects.product import Product
 from sqdc.dataobjects.product_variant import ProductVariant
+from sqdc.exceptions import ScanPageError
 from sqdc.formatter import SqdcFormatter
-from sqdc.logic.product_calculator import find_by_id
 from sqdc.logic.product_history_analyzer import ProductHistoryAnalyzer
+from sqdc.metrics import scan_stage
+from sqdc.product_tiles import ProductTile, parse_product_tiles
+from sqdc.request_limiter import RequestAbortedError
+from sqdc.scan_checkpoint import ScanCheckpoint
+from sqdc.scan_shards import ScanShards, CrawledPage
+from sqdc.tracing import traced
 from sqdc.sqdc_client import SqdcClient
 
 DEFAULT_LOCALE = 'en-CA'
@@ -23,6 +31,11 @@ BASE_URL = DOMAIN + '/' + DEFAULT_LOCALE
 
 SLACK_API_URL = 'https://slack.com/api'
 
+# With a parse pool, pages fetched but not parsed yet. Bounds the memory used, and the pages fetched past the end.
+MAX_PAGES_IN_FLIGHT = 16
+# A page parses in well under a second: past this, the worker is considered stuck and the scan fails.
+PARSE_TIMEOUT_SECONDS = 60
+
 log = logging.getLogger(__name__)
 
 
@@ -30,26 +43,41 @@ class ProductsUpdater:
     store: SqdcStore
     sqdc_client: SqdcClient
     db_products: List[Product]
+    db_products_by_id: Dict[str, Product]
     db_variants: Dict[str, ProductVariant]
 
-    def __init__(self, store: SqdcStore, sqdc_client: SqdcClient, stop_event: Event):
+    # parse_pool: when set, the search result pages are parsed in these worker processes.
+    # scan_shards: when set, the pages, inventory and specifications are fetched by its worker processes instead.
+    # checkpoint: when started, the pages and specifications it has are not fetched again, and new ones are added to it.
+    # use_stale_fallback: a page that cannot be fetched is replaced by the last known good one (see get_fallback_tiles).
+    def __init__(self, store: SqdcStore, sqdc_client: SqdcClient, stop_event: Event, parse_pool: ProcessPoolExecutor = None,
+                 scan_shards: ScanShards = None, checkpoint: ScanCheckpoint = None, use_stale_fallback: bool = False):
         self.stop_event = stop_event
+        self.parse_pool = parse_pool
+        self.scan_shards = scan_shards
+        self.checkpoint = checkpoint
+        self.use_stale_fallback = use_stale_fallback
+        self.stale_pages: List[int] = []
+        self.db_products = []
+        self.db_products_by_id = {}
         self.store = store
         self.sqdc_client = sqdc_client
         self.use_mocked_variants_in_stock = False
 
-    def get_products(self, cached_products: List[Product], max_pages: int = 999999) -> List[Product]:
+    # db_products are never modified: the returned products are new instances.
+    @traced('updater')
+    def get_products(self, db_products: List[Product], use_cached_products: bool, max_pages: int = 999999) -> List[Product]:
         start_time = time.time()
 
-        if cached_products:
-            self.db_products = cached_products
-            products = cached_products
+        self.db_products = db_products
+        self.db_products_by_id = {p.id: p for p in db_products}
+        if use_cached_products:
+            products = [ProductsUpdater.copy_product(p) for p in db_products]
         else:
-            self.db_products = self.store.get_products()
             products = self.fetch_all_products_summary(max_pages=max_pages)
         self.db_variants = ProductsUpdater.expand_all_variants(self.db_products)
 
-        self.populate_products_variants(products, products_cache_used=bool(cached_products))
+        self.populate_products_variants(products)
 
         elapsed = format_timedelta(time.time() - start_time, granularity='millisecond')
         log.info(f'Website parsing - COMPLETED in {elapsed}')
@@ -64,65 +92,134 @@ class ProductsUpdater:
                 variants[v.id] = v
         return variants
 
+    @traced('updater')
     def fetch_all_products_summary(self, max_pages: int) -> List[Product]:
-        page = 1
-        has_reached_end = False
         products = []
-        while not has_reached_end and page <= max_pages:
-            products_html = self.sqdc_client.get_product_result_page_html(page)
-            products_in_page = self.parse_products_html(products_html)
-            has_reached_end = len(products_in_page) == 0
+        nb_pages = 0
+        has_reached_end = False
+        resumed_pages = self.checkpoint.get_resumable_pages() if self.checkpoint else []
+        for page in resumed_pages:
+            tiles_in_page = self.checkpoint.pages[page]
+            has_reached_end = len(tiles_in_page) == 0
             if not has_reached_end:
-                page += 1
-            products += products_in_page
-        log.info(f'Fetched {len(products)} from SQDC API ({page - 1})')
+                nb_pages += 1
+            products += [self.create_product(tile) for tile in tiles_in_page]
+
+        if not has_reached_end:
+            for crawled in self.crawl_pages(len(resumed_pages) + 1, max_pages):
+                if crawled.error is None:
+                    tiles_in_page = crawled.tiles
+                    if self.checkpoint:
+                        self.checkpoint.add_page(crawled.page, tiles_in_page)
+                else:
+                    tiles_in_page = self.get_fallback_tiles(crawled.page, crawled.error)
+                if len(tiles_in_page) == 0:
+                    break
+                nb_pages += 1
+                products += [self.create_product(tile, is_stale=crawled.error is not None) for tile in tiles_in_page]
+        log.info(f'Fetched {len(products)} from SQDC API ({nb_pages})')
 
         self.store.update_last_scan_timestamp(datetime.now())
 
         return products
 
-    def parse_products_html(self, raw_html: string) -> List[Product]:
-        soup = BeautifulSoup(raw_html, 'html.parser')
-        product_tags = soup.select('div.product-tile')
-        products = []
-        for ptag in product_tags:
-            title_anchor = ptag.select_one('a[data-qa="search-product-title"]')
-            title = title_anchor.contents[0]
-            url = DOMAIN + title_anchor['href']
+    def crawl_pages(self, first_page: int, max_pages: int) -> Iterator[CrawledPage]:
+        if self.scan_shards is not None:
+            pages = self.scan_shards.crawl(first_page, max_pages)
+            while True:
+                with scan_stage('fetch'):
+                    crawled = next(pages, None)
+                if crawled is None:
+                    return
+                yield crawled
+        elif self.parse_pool is None:
+            yield from self.fetch_and_parse_pages(first_page, max_pages)
+        else:
+            yield from self.fetch_and_parse_pages_in_pool(first_page, max_pages)
+
+    # Only used with --stale-page-fallback, and only if the page was fetched by a previous complete scan.
+    # Otherwise the scan fails, and the next one resumes from the checkpoint.
+    def get_fallback_tiles(self, page: int, error: str) -> List[ProductTile]:
+        tiles = self.checkpoint.get_fallback_page(page) if self.checkpoint and self.use_stale_fallback else None
+        if tiles is None:
+            raise ScanPageError(page, error)
+        log.warning(f'Search result page {page} could not be fetched, using the last known good one: {error}')
+        self.stale_pages.append(page)
+        self.checkpoint.add_page(page, tiles, is_stale=True)
+        return tiles
+
+    # Yields the pages until the caller stops at the end of the catalog.
+    def fetch_and_parse_pages(self, first_page: int, max_pages: int) -> Iterator[CrawledPage]:
+        for page in range(first_page, max_pages + 1):
             try:
-                brand_tag = ptag.select_one('div[class="js-equalized-brand"]')
-                brand = "" if len(brand_tag.contents) == 0 else brand_tag.contents[0]
-
-                product_id = title_anchor['data-productid']
-                db_product = find_by_id(self.db_products, product_id)
-
-                product = Product(id=product_id)
-                if db_product:
-                    self.merge_product(product, db_product)
-
-                product.title = title
-                product.url = url
-                product.in_stock = 'product-outofstock' not in ptag['class']
-                product.brand = brand
-
-                products.append(product)
-            except Exception as e:
-                print('Failed to parse product ' + title + ' URL=' + url)
-                print(e)
-
-        return products
+                with scan_stage('fetch'):
+                    products_html = self.sqdc_client.get_product_result_page_html(page)
+            except RequestAbortedError:
+                raise
+            except RequestException as e:
+                yield CrawledPage(page, None, str(e))
+                continue
+            with scan_stage('parse'):
+                tiles_in_page = parse_product_tiles(products_html)
+            yield CrawledPage(page, tiles_in_page)
+
+    # Pages are parsed by the worker processes while the next ones are fetched. The end of the catalog is only
+    # known once an empty page is parsed: up to MAX_PAGES_IN_FLIGHT pages past the end may be fetched.
+    def fetch_and_parse_pages_in_pool(self, first_page: int, max_pages: int) -> Iterator[CrawledPage]:
+        pending_pages: Deque[Tuple[int, Future]] = deque()
+        page = first_page
+        while page <= max_pages or pending_pages:
+            if page <= max_pages:
+                try:
+                    with scan_stage('fetch'):
+                        products_html = self.sqdc_client.get_product_result_page_html(page)
+                    pending_pages.append((page, self.parse_pool.submit(parse_product_tiles, products_html)))
+                except RequestAbortedError:
+                    raise
+                except RequestException as e:
+                    pending_pages.append((page, str(e)))
+                page += 1
 
-    def populate_products_variants(self, products: List[Product], products_cache_used: bool):
+            while pending_pages and (page > max_pages or len(pending_pages) >= MAX_PAGES_IN_FLIGHT
+                                     or isinstance(pending_pages[0][1], str) or pending_pages[0][1].done()):
+                pending_page, result = pending_pages.popleft()
+                if isinstance(result, str):
+                    yield CrawledPage(pending_page, None, result)
+                else:
+                    with scan_stage('parse'):
+                        tiles_in_page = result.result(timeout=PARSE_TIMEOUT_SECONDS)
+                    yield CrawledPage(pending_page, tiles_in_page)
+
+    @traced('updater')
+    def parse_products_html(self, raw_html: string) -> List[Product]:
+        return [self.create_product(tile) for tile in parse_product_tiles(raw_html)]
+
+    # Merged with the database product, if any.
+    def create_product(self, tile: ProductTile, is_stale: bool = False) -> Product:
+        product = Product(id=tile.id)
+        product.is_stale = is_stale
+        db_product = self.db_products_by_id.get(tile.id)
+        if db_product:
+            self.merge_product(product, db_product)
+
+        product.title = tile.title
+        product.url = tile.url
+        product.in_stock = tile.in_stock
+        product.brand = tile.brand
+        return product
+
+    @traced('updater')
+    def populate_products_variants(self, products: List[Product]):
         log.debug('populating product variants')
 
         product_ids = [p.id for p in products]
-        all_variants_prices = self.sqdc_client.api_calculate_prices(product_ids)
+        with scan_stage('prices'):
+            all_variants_prices = self.sqdc_client.api_calculate_prices(product_ids)
 
+        variant_prices_by_product = {pprice['ProductId']: pprice['VariantPrices'] for pprice in all_variants_prices}
         for product in products:
             product_id = product.id
-            variant_prices = [pprice['VariantPrices']
-                              for pprice in all_variants_prices
-                              if pprice['ProductId'] == product_id][0]
+            variant_prices = variant_prices_by_product[product_id]
 
             variants = []
             for v in variant_prices:
@@ -141,11 +238,16 @@ class ProductsUpdater:
 
             self.merge_variants(product, variants)
 
-        self.populate_products_variants_details(products, products_cache_used)
+        self.populate_products_variants_details(products)
 
         for p in products:
             p.in_stock = p.is_in_stock()
 
+    @staticmethod
+    def copy_product(product_source: Product) -> Product:
+        product = Product(id=product_source.id, title=product_source.title, url=product_source.url, brand=product_source.brand)
+        return ProductsUpdater.merge_product(product, product_source)
+
     @staticmethod
     def merge_product(product_target: Product, product_source: Product) -> Product:
         product_target.created = product_source.created
@@ -174,14 +276,15 @@ class ProductsUpdater:
         variant_target.list_price = variant_source.list_price
         variant_target.price = variant_source.price
         variant_target.price_per_gram = variant_source.price_per_gram
-        variant_target.specifications = variant_source.specifications
+        variant_target.copy_specifications(variant_source)
 
+    @traced('updater')
     def update_availability_stats(self, product: Product):
         variants = product.get_variants_in_stock()
         if len(variants) == 0:
             return
 
-        eight_variant = next(iter([v for v in variants if v.product_id == product.id and float(v.specifications['GramEquivalent']) == 3.5]), None)
+        eight_variant = next(iter([v for v in variants if v.product_id == product.id and v.gram_equivalent == 3.5]), None)
         if eight_variant:
             best_variant = tuple([eight_variant, self._calculate_variant_availability_stats(eight_variant)])
         else:
@@ -198,45 +301,64 @@ class ProductsUpdater:
     def parse_price(raw_price: str):
         return float(raw_price.replace('$', ''))
 
-    def populate_products_variants_details(self, products: List[Product], products_cache_used: bool):
+    @traced('updater')
+    def populate_products_variants_details(self, products: List[Product]):
 
         variants_ids_map: Dict[string, ProductVariant] = {}
         for product in filter(lambda p: len(p.variants), products):
             variants_ids_map.update({v.id: v.product_id for v in product.variants})
 
         all_variants = ProductsUpdater.expand_all_variants(products)
-        variants_in_stock = self.get_variants_ids_in_stock(iter(all_variants.keys()))
+        products_by_id = {p.id: p for p in products}
+        with scan_stage('inventory'):
+            variants_in_stock = set(self.get_variants_ids_in_stock(iter(all_variants.keys())))
+        prefetched_specifications = self.prefetch_specifications(list(all_variants.values())) if self.scan_shards else {}
 
         for vid, variant in all_variants.items():
             if self.stop_event.is_set():
                 raise InterruptedError
 
-            product = find_by_id(products, variant.product_id)
+            product = products_by_id[variant.product_id]
             variant.in_stock = variant.id in variants_in_stock
             if variant.in_stock and variant.out_of_stock_since:
                 variant.out_of_stock_since = None
             elif not variant.in_stock and not variant.out_of_stock_since:
                 variant.out_of_stock_since = datetime.now()
 
-            if products_cache_used:
-                specs = variant.specifications
-            else:
-                db_variant = self.db_variants.get(vid, None)
-                specs = db_variant and db_variant.specifications
-            # Yes.. we never re-fetch specifications (sometimes they change). we should eventually.
-            variant.specifications = specs or self.get_variant_specifications(variant.product_id, variant.id)
-
-            product.category = variant.specifications['LevelTwoCategory']
-            product.cannabis_type = variant.specifications['CannabisType']
-            product.producer_name = variant.specifications['ProducerName']
-            variant.quantity_description = SqdcFormatter.format_variant_quantity(variant.specifications['GramEquivalent'])
+            # specifications were copied from the database variant, if any (see merge_variant).
+            # Stale specifications are re-fetched in the background by SpecificationsRefresher.
+            if not variant.has_specifications():
+                specifications = prefetched_specifications.get(variant.id)
+                if specifications is None and self.checkpoint:
+                    specifications = self.checkpoint.get_specifications(variant.id)
+                if specifications is None:
+                    specifications = self.get_variant_specifications(variant.product_id, variant.id)
+                    if self.checkpoint:
+                        self.checkpoint.add_specifications({variant.id: specifications})
+                variant.set_specifications(specifications)
+
+            product.category = variant.level_two_category
+            product.cannabis_type = variant.cannabis_type
+            product.producer_name = variant.producer_name
+            variant.quantity_description = SqdcFormatter.format_variant_quantity(variant.gram_equivalent)
+
+    # With scan shards, the missing specifications are fetched at once, by SKU ranges.
+    def prefetch_specifications(self, variants: List[ProductVariant]) -> Dict[str, Dict[str, str]]:
+        missing = [(v.product_id, v.id) for v in variants
+                   if not v.has_specifications() and not (self.checkpoint and self.checkpoint.get_specifications(v.id))]
+        if len(missing) == 0:
+            return {}
+        with scan_stage('specs'):
+            specifications = self.scan_shards.get_specifications(missing)
+        if self.checkpoint:
+            self.checkpoint.add_specifications(specifications)
+        return specifications
 
     def get_variant_specifications(self, product_id, variant_id) -> Dict[str, str]:
-        specifications = self.sqdc_client.api_get_specifications(product_id, variant_id)[0]
-        attributes_reformated = {a['PropertyName']: a['Value']
-                                 for a in specifications['Attributes']}
-        return attributes_reformated
+        with scan_stage('specs'):
+            return self.sqdc_client.get_specifications_attributes(product_id, variant_id)
 
+    @traced('updater')
     def get_variants_ids_in_stock(self, variants_ids: Iterable[str]):
         if self.use_mocked_variants_in_stock:
             ids = ['628582000074', '688083000980', '688083001093', '688083001215', '688083001550', '688083001680', '688083001703', '627560010012',
@@ -258,6 +380,8 @@ class ProductsUpdater:
                 ids.remove(ids[i])
             return ids
 
+        elif self.scan_shards is not None:
+            return self.scan_shards.find_inventory_items(variants_ids)
         else:
             items = self.sqdc_client.api_find_inventory_items(variants_ids)
             log.debug('variants in stock: ')
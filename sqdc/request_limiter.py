@@ -0,0 +1,190 @@
+import logging
+import math
+import random
+import time
+from contextlib import contextmanager
+from threading import Lock, Condition, Event
+from typing import Dict, NamedTuple, Optional
+
+from requests import RequestException
+
+from sqdc.metrics import HTTP_RATE_LIMIT, HTTP_CONCURRENCY_LIMIT, HTTP_REQUESTS_IN_FLIGHT, HTTP_THROTTLED_SECONDS
+
+log = logging.getLogger(__name__)
+
+# Requests per second allowed to each family of SQDC endpoints. 0 does not limit the family.
+DEFAULT_RATES = {
+    'search': 10.0,
+    'prices': 2.0,
+    'inventory': 5.0,
+    'specifications': 20.0,
+}
+DEFAULT_MAX_CONCURRENCY = 16
+INITIAL_CONCURRENCY = 2
+
+# A response slower than this shrinks the concurrency window, as a 429 or a 5xx does.
+LATENCY_TARGET_SECONDS = 2.0
+
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY_SECONDS = 0.5
+RETRY_MAX_DELAY_SECONDS = 10.0
+# While the window is full, how often the stop event is checked.
+STOP_CHECK_INTERVAL_SECONDS = 0.5
+
+
+class RequestLimits(NamedTuple):
+    rates: Dict[str, float]
+    max_concurrency: int
+
+    @staticmethod
+    def default() -> 'RequestLimits':
+        return RequestLimits(dict(DEFAULT_RATES), DEFAULT_MAX_CONCURRENCY)
+
+    # The share of each of n processes sending requests to the same website.
+    def divide(self, n: int) -> 'RequestLimits':
+        return RequestLimits({family: rate / n for family, rate in self.rates.items()}, max(1, math.ceil(self.max_concurrency / n)))
+
+
+def is_overload_status(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+# Exponential backoff with full jitter, so that the clients that failed together do not retry together.
+# The server's Retry-After, in seconds, is a minimum.
+def get_retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    delay = random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+    try:
+        return max(delay, float(retry_after)) if retry_after else delay
+    except ValueError:
+        return delay
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Takes a token right away and returns how long to wait before using it: waiting callers are served in order.
+    def take(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    # Takes a token only if one is available now.
+    def try_take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+# A request that was not sent, or not retried, because the watcher is stopping.
+class RequestAbortedError(RequestException):
+    pass
+
+
+# Additive increase, multiplicative decrease of the number of requests in flight: one more per window of
+# successful requests, half as many on an overload.
+class ConcurrencyWindow:
+    def __init__(self, initial: int, maximum: int, minimum: int = 1, latency_target: float = LATENCY_TARGET_SECONDS,
+                 stop_event: Event = None):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.last_decrease = float('-inf')
+        self.condition = Condition()
+        self.stop_event = stop_event or Event()
+
+    # Returns when the request started, to give back to release().
+    def acquire(self) -> float:
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                if self.stop_event.is_set():
+                    raise RequestAbortedError('the request was aborted, the watcher is stopping')
+                self.condition.wait(STOP_CHECK_INTERVAL_SECONDS)
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started: float, is_overloaded: bool):
+        latency = time.monotonic() - started
+        with self.condition:
+            self.in_flight -= 1
+            if is_overloaded or latency > self.latency_target:
+                # The requests already in flight when the window shrank saw the same overload: only shrink once.
+                if started >= self.last_decrease:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self.last_decrease = time.monotonic()
+                    log.debug(f'concurrency window decreased to {int(self.limit)}')
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+class RequestOutcome:
+    is_overloaded = False
+
+
+# Paces the requests to the SQDC website: a token bucket per endpoint family, and one concurrency window shared
+# by all of them. Shared by the clients of a process, so the scan, the hot set poller and the specifications
+# refresher don't add up to more than the limits.
+# stop_event: when set, the waits for a token, for room in the window or before a retry end with a RequestAbortedError.
+class RequestLimiter:
+    buckets: Dict[str, TokenBucket]
+
+    def __init__(self, limits: RequestLimits = None, stop_event: Event = None):
+        self.limits = limits or RequestLimits.default()
+        self.stop_event = stop_event or Event()
+        self.buckets = {}
+        self.buckets_lock = Lock()
+        self.window = ConcurrencyWindow(INITIAL_CONCURRENCY, self.limits.max_concurrency, stop_event=self.stop_event)
+
+    def wait(self, delay: float):
+        if self.stop_event.wait(delay):
+            raise RequestAbortedError('the request was aborted, the watcher is stopping')
+
+    def get_bucket(self, family: str) -> TokenBucket:
+        with self.buckets_lock:
+            bucket = self.buckets.get(family)
+            if bucket is None:
+                bucket = self.buckets[family] = TokenBucket(self.limits.rates.get(family, 0.0))
+            return bucket
+
+    # Set outcome.is_overloaded from the response: errors raised in the block count as overloads.
+    @contextmanager
+    def request(self, family: str):
+        delay = self.get_bucket(family).take()
+        if delay > 0:
+            HTTP_THROTTLED_SECONDS.inc(delay, family)
+        self.wait(delay)
+        started = self.window.acquire()
+        outcome = RequestOutcome()
+        try:
+            yield outcome
+        except Exception:
+            outcome.is_overloaded = True
+            raise
+        finally:
+            self.window.release(started, outcome.is_overloaded)
+
+    def register_metrics(self):
+        for family, rate in self.limits.rates.items():
+            HTTP_RATE_LIMIT.set(rate, family)
+        HTTP_CONCURRENCY_LIMIT.set_function(lambda: int(self.window.limit))
+        HTTP_REQUESTS_IN_FLIGHT.set_function(lambda: self.window.in_flight)
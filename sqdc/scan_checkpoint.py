@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqdc.product_tiles import ProductTile
+
+log = logging.getLogger(__name__)
+
+# A failed scan older than this starts over: the search result pages it fetched are too old to be reused.
+CHECKPOINT_MAX_AGE_SECONDS = 60 * 60
+
+
+# Progress of the current full scan, journaled as it goes: the search result pages, in order, and the
+# specifications fetched. When a scan fails, the next one resumes from there instead of crawling everything again.
+# The inventory is never checkpointed: the stock must be the current one.
+# Once a scan completes, its journal is kept as the last known good pages, used as a fallback for pages that fail.
+class ScanCheckpoint:
+    pages: Dict[int, List[ProductTile]]
+    specifications: Dict[str, Dict[str, str]]
+
+    def __init__(self, journal_path: Path, fallback_path: Path, max_age_seconds: float = CHECKPOINT_MAX_AGE_SECONDS):
+        self.journal_path = journal_path
+        self.fallback_path = fallback_path
+        self.max_age_seconds = max_age_seconds
+        self.pages = {}
+        self.stale_pages = set()
+        self.specifications = {}
+        self.end_page: Optional[int] = None
+        self.fallback_pages: Optional[Dict[int, List[ProductTile]]] = None
+        self.fallback_end_page: Optional[int] = None
+        self.is_started = False
+
+    # True when a failed scan left a checkpoint recent enough to resume from.
+    def has_pending_scan(self) -> bool:
+        try:
+            created = self.read_created(self.journal_path)
+        except (OSError, ValueError):
+            return False
+        return created is not None and time.time() - created < self.max_age_seconds
+
+    def start(self):
+        self.pages = {}
+        self.stale_pages = set()
+        self.specifications = {}
+        self.end_page = None
+        if self.has_pending_scan():
+            self.pages, self.stale_pages, self.specifications, self.end_page = self.read_journal(self.journal_path)
+            log.info(f'Resuming the last scan from its checkpoint: {len(self.pages)} pages, '
+                     f'{len(self.specifications)} specifications already fetched')
+        else:
+            self.journal_path.write_text(json.dumps({'type': 'checkpoint', 'created': time.time()}) + '\n')
+        self.is_started = True
+
+    # Pages are only resumed up to the first one missing, or replaced by its last known good copy.
+    def get_resumable_pages(self) -> List[int]:
+        pages = []
+        while len(pages) + 1 in self.pages and len(pages) + 1 not in self.stale_pages:
+            pages.append(len(pages) + 1)
+        return pages
+
+    # Stale pages are the last known good copy of a page that could not be fetched: kept as such for the next
+    # fallback, but fetched again when resuming.
+    def add_page(self, page: int, tiles: List[ProductTile], is_stale: bool = False):
+        if not self.is_started:
+            return
+        self.pages[page] = tiles
+        if is_stale:
+            self.stale_pages.add(page)
+        if len(tiles) == 0:
+            self.end_page = page
+        self._append({'type': 'page', 'page': page, 'tiles': [list(t) for t in tiles], 'stale': is_stale})
+
+    def get_specifications(self, variant_id: str) -> Optional[Dict[str, str]]:
+        return self.specifications.get(variant_id)
+
+    def add_specifications(self, specifications_by_variant: Dict[str, Dict[str, str]]):
+        if not self.is_started or len(specifications_by_variant) == 0:
+            return
+        self.specifications.update(specifications_by_variant)
+        self._append({'type': 'specifications', 'specifications': specifications_by_variant})
+
+    # The last known good tiles of a page: [] past the end of the catalog, None if unknown.
+    def get_fallback_page(self, page: int) -> Optional[List[ProductTile]]:
+        if self.fallback_pages is None:
+            self.load_fallback()
+        if self.fallback_end_page is not None and page >= self.fallback_end_page:
+            return []
+        return self.fallback_pages.get(page)
+
+    def load_fallback(self):
+        try:
+            self.fallback_pages, _, _, self.fallback_end_page = self.read_journal(self.fallback_path)
+        except (OSError, ValueError) as e:
+            if self.fallback_path.exists():
+                log.warning(f'could not read the last known good pages {self.fallback_path}: {e}')
+            self.fallback_pages, self.fallback_end_page = {}, None
+
+    def complete(self):
+        if not self.is_started:
+            return
+        self.is_started = False
+        if self.end_page is not None:
+            os.replace(self.journal_path, self.fallback_path)
+            self.fallback_pages = None
+        else:
+            self.journal_path.unlink()
+        self.pages = {}
+        self.stale_pages = set()
+        self.specifications = {}
+
+    def _append(self, entry: dict):
+        with open(self.journal_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry) + '\n')
+
+    @staticmethod
+    def read_created(path: Path) -> Optional[float]:
+        with open(path, encoding='utf-8') as file:
+            header = json.loads(file.readline())
+        return header.get('created') if header.get('type') == 'checkpoint' else None
+
+    # A line cut by a crash ends the journal.
+    @staticmethod
+    def read_journal(path: Path):
+        pages = {}
+        stale_pages = set()
+        specifications = {}
+        end_page = None
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry['type'] == 'page':
+                    pages[entry['page']] = [ProductTile(*t) for t in entry['tiles']]
+                    if entry.get('stale'):
+                        stale_pages.add(entry['page'])
+                    if len(entry['tiles']) == 0:
+                        end_page = entry['page']
+                elif entry['type'] == 'specifications':
+                    specifications.update(entry['specifications'])
+        return pages, stale_pages, specifications, end_page
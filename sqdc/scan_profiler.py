@@ -0,0 +1,78 @@
+import cProfile
+import logging
+import os
+import pstats
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List
+
+log = logging.getLogger(__name__)
+
+NB_HOTSPOTS = 20
+NB_ALLOCATION_SITES = 10
+TRACEMALLOC_FRAMES = 1
+
+
+class ProfileReport:
+    def __init__(self, stats_path: Path, memory_path: Path, hotspots: List[str], allocations: List[str]):
+        self.stats_path = stats_path
+        self.memory_path = memory_path
+        self.hotspots = hotspots
+        self.allocations = allocations
+
+    def format_message(self) -> str:
+        return '*Scan profile saved to {}*\n'.format(self.stats_path.name) + \
+               'Top {} cumulative hotspots:\n```\n{}\n```\n'.format(len(self.hotspots), '\n'.join(self.hotspots)) + \
+               'Largest allocation sites:\n```\n{}\n```'.format('\n'.join(self.allocations))
+
+
+# Runs a scan under cProfile and tracemalloc. Saves the .pstats and the memory top report to the profiles directory.
+class ScanProfiler:
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def profile(self, scan: Callable[[], None]) -> ProfileReport:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(scan)
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        base_name = 'scan-' + datetime.now().strftime('%Y%m%d-%H%M%S')
+        stats_path = self.directory.joinpath(base_name + '.pstats')
+        profiler.dump_stats(str(stats_path))
+        allocations = self.get_allocations(snapshot)
+        memory_path = self.directory.joinpath(base_name + '-memory.txt')
+        memory_path.write_text('\n'.join(allocations) + '\n')
+
+        report = ProfileReport(stats_path, memory_path, self.get_hotspots(pstats.Stats(profiler)),
+                               allocations[:NB_ALLOCATION_SITES])
+        log.info(f'Scan profile saved to {stats_path} and {memory_path}')
+        return report
+
+    @staticmethod
+    def get_hotspots(stats: pstats.Stats) -> List[str]:
+        # stats.stats: (file, line, function) -> (primitive calls, calls, total time, cumulative time, callers)
+        entries = sorted(stats.stats.items(), key=lambda e: e[1][3], reverse=True)[:NB_HOTSPOTS]
+        return ['{:8.3f}s {:8.3f}s {:>8} {}'.format(cumulative, total, calls, ScanProfiler.format_function(function))
+                for function, (_, calls, total, cumulative, _) in entries]
+
+    @staticmethod
+    def format_function(function) -> str:
+        filename, line, name = function
+        if filename == '~':
+            return name
+        return f'{os.path.basename(filename)}:{line}({name})'
+
+    @staticmethod
+    def get_allocations(snapshot: tracemalloc.Snapshot) -> List[str]:
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        return ['{:10.1f} KiB {:>8} blocks {}'.format(s.size / 1024, s.count, s.traceback[0])
+                for s in snapshot.statistics('lineno')[:NB_HOTSPOTS]]
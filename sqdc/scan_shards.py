@@ -0,0 +1,139 @@
+import logging
+import math
+from concurrent.futures import ProcessPoolExecutor, Future, TimeoutError as FuturesTimeoutError
+from typing import List, Tuple, Dict, Iterable, Optional, NamedTuple, Iterator
+
+from requests import RequestException
+
+from sqdc.exceptions import ScanShardTimeoutError
+from sqdc.process_pool import create_process_pool, terminate_process_pool
+from sqdc.product_tiles import ProductTile, parse_product_tiles
+from sqdc.request_limiter import RequestLimits
+
+log = logging.getLogger(__name__)
+
+# Pages crawled by each shard per round. The number of pages is only known once an empty one is found.
+PAGES_PER_SHARD = 4
+# Specifications are fetched one variant at a time: in tasks of this size, so each one ends within the timeout.
+SPECIFICATIONS_PER_TASK = 50
+# A task sends a few requests, each of them retried at most a few times. Past this, its worker is considered stuck.
+TASK_TIMEOUT_SECONDS = 300
+
+# One client per worker process, so its connections are reused from one task to the next.
+_worker_client = None
+
+
+def get_worker_client(sqdc_url: str, limits: RequestLimits):
+    global _worker_client
+    if _worker_client is None or _worker_client.sqdc_url != sqdc_url.rstrip('/') or _worker_client.limiter.limits != limits:
+        from sqdc.request_limiter import RequestLimiter
+        from sqdc.sqdc_client import SqdcClient
+        _worker_client = SqdcClient(sqdc_url=sqdc_url, limiter=RequestLimiter(limits))
+    return _worker_client
+
+
+# A search result page of a crawl: its tiles, or why it could not be fetched.
+class CrawledPage(NamedTuple):
+    page: int
+    tiles: Optional[List[ProductTile]]
+    error: Optional[str] = None
+
+
+# Worker process tasks: module level, and only plain data in and out.
+
+# Stops at the first empty page. A page that could not be fetched does not stop the others.
+def crawl_pages(sqdc_url: str, limits: RequestLimits, pages: List[int]) -> List[CrawledPage]:
+    client = get_worker_client(sqdc_url, limits)
+    crawled = []
+    for page in pages:
+        try:
+            html = client.get_product_result_page_html(page)
+        except RequestException as e:
+            crawled.append(CrawledPage(page, None, str(e)))
+            continue
+        tiles = parse_product_tiles(html)
+        crawled.append(CrawledPage(page, tiles))
+        if len(tiles) == 0:
+            break
+    return crawled
+
+
+def find_inventory_items(sqdc_url: str, limits: RequestLimits, skus: List[str]) -> List[str]:
+    return get_worker_client(sqdc_url, limits).api_find_inventory_items(skus)
+
+
+def get_specifications(sqdc_url: str, limits: RequestLimits, variants: List[Tuple[str, str]]) -> Dict[str, Dict[str, str]]:
+    client = get_worker_client(sqdc_url, limits)
+    return {variant_id: client.get_specifications_attributes(product_id, variant_id) for product_id, variant_id in variants}
+
+
+# Splits sorted items into n contiguous ranges of similar sizes.
+def split_ranges(items: List, nb_ranges: int) -> List[List]:
+    size, remainder = divmod(len(items), nb_ranges)
+    ranges = []
+    start = 0
+    for i in range(nb_ranges):
+        end = start + size + (1 if i < remainder else 0)
+        if end > start:
+            ranges.append(items[start:end])
+        start = end
+    return ranges
+
+
+# Spreads the network calls and the parsing of a scan across worker processes: page ranges for the crawl,
+# SKU ranges for the inventory and the specifications. Results are merged back in the scan thread, which
+# stays the only one writing to the database. Each worker process gets an equal share of the request limits.
+class ScanShards:
+    def __init__(self, nb_shards: int, sqdc_url: str, limits: RequestLimits = None, pages_per_shard: int = PAGES_PER_SHARD):
+        self.nb_shards = nb_shards
+        self.sqdc_url = sqdc_url
+        self.worker_limits = (limits or RequestLimits.default()).divide(nb_shards)
+        self.pages_per_shard = pages_per_shard
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            self.pool = create_process_pool(self.nb_shards)
+        return self.pool
+
+    # A stuck worker is not going to answer the next scan either: the pool is terminated, and created again when needed.
+    def get_result(self, future: Future):
+        try:
+            return future.result(timeout=TASK_TIMEOUT_SECONDS)
+        except FuturesTimeoutError as e:
+            terminate_process_pool(self.pool)
+            self.pool = None
+            raise ScanShardTimeoutError(TASK_TIMEOUT_SECONDS) from e
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    # Yields the pages in order, until the caller stops at the end of the catalog.
+    def crawl(self, first_page: int, max_pages: int) -> Iterator[CrawledPage]:
+        while first_page <= max_pages:
+            futures = []
+            for shard in range(self.nb_shards):
+                start = first_page + shard * self.pages_per_shard
+                pages = list(range(start, min(start + self.pages_per_shard, max_pages + 1)))
+                if pages:
+                    futures.append(self.get_pool().submit(crawl_pages, self.sqdc_url, self.worker_limits, pages))
+            first_page += self.nb_shards * self.pages_per_shard
+
+            for future in futures:
+                yield from self.get_result(future)
+
+    def find_inventory_items(self, skus: Iterable[str]) -> List[str]:
+        futures = [self.get_pool().submit(find_inventory_items, self.sqdc_url, self.worker_limits, skus_range)
+                   for skus_range in split_ranges(sorted(skus), self.nb_shards)]
+        return [sku for future in futures for sku in self.get_result(future)]
+
+    def get_specifications(self, variants: List[Tuple[str, str]]) -> Dict[str, Dict[str, str]]:
+        nb_tasks = max(self.nb_shards, math.ceil(len(variants) / SPECIFICATIONS_PER_TASK))
+        futures = [self.get_pool().submit(get_specifications, self.sqdc_url, self.worker_limits, variants_range)
+                   for variants_range in split_ranges(sorted(variants, key=lambda v: v[1]), nb_tasks)]
+        specifications = {}
+        for future in futures:
+            specifications.update(self.get_result(future))
+        return specifications
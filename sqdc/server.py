@@ -4,6 +4,7 @@ import tornado
 from tornado.ioloop import IOLoop
 
 from sqdc import SqdcStore
+from sqdc.MetricsRequestHandler import MetricsRequestHandler
 from sqdc.SlackRequestHandler import SlackRequestHandler
 
 
@@ -17,7 +18,8 @@ class SlackEndpointServer:
         SlackRequestHandler.watcher = watcher
         SlackRequestHandler.store = store
         server = tornado.web.Application([
-            (r"/", SlackRequestHandler)
+            (r"/", SlackRequestHandler),
+            (r"/metrics", MetricsRequestHandler)
         ])
 
         self.ioloop = IOLoop()
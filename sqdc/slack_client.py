@@ -5,6 +5,8 @@ import os
 
 import requests
 
+from sqdc.metrics import observe_http_request
+
 log = logging.getLogger(__name__)
 
 
@@ -24,6 +26,7 @@ class SlackClient:
     def _api_post(self, method_name: str, payload: dict):
         url = self.BASE_URL + method_name
         response = self.session.post(url, json=payload)
+        observe_http_request('POST', 'slack_' + method_name, response.status_code, response.elapsed.total_seconds())
         response.raise_for_status()
 
         return response.json()
@@ -0,0 +1,69 @@
+import logging
+import time
+import traceback
+from datetime import datetime
+from threading import Event
+
+from sqdc.SqdcStore import SqdcStore
+from sqdc.products_catalog import ProductsCatalog
+from sqdc.request_limiter import RequestAbortedError
+from sqdc.sqdc_client import SqdcClient
+
+log = logging.getLogger(__name__)
+
+
+class SpecificationsRefresher:
+    store: SqdcStore
+    sqdc_client: SqdcClient
+
+    def __init__(self, store: SqdcStore, catalog: ProductsCatalog, sqdc_client: SqdcClient, stop_event: Event, budget: int):
+        self.store = store
+        self.catalog = catalog
+        self.sqdc_client = sqdc_client
+        self.stop_event = stop_event
+        self.budget = budget
+
+    # Stops at the deadline, a time.monotonic() value, or when the stop event is set.
+    def refresh_oldest(self, deadline: float = None):
+        if self.budget <= 0:
+            return
+
+        try:
+            variants = self.store.get_variants_with_oldest_specifications(self.budget)
+        except Exception:
+            log.error('specifications refresh could not read the variants to refresh:')
+            log.error(traceback.format_exc())
+            return
+
+        refreshed = []
+        changed = []
+        failed = 0
+        for variant in variants:
+            if self.stop_event.is_set() or (deadline is not None and time.monotonic() >= deadline):
+                break
+
+            try:
+                specifications = self.sqdc_client.get_specifications_attributes(variant.product_id, variant.id)
+                if variant.set_specifications(specifications):
+                    changed.append(variant)
+            except RequestAbortedError:
+                break
+            except Exception as e:
+                failed += 1
+                log.warning(f'could not refresh the specifications of variant {variant.product_id}/{variant.id}: {e}')
+                # stamped all the same, so that the next refreshes move on to other variants instead of retrying it first.
+                variant.specifications_updated = datetime.now()
+            refreshed.append(variant)
+
+        try:
+            # unchanged and failed variants only get their specifications_updated timestamp written.
+            self.catalog.update_variants_specifications(self.store.save_variants(refreshed))
+            self.catalog.update_products_classification(self.store.update_products_classification(changed))
+        except Exception:
+            log.error('specifications refresh could not save the refreshed variants:')
+            log.error(traceback.format_exc())
+            return
+
+        log.info(f'Refreshed specifications of {len(refreshed)} variants, {len(changed)} changed, {failed} failed')
+        for variant in changed:
+            log.info(f'Specifications changed: {variant.detailed_description()}')
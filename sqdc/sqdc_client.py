@@ -1,10 +1,13 @@
 import functools
 import logging
-from typing import Iterable
+from typing import Iterable, Dict
 
 import requests
+import requests.adapters
 
-from sqdc import SqdcStore
+from sqdc.metrics import observe_http_request, HTTP_RETRIES
+from sqdc.request_limiter import RequestLimiter, MAX_ATTEMPTS, is_overload_status, get_retry_delay
+from sqdc.tracing import traced
 
 DEFAULT_LOCALE = 'en-CA'
 DOMAIN = 'https://www.sqdc.ca'
@@ -30,11 +33,14 @@ def api_response(root_key=''):
 
 
 class SqdcClient:
-    store: SqdcStore
     session: requests.Session
 
-    def __init__(self, session=None, locale=DEFAULT_LOCALE):
+    # sqdc_url: the website, or a stand-in for it such as benchmarks/fake_sqdc.py
+    # limiter: paces the requests to sqdc_url. Pass the same one to all the clients of a process.
+    def __init__(self, session=None, locale=DEFAULT_LOCALE, sqdc_url=DOMAIN, limiter: RequestLimiter = None):
         self.locale = locale
+        self.sqdc_url = sqdc_url.rstrip('/')
+        self.limiter = limiter or RequestLimiter()
         self._init_session(session)
         self.use_mocked_variants_in_stock = True
 
@@ -48,8 +54,13 @@ class SqdcClient:
                 'Accept': 'application/json, text/javascript, */*; q=0.01'
             })
 
+    # Only the requests to the SQDC go through the adapter: see http_capture.
+    def use_adapter(self, adapter: requests.adapters.BaseAdapter):
+        self.session.mount(self.sqdc_url + '/', adapter)
+
     @staticmethod
-    def log_request_elapsed(response: requests.Response):
+    def log_request_elapsed(response: requests.Response, family: str):
+        observe_http_request(response.request.method, family, response.status_code, response.elapsed.total_seconds())
 
         log.debug(
             '{} {} completed in {:.2g}s'.format(
@@ -58,28 +69,55 @@ class SqdcClient:
                 response.elapsed.total_seconds())
         )
 
-    def _html_get(self, path):
-        url = BASE_URL + '/{}'.format(path)
-        response = self.session.get(url)
+    # Retries the 429, 5xx and connection errors, after a jittered backoff.
+    def _send(self, family, method, url, **kwargs) -> requests.Response:
+        attempt = 1
+        while True:
+            try:
+                with self.limiter.request(family) as outcome:
+                    response = self.session.request(method, url, **kwargs)
+                    outcome.is_overloaded = is_overload_status(response.status_code)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= MAX_ATTEMPTS:
+                    raise
+                reason, retry_after = 'error', None
+                log.debug(f'{method} {url} failed: {e}')
+            else:
+                self.log_request_elapsed(response, family)
+                if not outcome.is_overloaded or attempt >= MAX_ATTEMPTS:
+                    return response
+                reason, retry_after = str(response.status_code), response.headers.get('Retry-After')
+
+            delay = get_retry_delay(attempt, retry_after)
+            log.warning(f'{method} {url} failed ({reason}), attempt {attempt}/{MAX_ATTEMPTS}: retrying in {delay:.2f}s')
+            HTTP_RETRIES.inc(1, family, reason)
+            self.limiter.wait(delay)
+            attempt += 1
+
+    def _html_get(self, path, family='search'):
+        url = self.sqdc_url + '/' + DEFAULT_LOCALE + '/{}'.format(path)
+        response = self._send(family, 'GET', url)
         response.raise_for_status()
-        self.log_request_elapsed(response)
         return response.text
 
-    def _api_post(self, path, data, headers={}):
-        url = DOMAIN + '/api/{}'.format(path)
-        response = self.session.post(url, headers=headers, json=data)
-        self.log_request_elapsed(response)
+    def _api_post(self, path, data, family, headers={}):
+        url = self.sqdc_url + '/api/{}'.format(path)
+        response = self._send(family, 'POST', url, headers=headers, json=data)
         response.raise_for_status()
 
         return response.json()
 
+    @traced('http')
     def post_to_slack(self, post_url, message):
         log.debug('posting to slack')
         payload = {'text': message, "mrkdwn": True, "mrkdwn_in": ["text"]}
         response = self.session.post(post_url, json=payload)
-        self.log_request_elapsed(response)
+        # the webhook URL is a secret: it is neither logged nor used as a metric label
+        observe_http_request('POST', 'slack_webhook', response.status_code, response.elapsed.total_seconds())
+        log.debug('POST to the Slack webhook completed in {:.2g}s'.format(response.elapsed.total_seconds()))
         response.raise_for_status()
 
+    @traced('http')
     def get_product_result_page_html(self, page_number):
         sort_params = 'SortDirection=asc'
         page_param = 'page={}'.format(page_number)
@@ -88,20 +126,27 @@ class SqdcClient:
 
         return self._html_get(page_path)
 
+    @traced('http')
     @api_response('ProductPrices')
     def api_calculate_prices(self, product_ids):
         log.info(f'calling product/calculatePrices with {len(product_ids)} product Ids')
         request_payload = {'products': product_ids}
-        return self._api_post('product/calculatePrices', request_payload)
+        return self._api_post('product/calculatePrices', request_payload, 'prices')
 
+    @traced('http')
     @api_response()
     def api_find_inventory_items(self, skus: Iterable[str]):
         sku_list = list(skus)
         log.info(f'calling inventory/findInventoryItems with {len(sku_list)} skus')
         request_payload = {'skus': sku_list}
-        return self._api_post('inventory/findInventoryItems', request_payload)
+        return self._api_post('inventory/findInventoryItems', request_payload, 'inventory')
 
     @api_response('Groups')
     def api_get_specifications(self, product_id, variant_id):
         payload = {'productId': product_id, 'variantId': variant_id}
-        return self._api_post('product/specifications', payload)
+        return self._api_post('product/specifications', payload, 'specifications')
+
+    @traced('http')
+    def get_specifications_attributes(self, product_id, variant_id) -> Dict[str, str]:
+        specifications = self.api_get_specifications(product_id, variant_id)[0]
+        return {a['PropertyName']: a['Value'] for a in specifications['Attributes']}
@@ -0,0 +1,146 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Optional, List
+
+log = logging.getLogger(__name__)
+
+TRACE_FILE_PREFIX = 'trace-'
+
+# Set while a scan is traced. When None, spans cost a global lookup and a function call.
+_tracer: Optional['Tracer'] = None
+
+
+# Spans recorded as Chrome trace-event "complete" events: the files open in chrome://tracing and Perfetto.
+class Tracer:
+    events: List[dict]
+
+    def __init__(self):
+        self.events = []
+        self.thread_names = {}
+        self.lock = Lock()
+        self.pid = os.getpid()
+
+    # start and end in seconds, from time.perf_counter
+    def add_span(self, name: str, category: str, start: float, end: float, args: Optional[dict]):
+        thread = threading.current_thread()
+        event = {'name': name, 'cat': category, 'ph': 'X', 'pid': self.pid, 'tid': thread.ident,
+                 'ts': start * 1000000, 'dur': (end - start) * 1000000}
+        if args:
+            event['args'] = args
+        with self.lock:
+            self.events.append(event)
+            self.thread_names[thread.ident] = thread.name
+
+    def to_json(self) -> dict:
+        with self.lock:
+            metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                        for tid, name in self.thread_names.items()]
+            return {'traceEvents': metadata + self.events, 'displayTimeUnit': 'ms'}
+
+
+class Span:
+    def __init__(self, tracer: Tracer, name: str, category: str, args: Optional[dict]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.tracer.add_span(self.name, self.category, self.start, time.perf_counter(), self.args)
+
+
+class NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def span(name: str, category: str = '', **args):
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return Span(tracer, name, category, args)
+
+
+def traced(category: str):
+    def decorator(fn):
+        name = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with Span(tracer, name, category, None):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Class decorator: traces every public method.
+def trace_public_methods(category: str, exclude=()):
+    def decorator(cls):
+        for name, attribute in list(vars(cls).items()):
+            if name.startswith('_') or name in exclude:
+                continue
+            if isinstance(attribute, staticmethod):
+                setattr(cls, name, staticmethod(traced(category)(attribute.__func__)))
+            elif callable(attribute) and not isinstance(attribute, type):
+                setattr(cls, name, traced(category)(attribute))
+        return cls
+
+    return decorator
+
+
+def start_tracing() -> Tracer:
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> Optional[Tracer]:
+    global _tracer
+    tracer = _tracer
+    _tracer = None
+    return tracer
+
+
+# One file per traced scan. Only the max_files most recent ones are kept.
+class TraceWriter:
+    def __init__(self, directory: Path, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    def write(self, tracer: Tracer) -> Path:
+        path = self.directory.joinpath(f'{TRACE_FILE_PREFIX}{datetime.now().strftime("%Y%m%d-%H%M%S-%f")}.json')
+        with open(path, 'w') as file:
+            json.dump(tracer.to_json(), file)
+        self.rotate()
+        return path
+
+    def rotate(self):
+        trace_files = sorted(self.directory.glob(f'{TRACE_FILE_PREFIX}*.json'))
+        for path in trace_files[:max(0, len(trace_files) - self.max_files)]:
+            try:
+                path.unlink()
+            except OSError as e:
+                log.warning(f'could not delete old trace {path}: {e}')
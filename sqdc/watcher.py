@@ -1,18 +1,40 @@
 import datetime
 import logging
+import time
 import traceback
-from threading import Thread, Event
-from typing import List
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from functools import partial
+from threading import Thread, Event, Lock
+from typing import List, Dict
 
 from babel.dates import format_timedelta
 
 from sqdc.dataobjects.product import Product
 from sqdc.dataobjects.product_history import ProductHistory
 from sqdc.dataobjects.productevent import ProductEvent
+from sqdc.exceptions import ScanShardTimeoutError
+from sqdc.hot_set_poller import HotSetPoller
+from sqdc.http_capture import create_capture_adapter
+from sqdc.leader_lock import LeaderLock
+from sqdc.logic.hot_set import HotSet
+from sqdc.logic.rule_engine import RuleEngine
 from sqdc.logic.product_calculator import ProductCalculator
+from sqdc.logic.scan_scheduler import ScanScheduler
+from sqdc.metrics import SCAN_TIMER, QUEUE_DEPTH, scan_stage
+from sqdc.notification_digest import NotificationDigest
+from sqdc.notification_dispatcher import NotificationDispatcher
 from sqdc.server import SlackEndpointServer
+from sqdc.products_catalog import ProductsCatalog
+from sqdc.products_table import ProductsTable, LazyMessage
+from sqdc.scan_profiler import ScanProfiler
+from sqdc.process_pool import create_process_pool, terminate_process_pool
+from sqdc.request_limiter import RequestLimiter, RequestAbortedError
+from sqdc.scan_checkpoint import ScanCheckpoint
+from sqdc.scan_shards import ScanShards
 from sqdc.slack_client import SlackClient
+from sqdc.specifications_refresher import SpecificationsRefresher
 from sqdc.sqdc_client import SqdcClient
+from sqdc.tracing import TraceWriter, traced, span, start_tracing, stop_tracing
 from sqdc.watcherOptions import WatcherOptions
 from .SqdcStore import SqdcStore
 from .formatter import SqdcFormatter
@@ -21,6 +43,12 @@ from .products_updater import ProductsUpdater
 
 log = logging.getLogger(__name__)
 
+# Notification dispatcher key of the channel posts. The webhook URL is a secret: it only goes in the send partial.
+CHANNEL_RECIPIENT = '#channel'
+
+HOT_SET_HISTORY_DAYS = 14
+LEADER_LOCK_RETRY_SECONDS = 10
+
 # logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
 
 
@@ -28,24 +56,77 @@ class SqdcWatcher(Thread):
     def __init__(self, event: Event, options: WatcherOptions = WatcherOptions.default()):
         Thread.__init__(self)
         self._stopped = event
+        # set to scan right away: by stop(), or when the hot set poller finds a restock
+        self._wakeup = Event()
         self.store = SqdcStore(options.is_test_mode)
-        self.sqdc_client = SqdcClient()
+        self.catalog = ProductsCatalog(self.store)
+        self.request_limiter = RequestLimiter(options.get_request_limits(), event)
+        self.sqdc_client = SqdcClient(sqdc_url=options.sqdc_url, limiter=self.request_limiter)
         self.slack_client = SlackClient(options.slack_token)
+        self.notification_dispatcher = NotificationDispatcher(options.notification_workers)
+        self.notification_digest = NotificationDigest(options.digest_window * 60) if options.digest_window > 0 else None
         self.slack_post_url = options.slack_post_url
         self.display_format = 'table'
         self.is_test = options.is_test_mode
         self.interval = options.interval * 60
         self.display_format = options.display_format
-        self.min_duration_between_scans_minutes = 15
+        self.products_table = ProductsTable()
+        self.min_duration_between_scans_minutes = options.full_scan_interval
+        self.scan_scheduler = ScanScheduler(self.interval, options.min_interval * 60, options.max_interval * 60) \
+            if options.adaptive_interval else None
+        self.rule_engine: RuleEngine = None
         self.no_cache = options.no_cache
         self.enable_slack_post = options.enable_slack_post
-
-        self.slack_server = SlackEndpointServer(options.slack_port, self, self.store)
+        # stopped by _wakeup: a requested scan, or stop(), does not wait for the refresh
+        self.specifications_refresher = SpecificationsRefresher(self.store, self.catalog, self.sqdc_client, self._wakeup,
+                                                                options.spec_refresh_budget)
+
+        self.hot_set = HotSet()
+        self.hot_set_poller = HotSetPoller(self.hot_set, SqdcClient(sqdc_url=options.sqdc_url, limiter=self.request_limiter), event, self.on_hot_set_restock,
+                                           options.hot_poll_interval, options.hot_poll_batch_size) \
+            if options.hot_poll_interval > 0 else None
+
+        self.capture_adapter = create_capture_adapter(options.record_requests, options.replay_requests, options.replay_realtime)
+        if self.capture_adapter:
+            self.sqdc_client.use_adapter(self.capture_adapter)
+            if self.hot_set_poller:
+                self.hot_set_poller.sqdc_client.use_adapter(self.capture_adapter)
+
+        self.parse_workers = options.parse_workers
+        self.parse_pool = create_process_pool(options.parse_workers) if options.parse_workers > 0 else None
+        self.scan_shards = ScanShards(options.scan_shards, options.sqdc_url, self.request_limiter.limits) if options.scan_shards > 0 else None
+        if self.scan_shards and self.capture_adapter:
+            log.warning('--scan-shards is ignored while recording or replaying requests: they are sent by the watcher process only')
+            self.scan_shards = None
+        test_suffix = '-test' if self.is_test else ''
+        self.leader_lock = LeaderLock(self.store.dir.joinpath(f'watcher{test_suffix}.lock'))
+        self.scan_checkpoint = ScanCheckpoint(self.store.dir.joinpath(f'scan-checkpoint{test_suffix}.jsonl'),
+                                              self.store.dir.joinpath(f'scan-last-good{test_suffix}.jsonl'))
+        self.stale_page_fallback = options.stale_page_fallback
+        self.slack_port = options.slack_port
+        self.slack_server = None
+
+        self.register_queue_metrics()
+        self.request_limiter.register_metrics()
+        self.scan_profiler = ScanProfiler(self.store.dir.joinpath('profiles'))
+        # usernames to send the profile to. None when requested by a signal.
+        self.profile_requests = []
+        self.profile_requests_lock = Lock()
+        self.is_profiling = False
+        self.profile_admins = set(options.profile_admins)
+        self.trace_writer = TraceWriter(self.store.dir, options.trace_max_files) if options.trace_scans else None
 
     def run(self):
+        if not self.leader_lock.wait_until_acquired(self._stopped, LEADER_LOCK_RETRY_SECONDS):
+            return
+
+        self.slack_server = SlackEndpointServer(self.slack_port, self, self.store)
         self.store.initialize()
+        self.catalog.load()
+        self.notification_dispatcher.start()
         self.log_initialized_event()
         self.log_notification_rules()
+        self.start_hot_set_poller()
 
         self.main_loop()
         self.shutdown()
@@ -53,13 +134,113 @@ class SqdcWatcher(Thread):
     def main_loop(self):
         is_stopping = False
         while not is_stopping:
+            self._wakeup.clear()
             self.execute_scan()
-            log.info('TASK EXECUTED. Waiting {:.2g} minutes until next execution.'.format(self.interval / 60))
-            is_stopping = self._stopped.wait(self.interval)
+            interval = self.get_next_interval()
+            next_scan = time.monotonic() + interval
+            # runs once notifications are sent, in the time left until the next scan: it never delays either.
+            self.specifications_refresher.refresh_oldest(deadline=next_scan)
+            self.save_catalog_snapshot()
+            self.log_notification_metrics()
+            interval = max(0.0, next_scan - time.monotonic())
+            log.info('TASK EXECUTED. Waiting {:.2g} minutes until next execution.'.format(interval / 60))
+            is_stopping = self.wait_for_next_scan(interval)
+
+    def get_next_interval(self) -> float:
+        if self.scan_scheduler is None:
+            return self.interval
+
+        now = datetime.datetime.now()
+        try:
+            if self.scan_scheduler.needs_refresh(now):
+                restocks = self.store.get_restock_timestamps(self.scan_scheduler.get_history_start(now))
+                self.scan_scheduler.update_histogram(restocks, now)
+        except:
+            log.error('could not update the scan schedule:')
+            log.error(traceback.format_exc())
+        return self.scan_scheduler.get_next_interval(now)
+
+    # Digests are sent when their window is over, even between two scans.
+    def wait_for_next_scan(self, interval: float) -> bool:
+        if self.notification_digest is None:
+            self._wakeup.wait(interval)
+            return self._stopped.is_set()
+
+        next_scan = time.monotonic() + interval
+        while True:
+            self.send_notification_digests()
+            timeout = next_scan - time.monotonic()
+            next_digest_in = self.notification_digest.get_next_due_in()
+            if next_digest_in is not None:
+                timeout = min(timeout, next_digest_in)
+            if timeout <= 0:
+                return False
+            if self._wakeup.wait(timeout):
+                return self._stopped.is_set()
+
+    def register_queue_metrics(self):
+        QUEUE_DEPTH.set_function(self.notification_dispatcher.get_queue_depth, 'notifications')
+        QUEUE_DEPTH.set_function(lambda: len(self.hot_set.get_variants_to_poll()), 'hot_set')
+        if self.notification_digest:
+            QUEUE_DEPTH.set_function(lambda: len(self.notification_digest.pending), 'digests')
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def on_hot_set_restock(self, variant_ids: List[str]):
+        self._wakeup.set()
+
+    def start_hot_set_poller(self):
+        if self.hot_set_poller is None:
+            return
+        try:
+            restock_counts = self.store.get_restock_counts(datetime.datetime.now() - datetime.timedelta(days=HOT_SET_HISTORY_DAYS))
+            self.hot_set.set_restock_counts(restock_counts)
+            self.hot_set.update(self.catalog.get_products(), self.get_rule_engine())
+        except:
+            log.error('could not initialize the hot set:')
+            log.error(traceback.format_exc())
+        self.hot_set_poller.start()
+
+    @traced('watcher')
+    def update_hot_set(self, products: List[Product], became_in_stock: List[Product]):
+        if self.hot_set_poller is None:
+            return
+        self.hot_set.add_restocks(v.id for p in became_in_stock for v in p.variants)
+        self.hot_set.update(products, self.get_rule_engine())
+        log.debug(f'Hot set: {len(self.hot_set.get_variants_to_poll())} variants polled between scans')
+
+    def save_catalog_snapshot(self):
+        try:
+            self.catalog.save_snapshot()
+        except:
+            log.error('could not save the catalog snapshot:')
+            log.error(traceback.format_exc())
+
+    def replace_parse_pool(self):
+        if self.parse_pool:
+            terminate_process_pool(self.parse_pool)
+            self.parse_pool = create_process_pool(self.parse_workers)
 
     def shutdown(self):
         log.info('Watcher daemon - shutting down...')
-        self.slack_server.stop()
+        if self.slack_server:
+            self.slack_server.stop()
+        if self.notification_digest:
+            self.send_notification_digests(force=True)
+        self.notification_dispatcher.stop()
+        if self.parse_pool:
+            self.parse_pool.shutdown()
+        if self.scan_shards:
+            self.scan_shards.shutdown()
+        self.leader_lock.release()
+
+    def log_notification_metrics(self):
+        metrics = self.notification_dispatcher.get_metrics()
+        log.info('Notifications: {queue_depth} queued, {delivered} delivered in {batches} batches, {failed} failed, '
+                 '{retried} retried, rate limited {rate_limited} times, latency avg {latency_average_seconds:.2f}s '
+                 'max {latency_max_seconds:.2f}s'.format(**metrics))
 
     def log_initialized_event(self):
         log.info('INITIALIZED - interval = {}'.format(self.interval))
@@ -80,88 +261,183 @@ class SqdcWatcher(Thread):
                 for rule in rules:
                     log.info('  {}'.format(rule.keyword))
 
+    def is_profile_admin(self, username: str) -> bool:
+        return username in self.profile_admins
+
+    # False when a profile is already pending or running: the request is ignored.
+    def request_profile(self, username: str = None) -> bool:
+        with self.profile_requests_lock:
+            if self.is_profiling or len(self.profile_requests) > 0:
+                log.info(f'Profiling requested by {username or "signal"} ignored: a profile is already pending or running')
+                return False
+            self.profile_requests.append(username)
+        log.info(f'Profiling of the next scan requested by {username or "signal"}')
+        return True
+
     def execute_scan(self):
+        with self.profile_requests_lock:
+            profile_requests = self.profile_requests
+            self.profile_requests = []
+            self.is_profiling = len(profile_requests) > 0
+        if len(profile_requests) > 0:
+            try:
+                self.execute_profiled_scan(profile_requests)
+            finally:
+                with self.profile_requests_lock:
+                    self.is_profiling = False
+        else:
+            self.execute_traced_scan()
+
+    def execute_profiled_scan(self, profile_requests: List[str]):
+        report = self.scan_profiler.profile(self.execute_traced_scan)
+        message = report.format_message()
+        log.info(message)
+        for username in set(u for u in profile_requests if u):
+            self.notification_dispatcher.send_message(
+                message, '@' + username, send=partial(self.slack_client.chat_send_message, recipient=username))
+
+    def execute_traced_scan(self):
+        if self.trace_writer is None:
+            self.run_scan()
+            return
+
+        tracer = start_tracing()
+        try:
+            with span('execute_scan', 'watcher'):
+                self.run_scan()
+        finally:
+            stop_tracing()
+            try:
+                log.info(f'Scan trace written to {self.trace_writer.write(tracer)}')
+            except:
+                log.error('could not write the scan trace:')
+                log.error(traceback.format_exc())
+
+    def run_scan(self):
+        SCAN_TIMER.start_scan()
         try:
             calculator = self.refresh_products()
 
             all_in_stock = ProductFilters.in_stock(calculator.updated_products)
             log.info('List of all available products:')
-            log.info(SqdcFormatter.format_products(all_in_stock, self.display_format))
+            log.info(self.format_products_lazily(all_in_stock))
 
-            became_out_of_stock = calculator.get_became_out_of_stock()
+            with scan_stage('diff'):
+                became_out_of_stock = calculator.get_became_out_of_stock()
+                became_in_stock = calculator.get_became_in_stock()
+                became_in_stock_for_notifications = list(filter(lambda p: self.product_filter_for_notification(p, calculator), became_in_stock))
             if len(became_out_of_stock) > 0:
                 log.info('Products just became out of stock: ' + ', '.join([f'{p}' for p in became_out_of_stock]))
 
-            became_in_stock = calculator.get_became_in_stock()
-            became_in_stock_for_notifications = list(filter(lambda p: self.product_filter_for_notification(p, calculator), became_in_stock))
             nb_ignored_because_recently_notified = len(became_in_stock) - len(became_in_stock_for_notifications)
             if nb_ignored_because_recently_notified > 0:
                 log.info(f'{nb_ignored_because_recently_notified} products became in stock, but were filtered - they won\'t be posted to Slack.')
 
-            self.add_event_to_products(became_out_of_stock, ProductEvent.NOT_IN_STOCK)
-            self.add_event_to_products(became_in_stock, ProductEvent.IN_STOCK)
+            with scan_stage('persistence'):
+                self.add_event_to_products(became_out_of_stock, ProductEvent.NOT_IN_STOCK)
+                self.add_event_to_products(became_in_stock, ProductEvent.IN_STOCK)
+            self.update_hot_set(calculator.updated_products, became_in_stock)
 
             if len(became_in_stock) == 0:
                 log.info(f'No product came back in stock. Total in stock: {len(all_in_stock)}')
             else:
-                self.apply_notification_rules(became_in_stock)
+                with scan_stage('notify'):
+                    self.apply_notification_rules(became_in_stock)
 
                 log.info('There are {} new products available since last scan (total, {} in stock)'.format(len(became_in_stock), len(all_in_stock)))
-                log.info(SqdcFormatter.build_products_table(became_in_stock))
+                log.info(LazyMessage(lambda: SqdcFormatter.build_products_table(became_in_stock)))
 
-                self.send_in_stock_updates_to_slack_if_needed(calculator.previous_products, became_in_stock_for_notifications)
+                with scan_stage('notify'):
+                    self.send_in_stock_updates_to_slack_if_needed(calculator.previous_products, became_in_stock_for_notifications)
 
         except KeyboardInterrupt:
             log.info('CTRL+C pressed. exiting program.')
+        except RequestAbortedError:
+            log.info('Scan interrupted, the watcher is stopping.')
+            self.catalog.invalidate()
+        except ScanShardTimeoutError as e:
+            # the shard pool is already terminated, and created again on next scan
+            log.error(f'watcher job execution encountered an error: {e}')
+            self.catalog.invalidate()
+        except FuturesTimeoutError:
+            log.error('parse worker processes stopped responding, they are replaced:')
+            log.error(traceback.format_exc())
+            self.replace_parse_pool()
+            self.catalog.invalidate()
         except:
             traceback.format_exc()
             log.error('watcher job execution encountered an error:')
             log.error(traceback.format_exc())
+            # the scan may have been interrupted between two writes
+            self.catalog.invalidate()
+        finally:
+            stages = SCAN_TIMER.end_scan()
+            log.info('Scan stages: ' + ', '.join(f'{name}={elapsed:.3f}s' for name, elapsed in stages.items()))
+
+    # the full catalog table is only rendered if the record is emitted, and only its changed lines
+    def format_products_lazily(self, products: List[Product]) -> LazyMessage:
+        if self.display_format == 'table':
+            return self.products_table.lazy(products)
+        return LazyMessage(lambda: SqdcFormatter.format_products(products, self.display_format))
 
     @staticmethod
     def product_filter_for_notification(product: Product, calculator: ProductCalculator):
         return product.category.lower() == 'dried flowers' and not calculator.was_product_recently_in_stock(product)
 
+    @traced('watcher')
     def refresh_products(self):
         app_state = self.store.get_app_state()
         time_since_refresh = (datetime.datetime.now() - (app_state.last_scan_timestamp or datetime.datetime.min))
-        use_cached_products = not self.no_cache and time_since_refresh < datetime.timedelta(minutes=self.min_duration_between_scans_minutes)
+        store_products = self.catalog.get_products()
+        use_cached_products = not self.no_cache \
+            and len(store_products) > 0 \
+            and time_since_refresh < datetime.timedelta(minutes=self.min_duration_between_scans_minutes) \
+            and not self.scan_checkpoint.has_pending_scan()
         if use_cached_products:
             log.debug('Using cached products')
         else:
             log.debug('Re-fetching products from SQDC API...')
+            self.scan_checkpoint.start()
+
+        checkpoint = None if use_cached_products else self.scan_checkpoint
+        updater = ProductsUpdater(self.store, self.sqdc_client, self._stopped, self.parse_pool, self.scan_shards,
+                                  checkpoint, self.stale_page_fallback)
+        updated_products = updater.get_products(store_products, use_cached_products)
+        if updater.stale_pages:
+            nb_stale = len([p for p in updated_products if p.is_stale])
+            log.warning(f'{nb_stale} products come from the last known good copy of pages {updater.stale_pages}')
+
+        with scan_stage('diff'):
+            calculator = ProductCalculator(
+                self.store,
+                previous_products=store_products,
+                updated_products=updated_products
+            )
 
-        store_products = self.store.get_products()
-
-        updater = ProductsUpdater(self.store, self.sqdc_client, self._stopped)
-        updated_products = updater.get_products(cached_products=use_cached_products and self.store.get_products())
+            became_in_stock = calculator.get_became_in_stock()
+            if len(became_in_stock) > 0:
+                for p in calculator.updated_products:
+                    p.is_new = False
 
-        calculator = ProductCalculator(
-            self.store,
-            previous_products=store_products,
-            updated_products=updated_products
-        )
+                for p in calculator.get_new_products():
+                    p.is_new = True
 
-        became_in_stock = calculator.get_became_in_stock()
-        if len(became_in_stock) > 0:
+        with scan_stage('availability_stats'):
             for p in calculator.updated_products:
-                p.is_new = False
-
-            for p in calculator.get_new_products():
-                p.is_new = True
-
-        for p in calculator.updated_products:
-            updater.update_availability_stats(p)
+                updater.update_availability_stats(p)
 
         log.info(f'Saving {len(calculator.updated_products)} updated products')
-        self.store.save_products(calculator.updated_products)
-        became_out_of_stock = calculator.get_became_out_of_stock()
-        if len(became_out_of_stock) > 0:
-            log.info(f'Saving {len(became_out_of_stock)} products that just became out of stock: ' + ' '.join([str(p) for p in became_out_of_stock]))
-            self.store.save_products(became_out_of_stock)
+        with scan_stage('persistence'):
+            self.catalog.update(self.store.save_products(calculator.updated_products))
+            became_out_of_stock = calculator.get_became_out_of_stock()
+            if len(became_out_of_stock) > 0:
+                log.info(f'Saving {len(became_out_of_stock)} products that just became out of stock: ' + ' '.join([str(p) for p in became_out_of_stock]))
+                self.catalog.update(self.store.save_products(became_out_of_stock))
+        self.scan_checkpoint.complete()
 
         return calculator
 
+    @traced('watcher')
     def send_in_stock_updates_to_slack_if_needed(self, previous_products: List[Product], new_products_in_stock: List[Product]):
         if len(previous_products) > 0:
             if self.slack_post_url and len(new_products_in_stock) > 0:
@@ -170,31 +446,66 @@ class SqdcWatcher(Thread):
                 log.info(message)
 
                 if self.enable_slack_post:
-                    self.sqdc_client.post_to_slack(self.slack_post_url, message)
-                    self.store.mark_products_notified(new_products_in_stock)
+                    self.notification_dispatcher.send_message(
+                        message, CHANNEL_RECIPIENT,
+                        send=partial(self.sqdc_client.post_to_slack, self.slack_post_url),
+                        on_delivered=partial(self.mark_products_notified, new_products_in_stock))
                 else:
                     log.warning('--enable-slack-post was not provided. Skipping Slack notification post.')
         else:
             log.info('First run - not posting new products to Slack.')
 
-    def apply_notification_rules(self, products: List[Product]):
+    # Called by the notification dispatcher thread once the channel post is delivered.
+    def mark_products_notified(self, products: List[Product]):
+        self.catalog.update_products_notification(self.store.mark_products_notified(products))
 
-        all_rules = self.store.get_all_notification_rules()
-        for username, rules in all_rules.items():
-            products_found = []
-            for product in products:
-                for rule in rules:
-                    if product.get_specification('Strain').lower().find(rule.keyword.lower()) >= 0:
-                        products_found.append(product)
-            nb_found = len(products_found)
-            if nb_found > 0:
-                message = '------------\n' + \
-                          '*{} new available products are matching your notification alerts:*\n'.format(nb_found)
-                for product in products_found:
-                    message += '   - {}\n'.format(SqdcFormatter.format_product(product))
-                message += '------------'
-                self.slack_client.chat_send_message(message, username)
+    # Called when triggers are added or deleted: the rule engine is rebuilt on next use.
+    def invalidate_notification_rules(self):
+        self.rule_engine = None
+
+    def get_rule_engine(self) -> RuleEngine:
+        rule_engine = self.rule_engine
+        if rule_engine is None:
+            all_triggers = self.store.get_all_notification_rules()
+            rule_engine = RuleEngine.from_triggers(trigger for triggers in all_triggers.values() for trigger in triggers)
+            log.debug(f'Notification rules compiled: {len(rule_engine)} rules')
+            self.rule_engine = rule_engine
+        return rule_engine
+
+    @traced('watcher')
+    def apply_notification_rules(self, products: List[Product]):
+        rule_engine = self.get_rule_engine()
+        products_found_by_user: Dict[str, List[Product]] = {}
+        for product in products:
+            for rule in rule_engine.find_matching_rules(product):
+                products_found = products_found_by_user.setdefault(rule.username_to_notify, [])
+                if product not in products_found:
+                    products_found.append(product)
+
+        for username, products_found in products_found_by_user.items():
+            if self.notification_digest:
+                self.notification_digest.add(username, products_found)
+            else:
+                self.send_matching_products(username, products_found)
+        if self.notification_digest:
+            self.send_notification_digests()
+
+    def send_notification_digests(self, force=False):
+        for username, digest in self.notification_digest.pop_due(force=force).items():
+            products = digest.get_products()
+            log.info(f'Sending digest to @{username}: {len(products)} products, {digest.nb_matches} matches')
+            self.send_matching_products(username, products)
+
+    def send_matching_products(self, username: str, products: List[Product]):
+        message = '------------\n' + \
+                  '*{} new available products are matching your notification alerts:*\n'.format(len(products))
+        for product in products:
+            message += '   - {}\n'.format(SqdcFormatter.format_product(product))
+        message += '------------'
+        self.notification_dispatcher.send_message(
+            message, '@' + username, send=partial(self.slack_client.chat_send_message, recipient=username))
 
+    @traced('watcher')
     def add_event_to_products(self, products: List[Product], event: ProductEvent):
         entries = []
         for product in products:
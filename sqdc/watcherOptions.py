@@ -1,6 +1,8 @@
-from typing import List
+from pathlib import Path
+from typing import List, Optional, Dict
 
 from sqdc.notificationRule import NotificationRule
+from sqdc.request_limiter import DEFAULT_MAX_CONCURRENCY, DEFAULT_RATES, RequestLimits
 
 
 class WatcherOptions:
@@ -13,12 +15,58 @@ class WatcherOptions:
     slack_port: int
     no_cache: bool
     enable_slack_post: bool
+    spec_refresh_budget: int
+    notification_workers: int
+    digest_window: int
+    adaptive_interval: bool
+    min_interval: float
+    max_interval: float
+    full_scan_interval: float
+    hot_poll_interval: float
+    hot_poll_batch_size: int
+    trace_scans: bool
+    trace_max_files: int
+    sqdc_url: str
+    record_requests: Optional[Path]
+    replay_requests: Optional[Path]
+    replay_realtime: bool
+    parse_workers: int
+    scan_shards: int
+    stale_page_fallback: bool
+    request_rates: Dict[str, float]
+    max_concurrent_requests: int
+    profile_admins: List[str]
 
     def __init__(self):
         self.notification_rules = []
 
+    # request_rates only overrides some of the default rates.
+    def get_request_limits(self) -> RequestLimits:
+        return RequestLimits({**DEFAULT_RATES, **self.request_rates}, self.max_concurrent_requests)
+
     @staticmethod
     def default():
         options = WatcherOptions()
         options.interval = 60 * 5
+        options.spec_refresh_budget = 25
+        options.notification_workers = 2
+        options.digest_window = 0
+        options.adaptive_interval = False
+        options.min_interval = 2
+        options.max_interval = 30
+        options.full_scan_interval = 15
+        options.hot_poll_interval = 10
+        options.hot_poll_batch_size = 20
+        options.trace_scans = False
+        options.trace_max_files = 20
+        options.sqdc_url = 'https://www.sqdc.ca'
+        options.record_requests = None
+        options.replay_requests = None
+        options.replay_realtime = False
+        options.parse_workers = 0
+        options.scan_shards = 0
+        options.stale_page_fallback = False
+        options.request_rates = {}
+        options.max_concurrent_requests = DEFAULT_MAX_CONCURRENCY
+        options.profile_admins = []
         return options